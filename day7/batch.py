@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+import array
+import collections
+import concurrent.futures
+import os
+import sys
+
+from filesystem_full import (Directory, DirectorySizeIndex, DirectorySizeQueries, File, FileSystem, FileSystemState,
+                             CliOutputProcessor)
+
+
+class TranscriptSummary(collections.namedtuple("TranscriptSummary", ["path", "total_size", "directory_sizes"])):
+    """
+    per transcript result of summarize_transcripts. directory_sizes holds every directory size as packed int64 bytes so
+    the summary pickles as one small blob
+    """
+    __slots__ = ()
+    # only needs total_size, so the summary answers it exactly like the FileSystem it came from
+    space_to_free = DirectorySizeQueries.space_to_free
+
+    def size_index(self):
+        return DirectorySizeIndex(array.array("q", self.directory_sizes))
+
+
+class FlatTree(collections.namedtuple("FlatTree", ["path", "names", "parents", "sizes"])):
+    """
+    a parsed tree in pre-order: names joined by newlines (which can't appear in a transcript name), the parent index
+    of every node and the size of every file (-1 for directories), both as packed arrays
+    """
+    __slots__ = ()
+
+
+def parse_transcript(path):
+    fs = FileSystem()
+    fs_state = FileSystemState(fs)
+    with open(path, "rb") as transcript, fs_state.bulk_build():
+        CliOutputProcessor(fs_state).process_stream(transcript)
+    return fs
+
+
+def summarize_transcript(path):
+    fs = parse_transcript(path)
+    sizes = array.array("q", fs.directory_size_index().sizes)
+    return TranscriptSummary(path, fs.total_size, sizes.tobytes())
+
+
+def flatten_transcript(path):
+    fs = parse_transcript(path)
+    names, parents, sizes = [], array.array("i"), array.array("q")
+    stack = [(fs.root, -1)]
+    while stack:
+        node, parent = stack.pop()
+        index = len(names)
+        names.append(node.name)
+        parents.append(parent)
+        if isinstance(node, Directory):
+            sizes.append(-1)
+            # reversed so that siblings come out in their original order
+            stack.extend((child, index) for child in reversed(node.children))
+        else:
+            sizes.append(node.size)
+    return FlatTree(path, "\n".join(names), parents.tobytes(), sizes.tobytes())
+
+
+def host_name(path):
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def summarize_transcripts(paths, workers=None, chunksize=8):
+    """
+    parses every transcript in {paths} on a pool of {workers} processes and returns their TranscriptSummary, in order
+    """
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(summarize_transcript, paths, chunksize=chunksize))
+
+
+def merge_transcripts(paths, workers=None, chunksize=8, host_name=host_name):
+    """
+    parses every transcript in {paths} on a pool of {workers} processes and merges the trees into a single FileSystem
+    where each transcript's root becomes /{host_name(path)}/. transcripts mapping to the same host replace each other
+    """
+    fs = FileSystem()
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor, fs.bulk_build():
+        for tree in executor.map(flatten_transcript, paths, chunksize=chunksize):
+            parents, sizes = array.array("i", tree.parents), array.array("q", tree.sizes)
+            nodes = []
+            for index, name in enumerate(tree.names.split("\n")):
+                if index == 0:
+                    node = Directory(host_name(tree.path))
+                    fs.root.add_child(node)
+                elif sizes[index] < 0:
+                    node = Directory(name)
+                    nodes[parents[index]].add_child(node)
+                else:
+                    node = File(name=name, size=sizes[index])
+                    nodes[parents[index]].add_child(node)
+                nodes.append(node)
+    return fs
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("usage: batch.py {input-file}...")
+        exit(1)
+    for summary in summarize_transcripts(sys.argv[1:]):
+        size_index = summary.size_index()
+        print(f"{summary.path}: sum of all dirs below 100_000: {size_index.sum_at_most(100_000)} "
+              f"min_size_to_delete: {size_index.smallest_at_least(summary.space_to_free(70_000_000, 30_000_000))}")
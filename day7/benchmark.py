@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+import argparse
+import concurrent.futures
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from compact_filesystem import CompactFileSystem
+from filesystem_full import FileSystem, FileSystemState, CliOutputProcessor
+from transcript_generator import write_transcript
+
+BACKENDS = {"object": FileSystem, "compact": CompactFileSystem}
+
+
+def flat_listing_transcript(fan_out):
+    yield "$ cd /"
+    yield "$ ls"
+    for i in range(fan_out):
+        yield f"{i + 1} file{i}.txt"
+
+
+def nested_transcript(dir_count, files_per_dir=10):
+    """
+    {dir_count} directories, each holding {files_per_dir} files and hanging off one of the previous ten directories
+    """
+    yield "$ cd /"
+    yield "$ ls"
+    path = []
+    for i in range(dir_count):
+        yield from (f"{f + 1} f{f}.log" for f in range(files_per_dir))
+        if len(path) == 10:
+            for _ in path:
+                yield "$ cd .."
+            path.clear()
+        yield f"dir d{i}"
+        yield f"$ cd d{i}"
+        path.append(i)
+        yield "$ ls"
+
+
+def time_ingest(lines):
+    fs = FileSystem()
+    cli_output_processor = CliOutputProcessor(FileSystemState(fs))
+    lines = list(lines)  # keep transcript generation out of the measurement
+    start = time.perf_counter()
+    for line in lines:
+        cli_output_processor.process_command(line)
+    return time.perf_counter() - start
+
+
+def time_stream_ingest(lines):
+    fs = FileSystem()
+    cli_output_processor = CliOutputProcessor(FileSystemState(fs))
+    transcript = ("\n".join(lines) + "\n").encode()
+    start = time.perf_counter()
+    cli_output_processor.process_stream(transcript)
+    return time.perf_counter() - start
+
+
+def bench_fan_out(fan_outs):
+    """
+    ingests a single directory with {fan_out} files for every fan out; with O(1) child lookups the time per entry
+    should stay flat as the fan out grows
+    """
+    results = []
+    for fan_out in fan_outs:
+        elapsed = time_ingest(flat_listing_transcript(fan_out))
+        stream_elapsed = time_stream_ingest(flat_listing_transcript(fan_out))
+        results.append((fan_out, elapsed, stream_elapsed))
+        print(f"fan_out={fan_out:>9} ingest={elapsed:.3f}s per_entry={elapsed / fan_out * 1e6:.2f}us "
+              f"stream_ingest={stream_elapsed:.3f}s per_entry={stream_elapsed / fan_out * 1e6:.2f}us")
+    return results
+
+
+def memory_per_node(fs_factory, dir_count):
+    transcript = ("\n".join(nested_transcript(dir_count)) + "\n").encode()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    fs = fs_factory()
+    with fs.bulk_build():
+        CliOutputProcessor(FileSystemState(fs)).process_stream(transcript)
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    node_count = len(transcript.splitlines()) - transcript.count(b"$") + 1
+    return used / node_count
+
+
+def bench_memory(dir_counts):
+    results = []
+    for dir_count in dir_counts:
+        for fs_factory in (FileSystem, CompactFileSystem):
+            per_node = memory_per_node(fs_factory, dir_count)
+            results.append((fs_factory.__name__, dir_count, per_node))
+            print(f"backend={fs_factory.__name__:<17} dirs={dir_count:>9} bytes_per_node={per_node:.1f}")
+    return results
+
+
+def sample_paths(fs, count, seed):
+    # reservoir sampling, so only the sampled nodes pay for building their abs_path
+    rng = random.Random(seed)
+    sample = []
+    stack = [fs.root]
+    seen = 0
+    while stack:
+        node = stack.pop()
+        if len(sample) < count:
+            sample.append(node)
+        else:
+            index = rng.randrange(seen + 1)
+            if index < count:
+                sample[index] = node
+        seen += 1
+        if hasattr(node, "children"):
+            stack.extend(node.children)
+    return [node.abs_path for node in sample]
+
+
+def bench_run(line_count, backend="object", seed=0, find_samples=1_000, query_samples=1_000, **generator_kwargs):
+    """
+    ingests a generated transcript of {line_count} lines into the {backend} FileSystem, then times find and the size
+    queries. meant to run in a fresh process (see bench_suite) so that peak_rss_kb belongs to this run alone
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "transcript.txt")
+        write_transcript(path, line_count, seed=seed, **generator_kwargs)
+        fs = BACKENDS[backend]()
+        start = time.perf_counter()
+        with open(path, "rb") as transcript, fs.bulk_build():
+            CliOutputProcessor(FileSystemState(fs)).process_stream(transcript)
+        ingest_seconds = time.perf_counter() - start
+
+    paths = sample_paths(fs, find_samples, seed)
+    start = time.perf_counter()
+    for path in paths:
+        fs.find(path)
+    find_seconds = (time.perf_counter() - start) / len(paths)
+
+    start = time.perf_counter()
+    fs.directory_size_index()
+    size_index_seconds = time.perf_counter() - start
+    rng = random.Random(seed)
+    thresholds = [rng.randint(0, fs.total_size) for _ in range(query_samples)]
+    start = time.perf_counter()
+    for threshold in thresholds:
+        fs.sum_dir_sizes_at_most(threshold)
+        fs.smallest_dir_size_at_least(threshold)
+    query_seconds = (time.perf_counter() - start) / (2 * len(thresholds))
+
+    return {
+        "backend": backend,
+        "lines": line_count,
+        "seed": seed,
+        "generator": generator_kwargs,
+        "ingest_seconds": ingest_seconds,
+        "lines_per_second": line_count / ingest_seconds,
+        "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "find_seconds": find_seconds,
+        "size_index_seconds": size_index_seconds,
+        "query_seconds": query_seconds,
+    }
+
+
+def bench_suite(line_counts, backends, out=sys.stdout, **kwargs):
+    """
+    one bench_run per line count and backend, each in its own process, written to {out} as JSON lines
+    """
+    results = []
+    for line_count in line_counts:
+        for backend in backends:
+            with concurrent.futures.ProcessPoolExecutor(max_workers=1) as executor:
+                result = executor.submit(bench_run, line_count, backend, **kwargs).result()
+            results.append(result)
+            out.write(json.dumps(result) + "\n")
+            out.flush()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="day7 benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+    fan_out_parser = commands.add_parser("fan-out", help="ingest time of a single flat directory")
+    fan_out_parser.add_argument("fan_outs", type=int, nargs="*", default=[1_000, 10_000, 100_000, 1_000_000])
+    memory_parser = commands.add_parser("memory", help="memory per node of each backend")
+    memory_parser.add_argument("dir_counts", type=int, nargs="*", default=[1_000, 10_000, 100_000])
+    suite_parser = commands.add_parser("suite", help="ingest, find and query timings on generated transcripts")
+    suite_parser.add_argument("--lines", type=int, nargs="+", default=[10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6])
+    suite_parser.add_argument("--backend", nargs="+", choices=sorted(BACKENDS), default=["object"])
+    suite_parser.add_argument("--seed", type=int, default=0)
+    suite_parser.add_argument("--max-depth", type=int, default=8)
+    suite_parser.add_argument("--fan-out", type=int, default=4)
+    suite_parser.add_argument("--files-per-dir", type=int, default=10)
+    suite_parser.add_argument("--collision-rate", type=float, default=0.0)
+    suite_parser.add_argument("--cd-up-max", type=int, default=1)
+    suite_parser.add_argument("--root-jump-rate", type=float, default=0.0)
+    suite_parser.add_argument("--out", type=argparse.FileType("w"), default=sys.stdout)
+    args = parser.parse_args()
+
+    if args.command == "fan-out":
+        bench_fan_out(args.fan_outs)
+    elif args.command == "memory":
+        bench_memory(args.dir_counts)
+    else:
+        bench_suite(args.lines, args.backend, out=args.out, seed=args.seed, max_depth=args.max_depth,
+                    fan_out=args.fan_out, files_per_dir=args.files_per_dir, collision_rate=args.collision_rate,
+                    cd_up_max=args.cd_up_max, root_jump_rate=args.root_jump_rate)
@@ -0,0 +1,427 @@
+#!/usr/bin/env python3
+import array
+import contextlib
+
+from filesystem_full import FileSystemObject, DirectorySizeQueries
+
+FILE = 0
+DIRECTORY = 1
+NO_NODE = -1
+
+
+class CompactFileSystem(DirectorySizeQueries):
+    """
+    a FileSystem backend storing the whole tree in parallel typed arrays, one slot per node, instead of one python
+    object per node. CompactDirectory and CompactFile are thin views over a node index, created on demand
+
+    children form a doubly linked sibling list (first/last child, next/prev sibling) so appends and in place
+    replacements are O(1); (parent, name) lookups go through an open addressing hash table of node indices. the slots
+    of replaced nodes go on a free list and are reused by the next new nodes, so the arrays only grow with the tree.
+    every slot has a generation, bumped when its node is replaced or freed: a view remembers the generation of its
+    node and raises ReferenceError once that node is gone, instead of reading whatever node took the slot since
+    """
+
+    def __init__(self):
+        self._parent = array.array("i")
+        self._name_id = array.array("i")
+        self._size = array.array("q")
+        self._kind = array.array("b")
+        self._first_child = array.array("i")
+        self._last_child = array.array("i")
+        self._next_sibling = array.array("i")
+        self._prev_sibling = array.array("i")
+        self._generation = array.array("I")
+
+        self._names = []
+        self._name_ids = {}
+
+        self._child_table = array.array("i", [NO_NODE]) * 1024
+        self._child_table_used = 0
+        self._free_nodes = []
+
+        self.bulk_building = False
+        self.root = self._view(self._new_node("", DIRECTORY, 0))
+
+    @property
+    def node_count(self):
+        return len(self._kind) - len(self._free_nodes)
+
+    @property
+    def total_size(self):
+        return self.root.size
+
+    def new_directory(self, name):
+        return CompactDirectory(self, self._new_node(name, DIRECTORY, 0))
+
+    def new_file(self, name, size):
+        return CompactFile(self, self._new_node(name, FILE, size))
+
+    def find(self, abs_path):
+        return self.root.find(abs_path)
+
+    def _directory_sizes(self):
+        self.root.size  # finalizes a pending bulk build
+        # walking from the root skips detached nodes such as replaced directories
+        return (self._size[i] for i in self._reachable_directories())
+
+    def _reachable_directories(self):
+        stack = [0]
+        while stack:
+            index = stack.pop()
+            yield index
+            child = self._first_child[index]
+            while child != NO_NODE:
+                if self._kind[child] == DIRECTORY:
+                    stack.append(child)
+                child = self._next_sibling[child]
+
+    def begin_bulk_build(self):
+        self.bulk_building = True
+
+    def finalize_bulk_build(self):
+        if not self.bulk_building:
+            return
+        self.bulk_building = False
+        directories = list(self._reachable_directories())
+        # parents are listed before their children, so walking backwards sizes children first
+        sizes, first_child, next_sibling = self._size, self._first_child, self._next_sibling
+        for index in reversed(directories):
+            total = 0
+            child = first_child[index]
+            while child != NO_NODE:
+                total += sizes[child]
+                child = next_sibling[child]
+            sizes[index] = total
+
+    @contextlib.contextmanager
+    def bulk_build(self):
+        self.begin_bulk_build()
+        try:
+            yield self
+        finally:
+            self.finalize_bulk_build()
+
+    def _view(self, index):
+        if index == NO_NODE:
+            return None
+        return CompactDirectory(self, index) if self._kind[index] == DIRECTORY else CompactFile(self, index)
+
+    def _intern(self, name):
+        name_id = self._name_ids.get(name)
+        if name_id is None:
+            name_id = len(self._names)
+            self._names.append(name)
+            self._name_ids[name] = name_id
+        return name_id
+
+    def _new_node(self, name, kind, size):
+        if self._free_nodes:
+            index = self._free_nodes.pop()
+            self._name_id[index] = self._intern(name)
+            self._size[index] = size
+            self._kind[index] = kind
+            self._first_child[index] = self._last_child[index] = NO_NODE
+            self._next_sibling[index] = self._prev_sibling[index] = NO_NODE
+            return index
+        index = len(self._kind)
+        self._parent.append(NO_NODE)
+        self._name_id.append(self._intern(name))
+        self._size.append(size)
+        self._kind.append(kind)
+        self._first_child.append(NO_NODE)
+        self._last_child.append(NO_NODE)
+        self._next_sibling.append(NO_NODE)
+        self._prev_sibling.append(NO_NODE)
+        self._generation.append(0)
+        return index
+
+    def _retire(self, index):
+        # the node in {index} is gone: views of it go stale, and the slot is reused by a later new node
+        self._generation[index] = (self._generation[index] + 1) & 0xFFFFFFFF
+        self._free_nodes.append(index)
+
+    def _home_slot(self, parent, name_id):
+        return ((parent * 1_000_003) ^ (name_id * 40_503)) & (len(self._child_table) - 1)
+
+    def _slot(self, parent, name_id):
+        """
+        returns the table slot holding the child of {parent} named {name_id}, or the empty slot it would go into
+        """
+        table = self._child_table
+        mask = len(table) - 1
+        slot = self._home_slot(parent, name_id)
+        while True:
+            index = table[slot]
+            if index == NO_NODE or (self._parent[index] == parent and self._name_id[index] == name_id):
+                return slot
+            slot = (slot + 1) & mask
+
+    def _child(self, parent, name):
+        name_id = self._name_ids.get(name)
+        if name_id is None:
+            return NO_NODE
+        return self._child_table[self._slot(parent, name_id)]
+
+    def _grow_child_table(self):
+        self._child_table = array.array("i", [NO_NODE]) * (len(self._child_table) * 2)
+        for index in range(len(self._parent)):
+            if self._parent[index] != NO_NODE:
+                self._child_table[self._slot(self._parent[index], self._name_id[index])] = index
+
+    def _unindex(self, index):
+        """
+        drops the table entry of the attached node {index}, shifting back the entries probed past it so every lookup
+        still finds its node before the first empty slot
+        """
+        table = self._child_table
+        mask = len(table) - 1
+        empty = self._slot(self._parent[index], self._name_id[index])
+        table[empty] = NO_NODE
+        self._child_table_used -= 1
+        slot = empty
+        while True:
+            slot = (slot + 1) & mask
+            moved = table[slot]
+            if moved == NO_NODE:
+                return
+            home = self._home_slot(self._parent[moved], self._name_id[moved])
+            # {moved} can fill the empty slot unless its home lies cyclically in (empty, slot]
+            if (home - empty - 1) & mask >= (slot - empty) & mask:
+                table[empty] = moved
+                table[slot] = NO_NODE
+                empty = slot
+
+    def _free_descendants(self, index):
+        """
+        unlinks every node below {index} and puts it on the free list
+        """
+        stack = [index]
+        while stack:
+            child = self._first_child[stack.pop()]
+            while child != NO_NODE:
+                if self._kind[child] == DIRECTORY:
+                    stack.append(child)
+                self._unindex(child)
+                self._parent[child] = NO_NODE
+                self._retire(child)
+                child = self._next_sibling[child]
+        self._first_child[index] = self._last_child[index] = NO_NODE
+
+    def _detach(self, index):
+        """
+        unlinks the attached node {index} from its parent, whose ancestors lose its size
+        """
+        parent = self._parent[index]
+        prev_sibling, next_sibling = self._prev_sibling[index], self._next_sibling[index]
+        if prev_sibling == NO_NODE:
+            self._first_child[parent] = next_sibling
+        else:
+            self._next_sibling[prev_sibling] = next_sibling
+        if next_sibling == NO_NODE:
+            self._last_child[parent] = prev_sibling
+        else:
+            self._prev_sibling[next_sibling] = prev_sibling
+        self._unindex(index)
+        self._parent[index] = self._prev_sibling[index] = self._next_sibling[index] = NO_NODE
+        self._version += 1
+        self._propagate(parent, -self._size[index])
+
+    def _attach(self, parent, child):
+        """
+        links {child} under {parent}, moving it there if it is attached elsewhere, and returns the size delta of
+        {parent} and the node now holding {child}. like Directory, a same named child is replaced where it stands: its
+        node is reused for the contents of {child}, whose own node is freed along with the replaced descendants. views
+        of the replaced node go stale like those of freed nodes
+        """
+        name_id = self._name_id[child]
+        slot = self._slot(parent, name_id)
+        existing = self._child_table[slot]
+        if existing == child:
+            return 0, child
+        if existing != NO_NODE and self._kind[existing] != self._kind[child]:
+            raise ValueError()
+        if self._parent[child] != NO_NODE:
+            self._detach(child)
+            # the table may have shifted entries back into the slot looked up above
+            slot = self._slot(parent, name_id)
+
+        if existing != NO_NODE:
+            delta = self._size[child] - self._size[existing]
+            self._free_descendants(existing)
+            grandchild = self._first_child[existing] = self._first_child[child]
+            self._last_child[existing] = self._last_child[child]
+            while grandchild != NO_NODE:
+                self._unindex(grandchild)
+                self._parent[grandchild] = existing
+                self._child_table[self._slot(existing, self._name_id[grandchild])] = grandchild
+                self._child_table_used += 1
+                grandchild = self._next_sibling[grandchild]
+            self._size[existing] = self._size[child]
+            self._generation[existing] = (self._generation[existing] + 1) & 0xFFFFFFFF
+            self._first_child[child] = self._last_child[child] = NO_NODE
+            self._retire(child)
+            self._version += 1
+            return delta, existing
+
+        prev_sibling = self._last_child[parent]
+        self._parent[child] = parent
+        self._prev_sibling[child] = prev_sibling
+        self._next_sibling[child] = NO_NODE
+        if prev_sibling == NO_NODE:
+            self._first_child[parent] = child
+        else:
+            self._next_sibling[prev_sibling] = child
+        self._last_child[parent] = child
+        self._child_table[slot] = child
+        self._child_table_used += 1
+        self._version += 1
+        if self._child_table_used * 2 > len(self._child_table):
+            self._grow_child_table()
+        return self._size[child], child
+
+    def _propagate(self, index, delta):
+        if self.bulk_building:
+            return
+        sizes, parents = self._size, self._parent
+        while index != NO_NODE:
+            sizes[index] += delta
+            index = parents[index]
+
+
+class CompactNode(FileSystemObject):
+    __slots__ = ("_fs", "_index", "_generation")
+
+    def __init__(self, fs, index):
+        self._fs = fs
+        self._index = index
+        self._generation = fs._generation[index]
+
+    def __eq__(self, other):
+        return (isinstance(other, CompactNode) and self._fs is other._fs and self._index == other._index
+                and self._generation == other._generation)
+
+    def __hash__(self):
+        return hash((id(self._fs), self._index, self._generation))
+
+    def _node(self):
+        # the index of the node of this view, which must not have been replaced or freed since
+        if self._fs._generation[self._index] != self._generation:
+            raise ReferenceError(f"the node of this {type(self).__name__} was replaced or freed")
+        return self._index
+
+    def _repoint(self, index):
+        # this view now stands for the node in {index}, which took over its contents
+        self._index = index
+        self._generation = self._fs._generation[index]
+
+    @property
+    def name(self):
+        return self._fs._names[self._fs._name_id[self._node()]]
+
+    @property
+    def size(self):
+        return self._fs._size[self._node()]
+
+    @property
+    def parent_dir(self):
+        return self._fs._view(self._fs._parent[self._node()])
+
+    @property
+    def level(self):
+        level = 0
+        parents = self._fs._parent
+        index = parents[self._node()]
+        while index != NO_NODE:
+            level += 1
+            index = parents[index]
+        return level
+
+    def _path_names(self):
+        fs = self._fs
+        names = []
+        index = self._node()
+        while fs._parent[index] != NO_NODE:
+            names.append(fs._names[fs._name_id[index]])
+            index = fs._parent[index]
+        names.reverse()
+        return names
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.abs_path!r})"
+
+
+class CompactFile(CompactNode):
+    __slots__ = ()
+
+    @property
+    def abs_path(self):
+        return "/" + "/".join(self._path_names())
+
+
+class CompactDirectory(CompactNode):
+    __slots__ = ()
+
+    @property
+    def abs_path(self):
+        names = self._path_names()
+        return "/" + "".join(name + "/" for name in names)
+
+    @property
+    def size(self):
+        if self._fs.bulk_building:
+            self._fs.finalize_bulk_build()
+        return self._fs._size[self._node()]
+
+    @property
+    def children(self):
+        fs = self._fs
+        children = []
+        child = fs._first_child[self._node()]
+        while child != NO_NODE:
+            children.append(fs._view(child))
+            child = fs._next_sibling[child]
+        return children
+
+    def add_child(self, child):
+        """
+        attaches {child}, repointing it at the node that holds it now when it replaced a same named child. a node has
+        a single parent, so unlike Directory, which leaves a child attached elsewhere listed (and counted) under its old
+        parent too, {child} is moved: its old parent and that parent's ancestors lose it and its size
+        """
+        index = self._node()
+        delta, child_index = self._fs._attach(index, child._node())
+        child._repoint(child_index)
+        self._fs._propagate(index, delta)
+
+    def add_children(self, children):
+        """
+        add_child for every one of {children}, propagating the size change once
+        """
+        index = self._node()
+        delta = 0
+        try:
+            for child in children:
+                child_delta, child_index = self._fs._attach(index, child._node())
+                child._repoint(child_index)
+                delta += child_delta
+        finally:
+            if delta:
+                self._fs._propagate(index, delta)
+
+    def find(self, path):
+        if path.startswith("/"):
+            own_path = self.abs_path
+            if not path.startswith(own_path):
+                return None
+            path = path[len(own_path):]
+        fs = self._fs
+        names = path.split("/")
+        index = self._node()
+        for name in names[:-1]:
+            index = fs._child(index, name)
+            if index == NO_NODE or fs._kind[index] != DIRECTORY:
+                return None
+        if names[-1] == "":
+            return fs._view(index)
+        index = fs._child(index, names[-1])
+        return fs._view(index) if index != NO_NODE and fs._kind[index] == FILE else None
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+import collections
+import heapq
+import itertools
+import sys
+
+from filesystem_full import FileSystem, FileSystemState, CliOutputProcessor
+
+# the directories at one depth: how many there are, their summed size and how many fall in each power of two size
+# bucket, keyed by size.bit_length() (bucket n holds the sizes in [2**(n-1), 2**n))
+DepthSummary = collections.namedtuple("DepthSummary", ["directories", "total_size", "size_buckets"])
+DuReport = collections.namedtuple("DuReport", ["largest", "depths"])
+
+
+def du_report(fs: FileSystem, top_k=10, max_depth=None) -> DuReport:
+    """
+    the {top_k} largest directories of {fs} as (size, level, abs_path) tuples, largest first, and a DepthSummary per
+    depth, in a single walk. the largest directories are kept in a min heap of at most {top_k} entries and only their
+    paths are built, so the walk needs O(top_k + depth * buckets) memory however big the tree. with {max_depth} the
+    walk does not go below that level
+    """
+    largest = []
+    # per level: [directories, total size, size buckets], turned into DepthSummary tuples at the end
+    depths = {}
+    # breaks size ties in the heap so directories never get compared
+    order = itertools.count()
+    prune = None if max_depth is None else (lambda directory: directory.level >= max_depth)
+    for directory in fs.walk(dirs_only=True, prune=prune):
+        size, level = directory.size, directory.level
+        if len(largest) < top_k:
+            heapq.heappush(largest, (size, next(order), directory))
+        elif top_k and size > largest[0][0]:
+            heapq.heapreplace(largest, (size, next(order), directory))
+        summary = depths.get(level)
+        if summary is None:
+            summary = depths[level] = [0, 0, {}]
+        summary[0] += 1
+        summary[1] += size
+        buckets = summary[2]
+        bucket = size.bit_length()
+        buckets[bucket] = buckets.get(bucket, 0) + 1
+    largest.sort(key=lambda entry: (-entry[0], entry[1]))
+    return DuReport([(size, directory.level, directory.abs_path) for size, _, directory in largest],
+                    {level: DepthSummary(*depths[level]) for level in sorted(depths)})
+
+
+def format_report(report: DuReport):
+    lines = [f"{size:>12} {level:>3} {abs_path}" for size, level, abs_path in report.largest]
+    for level, summary in report.depths.items():
+        buckets = " ".join(f"<2^{bucket}:{count}" for bucket, count in sorted(summary.size_buckets.items()))
+        lines.append(f"depth {level}: {summary.directories} dirs, {summary.total_size} total, {buckets}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("usage: du.py {input-file} [top-k] [max-depth]")
+        exit(1)
+    fs = FileSystem()
+    fs_state = FileSystemState(fs)
+    with open(sys.argv[1], "rb") as transcript, fs_state.bulk_build():
+        CliOutputProcessor(fs_state).process_stream(transcript)
+    top_k = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    max_depth = int(sys.argv[3]) if len(sys.argv) > 3 else None
+    print(format_report(du_report(fs, top_k=top_k, max_depth=max_depth)))
@@ -1,9 +1,26 @@
 #!/usr/bin/env python3
-import collections
+import array
+import bisect
+import contextlib
+import io
+import itertools
 import sys
 
+try:
+    from instrumentation import phase
+except ImportError:
+    # run as a script from this directory, instrumentation.py one directory up is not importable and so no recorder
+    # can be set either
+    def phase(recorder, name):
+        return contextlib.nullcontext()
+
+# set with instrumentation.set_recorder; None when instrumentation is off, which every hook checks first
+_recorder = None
+
 
 class FileSystemObject:
+    __slots__ = ()
+
     @property
     def size(self):
         raise NotImplementedError()
@@ -29,12 +46,15 @@ class FileSystemObject:
 
 
 class File(FileSystemObject):
+    __slots__ = ("_parent_dir", "_name", "_size", "_level", "_abs_path", "_fs")
 
     def __init__(self, name, size):
         self._parent_dir = None
         self._name = name
         self._size = size
         self._level = 0
+        self._abs_path = None
+        self._fs = None
 
     @property
     def size(self):
@@ -46,7 +66,9 @@ class File(FileSystemObject):
 
     @property
     def abs_path(self):
-        return self.parent_dir.abs_path + self.name
+        if self._abs_path is None:
+            self._abs_path = self.parent_dir.abs_path + self.name
+        return self._abs_path
 
     @property
     def level(self):
@@ -55,6 +77,8 @@ class File(FileSystemObject):
     def on_added_to_parent_dir(self, parent_dir):
         self._parent_dir = parent_dir
         self._level = parent_dir.level + 1
+        self._abs_path = None
+        self._fs = parent_dir._fs
 
     @property
     def parent_dir(self):
@@ -62,12 +86,16 @@ class File(FileSystemObject):
 
 
 class Directory(FileSystemObject):
+    __slots__ = ("_parent_dir", "_name", "_children", "_size", "_level", "_abs_path", "_fs")
+
     def __init__(self, name):
         self._parent_dir = None
         self._name = name
-        self._children = []
+        self._children = {}
         self._size = 0
         self._level = 0
+        self._abs_path = None
+        self._fs = None
 
     @property
     def name(self):
@@ -75,7 +103,18 @@ class Directory(FileSystemObject):
 
     @property
     def abs_path(self):
-        return self.parent_dir.abs_path + self.name + "/" if self.parent_dir else "/"
+        if self._abs_path is None:
+            # resolved iteratively (top down) so very deep trees don't hit the recursion limit
+            uncached = []
+            directory = self
+            while directory is not None and directory._abs_path is None:
+                uncached.append(directory)
+                directory = directory._parent_dir
+            path = directory._abs_path if directory is not None else None
+            for directory in reversed(uncached):
+                path = path + directory._name + "/" if path is not None else "/"
+                directory._abs_path = path
+        return self._abs_path
 
     @property
     def level(self):
@@ -83,38 +122,86 @@ class Directory(FileSystemObject):
 
     def add_child(self, child):
         old_size = self._size
+        self._attach(child)
+        self._on_size_changed(old_size)
 
-        existing_index = -1
-        for index, c in enumerate(self._children):
-            if c.name == child.name:
-                existing_index = index
-                break
-        if existing_index != -1:
-            if isinstance(self._children[existing_index], Directory) and isinstance(child, File):
+    def add_children(self, children):
+        """
+        adds all {children} but notifies the parent dir of the size change only once
+        """
+        old_size = self._size
+        try:
+            for child in children:
+                self._attach(child)
+        finally:
+            # children attached before a name collision error are kept, so keep the ancestors in sync with them
+            if self._size != old_size:
+                self._on_size_changed(old_size)
+
+    def _attach(self, child):
+        # children are keyed by name; re-assigning an existing key keeps its original position
+        existing = self._children.get(child.name)
+        if existing is not None:
+            if isinstance(existing, Directory) and isinstance(child, File):
                 raise ValueError()
-            elif isinstance(self._children[existing_index], File) and isinstance(child, Directory):
+            elif isinstance(existing, File) and isinstance(child, Directory):
                 raise ValueError()
-            self._size = self.size + child.size - self._children[existing_index].size
-            self._children[existing_index] = child
+            self._size += child._size - existing._size
         else:
-            self._size += child.size
-            self._children.append(child)
+            self._size += child._size
+        self._children[child.name] = child
         child.on_added_to_parent_dir(self)
-        if self.parent_dir:
-            self.parent_dir.on_child_size_changed(self, old_child_size=old_size)
+        if self._fs is not None:
+            self._fs.on_child_added(self, child, replaced=existing)
 
     def on_added_to_parent_dir(self, parent_dir):
         self._parent_dir = parent_dir
         self._level = parent_dir.level + 1
-
-    def on_child_size_changed(self, child, old_child_size):
-        old_size = self._size
-        self._size += child.size - old_child_size
+        self._abs_path = None
+        self._fs = parent_dir._fs
+        if self._children:
+            self._refresh_descendants()
+
+    def _refresh_descendants(self):
+        # a populated subtree was re-parented: cached paths, levels and the owning fs below it are all stale
+        stack = [self]
+        while stack:
+            directory = stack.pop()
+            for child in directory._children.values():
+                child._level = directory._level + 1
+                child._abs_path = None
+                child._fs = directory._fs
+                if isinstance(child, Directory):
+                    stack.append(child)
+
+    def _on_size_changed(self, old_size):
+        if self._sizes_deferred():
+            return
+        if self._fs is not None and self._fs.size_listeners:
+            self._fs.on_size_changed(self, old_size)
         if self.parent_dir:
             self.parent_dir.on_child_size_changed(self, old_child_size=old_size)
 
+    def on_child_size_changed(self, child, old_child_size):
+        # every ancestor changes by the same amount; walked iteratively so deep trees don't hit the recursion limit
+        delta = child._size - old_child_size
+        if _recorder is not None:
+            _recorder.count("size_propagations", self._level + 1)
+        fs = self._fs if self._fs is not None and self._fs.size_listeners else None
+        directory = self
+        while directory is not None:
+            directory._size += delta
+            if fs is not None:
+                fs.on_size_changed(directory, directory._size - delta)
+            directory = directory._parent_dir
+
+    def _sizes_deferred(self):
+        return self._fs is not None and self._fs.bulk_building
+
     @property
     def size(self):
+        if self._fs is not None and self._fs.bulk_building:
+            self._fs.finalize_bulk_build()
         return self._size
 
     @property
@@ -123,41 +210,403 @@ class Directory(FileSystemObject):
 
     @property
     def children(self):
-        return [c for c in self._children]  # ideally should return a deep copy but no time :-(
+        return list(self._children.values())  # ideally should return a deep copy but no time :-(
+
+    def walk(self, post_order=False, dirs_only=False, prune=None):
+        """
+        yields this directory and everything below it, each directory before its children or, with {post_order}, after
+        them. children come in listing order and are iterated in place, so a walk allocates one iterator per directory
+        it enters and nothing per file. files are skipped with {dirs_only}; a directory for which {prune}(directory) is
+        true is still yielded but not entered
+        """
+        if not post_order:
+            yield self
+        if prune is None or not prune(self):
+            directories = [self]
+            iterators = [iter(self._children.values())]
+            while iterators:
+                for child in iterators[-1]:
+                    if isinstance(child, Directory):
+                        if not post_order:
+                            yield child
+                        if prune is None or not prune(child):
+                            directories.append(child)
+                            iterators.append(iter(child._children.values()))
+                            break
+                        if post_order:
+                            yield child
+                    elif not dirs_only:
+                        yield child
+                else:
+                    iterators.pop()
+                    directory = directories.pop()
+                    if post_order and directory is not self:
+                        yield directory
+        if post_order:
+            yield self
 
     def find(self, path):
         if path.startswith("/"):
             return self._find_absolute(path)
-        return self._find_absolute(self.abs_path + path)
+        return self._find_relative(path)
 
     def _find_absolute(self, abs_path):
-        if self.abs_path == abs_path:
-            return self
-        # avoid unnecessary lookup
-        if self.level > len(abs_path.split("/")[1:-1]):
+        own_path = self.abs_path
+        # only our own subtree is searched
+        if not abs_path.startswith(own_path):
+            return None
+        return self._find_relative(abs_path[len(own_path):])
+
+    def _find_relative(self, rel_path):
+        # walks one path component per level; a trailing "/" means the path names a directory
+        names = rel_path.split("/")
+        if _recorder is not None:
+            _recorder.count("find_components", len(names))
+        node = self
+        for name in names[:-1]:
+            node = node._children.get(name)
+            if not isinstance(node, Directory):
+                return None
+        if names[-1] == "":
+            return node
+        child = node._children.get(names[-1])
+        return child if isinstance(child, File) else None
+
+
+class DirectorySizeIndex:
+    """
+    all directory sizes of a tree, sorted once, with their prefix sums: threshold sums are a single lookup and
+    "smallest directory of at least X" is a bisect
+    """
+
+    def __init__(self, sizes):
+        self._sizes = array.array("q", sorted(sizes))
+        self._prefix_sums = array.array("q", itertools.accumulate(self._sizes, initial=0))
+
+    @classmethod
+    def from_sorted(cls, sorted_sizes, prefix_sums):
+        """
+        wraps already sorted sizes and their prefix sums (any int sequences, e.g. memoryviews) without copying them
+        """
+        index = cls.__new__(cls)
+        index._sizes = sorted_sizes
+        index._prefix_sums = prefix_sums
+        return index
+
+    def __len__(self):
+        return len(self._sizes)
+
+    @property
+    def sizes(self):
+        """
+        the directory sizes in ascending order
+        """
+        return self._sizes
+
+    def sum_at_most(self, max_size):
+        return self._prefix_sums[bisect.bisect_right(self._sizes, max_size)]
+
+    def smallest_at_least(self, min_size):
+        index = bisect.bisect_left(self._sizes, min_size)
+        return self._sizes[index] if index < len(self._sizes) else None
+
+
+class DirectorySizeQueries:
+    """
+    size queries shared by the FileSystem backends. backends provide `total_size`, `_directory_sizes()` and bump
+    `_version` whenever the tree changes; the size index is rebuilt lazily on the first query after a change
+    """
+    _version = 0
+    _size_index = None
+    _size_index_version = -1
+
+    def directory_size_index(self):
+        if self._size_index is None or self._size_index_version != self._version:
+            with phase(_recorder, "size_index"):
+                self._size_index = DirectorySizeIndex(self._directory_sizes())
+            self._size_index_version = self._version
+        return self._size_index
+
+    def sum_dir_sizes_at_most(self, max_size):
+        return self.directory_size_index().sum_at_most(max_size)
+
+    def smallest_dir_size_at_least(self, min_size):
+        return self.directory_size_index().smallest_at_least(min_size)
+
+    def space_to_free(self, disk_size, required_space):
+        return max(required_space - (disk_size - self.total_size), 0)
+
+
+class SortedSizes:
+    """
+    a multiset of sizes kept sorted in buckets of {load} to 2 * {load} sizes, with the largest size and the sum of
+    every bucket. adding or removing a size is a bisect over the bucket maxima and an insort or delete within one
+    bucket, so O(log n + load) instead of the O(n) of keeping one sorted list; a bucket growing past 2 * {load} is split
+    and one shrinking below {load} // 2 merged into its neighbour, a list insert or delete over the n / {load} buckets
+    once every {load} // 2 updates at most. smallest_at_least is O(log n), sum_at_most O(n / {load} + load)
+    """
+
+    def __init__(self, sizes=(), load=512):
+        self._load = load
+        self.reset(sizes)
+
+    def reset(self, sizes):
+        """
+        replaces the contents with {sizes}
+        """
+        sizes = sorted(sizes)
+        self._buckets = [sizes[start:start + self._load] for start in range(0, len(sizes), self._load)]
+        self._maxes = [bucket[-1] for bucket in self._buckets]
+        self._sums = [sum(bucket) for bucket in self._buckets]
+        self._count = len(sizes)
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        return itertools.chain.from_iterable(self._buckets)
+
+    def add(self, size):
+        self._count += 1
+        if not self._buckets:
+            self._buckets.append([size])
+            self._maxes.append(size)
+            self._sums.append(size)
+            return
+        index = bisect.bisect_left(self._maxes, size)
+        if index == len(self._buckets):
+            index -= 1
+            self._maxes[index] = size
+        bisect.insort(self._buckets[index], size)
+        self._sums[index] += size
+        if len(self._buckets[index]) > 2 * self._load:
+            self._split(index)
+
+    def remove(self, size):
+        """
+        removes one {size}, raising KeyError when there is none
+        """
+        index = bisect.bisect_left(self._maxes, size)
+        bucket = self._buckets[index] if index < len(self._buckets) else None
+        position = bisect.bisect_left(bucket, size) if bucket else 0
+        if not bucket or bucket[position] != size:
+            raise KeyError(size)
+        del bucket[position]
+        self._count -= 1
+        self._sums[index] -= size
+        if len(bucket) < self._load // 2 and len(self._buckets) > 1:
+            self._merge(index if index + 1 < len(self._buckets) else index - 1)
+        elif not bucket:
+            del self._buckets[index], self._maxes[index], self._sums[index]
+        elif position == len(bucket):
+            self._maxes[index] = bucket[-1]
+
+    def sum_at_most(self, max_size):
+        index = bisect.bisect_right(self._maxes, max_size)
+        total = sum(self._sums[:index])
+        if index < len(self._buckets):
+            bucket = self._buckets[index]
+            total += sum(bucket[:bisect.bisect_right(bucket, max_size)])
+        return total
+
+    def smallest_at_least(self, min_size):
+        index = bisect.bisect_left(self._maxes, min_size)
+        if index == len(self._buckets):
             return None
-        for child in self._children:
-            found = None
-            if isinstance(child, Directory):
-                found = child.find(abs_path)
-            elif child.abs_path == abs_path:
-                found = child
-            if found is not None:
-                return found
-        return None
-
-
-class FileSystem:
-    def __init__(self):
+        bucket = self._buckets[index]
+        return bucket[bisect.bisect_left(bucket, min_size)]
+
+    def _split(self, index):
+        bucket = self._buckets[index]
+        upper = bucket[self._load:]
+        del bucket[self._load:]
+        self._buckets.insert(index + 1, upper)
+        self._maxes.insert(index, bucket[-1])
+        self._sums.insert(index + 1, sum(upper))
+        self._sums[index] -= self._sums[index + 1]
+
+    def _merge(self, index):
+        # merges the bucket after {index} into it, splitting them again when that makes one too many
+        bucket = self._buckets[index]
+        bucket.extend(self._buckets.pop(index + 1))
+        self._sums[index] += self._sums.pop(index + 1)
+        del self._maxes[index + 1]
+        self._maxes[index] = bucket[-1]
+        if len(bucket) > 2 * self._load:
+            self._split(index)
+
+
+class LiveDirectorySizes:
+    """
+    keeps the sizes of every directory of a FileSystem up to date in a SortedSizes as the tree changes, so "smallest
+    directory of at least X" and threshold sums stay O(log n) without re-scanning the tree. the sums of the
+    directories at most each of {sum_thresholds} are also kept as running totals
+    """
+
+    def __init__(self, fs, sum_thresholds=()):
+        self._fs = fs
+        self._sums = dict.fromkeys(sum_thresholds, 0)
+        self._sizes = SortedSizes()
+        self.on_sizes_recomputed(fs)
+        fs.add_size_listener(self)
+
+    def on_sizes_recomputed(self, fs):
+        self._sizes.reset(fs._directory_sizes())
+        for threshold in self._sums:
+            self._sums[threshold] = self._sizes.sum_at_most(threshold)
+
+    def on_child_added(self, parent_dir, child, replaced):
+        if self._fs.bulk_building:
+            return
+        if replaced is not None:
+            for node in _subtree(replaced):
+                if isinstance(node, Directory):
+                    self._remove(node._size)
+        for node in _subtree(child):
+            if isinstance(node, Directory):
+                self._add(node._size)
+
+    def on_size_changed(self, directory, old_size):
+        self._remove(old_size)
+        self._add(directory._size)
+
+    def _add(self, size):
+        self._sizes.add(size)
+        for threshold in self._sums:
+            if size <= threshold:
+                self._sums[threshold] += size
+
+    def _remove(self, size):
+        self._sizes.remove(size)
+        for threshold in self._sums:
+            if size <= threshold:
+                self._sums[threshold] -= size
+
+    def __len__(self):
+        return len(self._sizes)
+
+    def sum_at_most(self, max_size):
+        if max_size in self._sums:
+            return self._sums[max_size]
+        return self._sizes.sum_at_most(max_size)
+
+    def smallest_at_least(self, min_size):
+        return self._sizes.smallest_at_least(min_size)
+
+
+class FileSystem(DirectorySizeQueries):
+    def __init__(self, index_paths=False):
         self.root = Directory(name="")
+        self.root._fs = self
+        self._path_index = {self.root.abs_path: self.root} if index_paths else None
+        self.bulk_building = False
+        self._version = 0
+        self.size_listeners = []
+
+    def begin_bulk_build(self):
+        """
+        stops propagating size changes up the tree until the build is finalized, either explicitly or by the first
+        read of a directory size
+        """
+        self.bulk_building = True
+
+    def finalize_bulk_build(self):
+        """
+        computes every directory size in a single post-order pass and switches back to incremental size updates
+        """
+        if not self.bulk_building:
+            return
+        self.bulk_building = False
+        sized = 0
+        with phase(_recorder, "finalize"):
+            for directory in self.root.walk(post_order=True, dirs_only=True):
+                directory._size = sum(c._size for c in directory._children.values())
+                sized += 1
+        if _recorder is not None:
+            _recorder.count("bulk_sized_directories", sized)
+        for listener in self.size_listeners:
+            listener.on_sizes_recomputed(self)
+
+    @contextlib.contextmanager
+    def bulk_build(self):
+        self.begin_bulk_build()
+        try:
+            yield self
+        finally:
+            self.finalize_bulk_build()
 
     @property
     def total_size(self):
         return self.root.size
 
+    def new_directory(self, name):
+        if _recorder is not None:
+            _recorder.count("directories_created")
+        return Directory(name)
+
+    def new_file(self, name, size):
+        if _recorder is not None:
+            _recorder.count("files_created")
+        return File(name=name, size=size)
+
+    def walk(self, post_order=False, dirs_only=False, prune=None):
+        """
+        Directory.walk from the root
+        """
+        return self.root.walk(post_order=post_order, dirs_only=dirs_only, prune=prune)
+
     def find(self, abs_path):
+        if _recorder is not None:
+            _recorder.count("finds")
+        if self._path_index is not None:
+            return self._path_index.get(abs_path)
         return self.root.find(abs_path)
 
+    def save_snapshot(self, path):
+        import snapshot
+        snapshot.save_snapshot(self, path)
+
+    @staticmethod
+    def load_snapshot(path):
+        """
+        returns a read only, memory mapped snapshot.MappedFileSystem
+        """
+        import snapshot
+        return snapshot.load_snapshot(path)
+
+    def _directory_sizes(self):
+        self.root.size  # finalizes a pending bulk build
+        return (d._size for d in self.root.walk(dirs_only=True))
+
+    def add_size_listener(self, listener):
+        """
+        {listener} gets on_child_added(parent_dir, child, replaced) for every attach, on_size_changed(directory,
+        old_size) for every directory size change and on_sizes_recomputed(fs) when a bulk build is finalized.
+        size changes are not reported during a bulk build
+        """
+        self.size_listeners.append(listener)
+
+    def on_size_changed(self, directory, old_size):
+        for listener in self.size_listeners:
+            listener.on_size_changed(directory, old_size)
+
+    def on_child_added(self, parent_dir, child, replaced=None):
+        self._version += 1
+        for listener in self.size_listeners:
+            listener.on_child_added(parent_dir, child, replaced)
+        if self._path_index is None:
+            return
+        if replaced is not None:
+            for node in _subtree(replaced):
+                self._path_index.pop(node.abs_path, None)
+        for node in _subtree(child):
+            self._path_index[node.abs_path] = node
+
+
+def _subtree(node):
+    # {node} and everything below it, just {node} for a file
+    return node.walk() if isinstance(node, Directory) else (node,)
+
 
 class FileSystemState:
     def __init__(self, fs):
@@ -171,20 +620,35 @@ class FileSystemState:
         """
         if path == self.cwd.abs_path or path == self.cwd.name:
             return
+        if path == "/":
+            self._cwd = self.fs.root
+            return
         if path == "..":
             if self._cwd == self.fs.root:
                 return
             self._cwd = self._cwd.parent_dir
         else:
-            new_dir = Directory(name=path.strip("/"))
+            new_dir = self.fs.new_directory(path.strip("/"))
             self._cwd.add_child(new_dir)
             self._cwd = new_dir
 
     def new_dir(self, dir_name):
-        self._cwd.add_child(Directory(dir_name))
+        self._cwd.add_child(self.fs.new_directory(dir_name))
 
     def new_file(self, file_name, file_size):
-        self._cwd.add_child(File(name=file_name, size=file_size))
+        self._cwd.add_child(self.fs.new_file(file_name, file_size))
+
+    def add_listing(self, entries):
+        """
+        adds the {entries} of an `ls` of the current dir in one batch. entries are (name, size) pairs with a size of
+        None for directories
+        """
+        fs = self.fs
+        self._cwd.add_children(fs.new_directory(name) if size is None else fs.new_file(name, size)
+                               for name, size in entries)
+
+    def bulk_build(self):
+        return self.fs.bulk_build()
 
     @property
     def cwd(self):
@@ -210,57 +674,82 @@ class CliOutputProcessor:
             size, filename = cmd.split(" ", maxsplit=1)
             self._fs_state.new_file(file_name=filename, file_size=int(size))
 
-
-if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("usage: fs_full.py {input-file}")
-        exit(1)
-    input_file = sys.argv[1]
+    def process_stream(self, source, chunk_size=1 << 20):
+        """
+        processes a whole transcript from {source}: an iterable of lines, a file object opened in text or binary mode,
+        an mmap or a bytes-like object. the entries of each `ls` are buffered and applied as one batch
+        """
+        listing = []
+        for line in iter_transcript_lines(source, chunk_size):
+            if not line:
+                continue
+            if line[0] == "$":
+                if listing:
+                    self._fs_state.add_listing(listing)
+                    listing.clear()
+                if line.startswith("$ cd "):
+                    self._fs_state.cd(line[5:])
+            elif line.startswith("dir "):
+                listing.append((line[4:], None))
+            else:
+                size, _, filename = line.partition(" ")
+                listing.append((filename, int(size)))
+        if listing:
+            self._fs_state.add_listing(listing)
+
+
+def iter_transcript_lines(source, chunk_size=1 << 20):
+    """
+    yields the lines of {source} without their line endings. sources with a `read` method (files, mmaps) are read
+    {chunk_size} bytes at a time and every chunk is decoded and split in one go
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    if not hasattr(source, "read"):
+        for line in source:
+            if isinstance(line, (bytes, bytearray)):
+                line = line.decode()
+            yield line.rstrip("\n")
+        return
+
+    pending = None
+    while True:
+        chunk = source.read(chunk_size)
+        if not chunk:
+            break
+        if pending:
+            chunk = pending + chunk
+        # only split up to the last complete line, the rest is carried over to the next chunk
+        end = chunk.rfind(b"\n" if isinstance(chunk, bytes) else "\n") + 1
+        pending = chunk[end:]
+        if end:
+            complete = chunk[:end - 1]
+            if isinstance(complete, bytes):
+                complete = complete.decode()
+            yield from complete.split("\n")
+    if pending:
+        yield pending.decode() if isinstance(pending, bytes) else pending
+
+
+def solve(input_file):
+    """
+    (sum of the dir sizes of at most 100_000, size of the smallest dir to delete) for the transcript in {input_file}
+    """
     fs = FileSystem()
     fs_state = FileSystemState(fs)
     cli_output_processor = CliOutputProcessor(fs_state)
-    dir_to_delete = {}
-
-    for command in open(input_file, "r"):
-        cli_output_processor.process_command(command.strip("\n"))
-
 
-    def sum_dirs_with_max_100_000():
-        dirs_with_max_100_000 = []
+    with phase(_recorder, "ingest"), open(input_file, "rb") as transcript, fs_state.bulk_build():
+        cli_output_processor.process_stream(transcript)
+    with phase(_recorder, "query"):
+        return (fs.sum_dir_sizes_at_most(100_000),
+                fs.smallest_dir_size_at_least(fs.space_to_free(70_000_000, 30_000_000)))
 
-        q = collections.deque()
-        q.appendleft(fs.root)
-        while len(q) > 0:
-            curr_entry = q.pop()
-            if isinstance(curr_entry, Directory) and curr_entry.size <= 100_000:
-                dirs_with_max_100_000.append(curr_entry)
-            if isinstance(curr_entry, Directory):
-                q.extendleft(curr_entry.children)
 
-        print(f"sum of all dirs below 100_000: {sum([d.size for d in dirs_with_max_100_000], 0)}")
-
-
-    def has_enough_space_for_update():
-        min_deletable_entry = None
-
-        q = collections.deque()
-        q.appendleft(fs.root)
-        free_space = 70000000 - fs.total_size
-        space_to_free = max(30000000 - free_space, 0)
-        while len(q) > 0:
-            cur_entry = q.pop()
-            if not cur_entry:
-                continue
-            if cur_entry.size >= space_to_free and (
-                    min_deletable_entry is None or cur_entry.size < min_deletable_entry.size):
-                min_deletable_entry = cur_entry
-            # only add if we have a chance of finding something better down below!
-            if cur_entry.size > space_to_free and isinstance(cur_entry, Directory):
-                q.extendleft(cur_entry.children)
-
-        print(f"min_size_to_delete: {min_deletable_entry.size}")
-
-
-    sum_dirs_with_max_100_000()
-
-    has_enough_space_for_update()
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("usage: fs_full.py {input-file}")
+        exit(1)
+    sum_at_most, min_size_to_delete = solve(sys.argv[1])
+    print(f"sum of all dirs below 100_000: {sum_at_most}")
+    print(f"min_size_to_delete: {min_size_to_delete}")
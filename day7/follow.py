@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+import contextlib
+import os
+import sys
+import time
+
+from filesystem_full import FileSystem, FileSystemState, CliOutputProcessor, LiveDirectorySizes
+
+
+class TranscriptFollower:
+    """
+    tails a transcript that is still being written: every poll() consumes only the complete lines appended since the
+    last one, keeping the FileSystemState (and so the cwd) and the byte offset between polls. what the transcript
+    already holds at the first poll is built in bulk, later appends update the directory sizes incrementally and
+    {sizes} keeps the size queries live. the transcript is read {chunk_size} bytes at a time, so catching up on a large
+    one does not hold it in memory
+    """
+
+    def __init__(self, path, fs=None, sum_thresholds=(100_000,), chunk_size=1 << 20):
+        self.path = path
+        self.fs = fs if fs is not None else FileSystem()
+        self.fs_state = FileSystemState(self.fs)
+        self.offset = 0
+        self.sum_thresholds = sum_thresholds
+        self.chunk_size = chunk_size
+        self._sizes = None
+        self._cli_output_processor = CliOutputProcessor(self.fs_state)
+
+    @property
+    def sizes(self) -> LiveDirectorySizes:
+        return self._attach_sizes()
+
+    def _attach_sizes(self):
+        if self._sizes is None:
+            self._sizes = LiveDirectorySizes(self.fs, sum_thresholds=self.sum_thresholds)
+        return self._sizes
+
+    def poll(self):
+        """
+        processes the lines appended since the last poll and returns how many there were. a trailing line without a
+        newline is left for the next poll since it may still be being written
+        """
+        with open(self.path, "rb") as transcript:
+            size = os.fstat(transcript.fileno()).st_size
+            if size < self.offset:
+                raise ValueError(f"{self.path} was truncated")
+            end = self._complete_end(transcript, size)
+            if end == self.offset:
+                return 0
+            transcript.seek(self.offset)
+            appended = _Region(transcript, end - self.offset)
+            # catching up on a transcript that is already there would insort every directory size change into the
+            # live sizes, so it is built in bulk and the live sizes are attached (sorted once) afterwards
+            catching_up = self.offset == 0
+            with self.fs_state.bulk_build() if catching_up else contextlib.nullcontext():
+                self._cli_output_processor.process_stream(appended, self.chunk_size)
+        self.offset = end
+        if catching_up:
+            self._attach_sizes()
+        return appended.newlines
+
+    def _complete_end(self, transcript, size):
+        # the end of the last complete line past the offset, looked for backwards from the end a chunk at a time
+        end = size
+        while end > self.offset:
+            start = max(self.offset, end - self.chunk_size)
+            transcript.seek(start)
+            newline = transcript.read(end - start).rfind(b"\n")
+            if newline >= 0:
+                return start + newline + 1
+            end = start
+        return self.offset
+
+    def follow(self, interval=1.0):
+        """
+        polls forever, yielding after every poll that consumed new lines
+        """
+        while True:
+            if self.poll():
+                yield self
+            else:
+                time.sleep(interval)
+
+    def smallest_dir_to_delete(self, disk_size=70_000_000, required_space=30_000_000):
+        return self.sizes.smallest_at_least(self.fs.space_to_free(disk_size, required_space))
+
+
+class _Region:
+    """
+    reads the next {length} bytes of {file} and no further, counting the newlines read
+    """
+
+    def __init__(self, file, length):
+        self._file = file
+        self._left = length
+        self.newlines = 0
+
+    def read(self, size=-1):
+        chunk = self._file.read(self._left if size < 0 else min(size, self._left))
+        self._left -= len(chunk)
+        self.newlines += chunk.count(b"\n")
+        return chunk
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("usage: follow.py {input-file}")
+        exit(1)
+    follower = TranscriptFollower(sys.argv[1])
+    for _ in follower.follow():
+        print(f"offset={follower.offset} sum of all dirs below 100_000: {follower.sizes.sum_at_most(100_000)} "
+              f"min_size_to_delete: {follower.smallest_dir_to_delete()}", flush=True)
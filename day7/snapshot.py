@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+import array
+import bisect
+import collections
+import mmap
+import struct
+import sys
+
+from filesystem_full import DirectorySizeIndex, DirectorySizeQueries, FileSystemObject
+
+MAGIC = b"D7FS"
+VERSION = 1
+# magic, version, byte order, node count, directory count, names blob length
+HEADER = struct.Struct("=4sHcxQQQ")
+
+Section = collections.namedtuple("Section", ["name", "typecode", "length"])
+
+
+def _sections(node_count, dir_count, names_length):
+    """
+    the node tables following the header, in file order. every section starts on an 8 byte boundary
+
+    nodes are stored breadth first with the children of a directory contiguous and sorted by name, so a directory is
+    (first_child, child_count) and name lookups are a bisect over its children
+    """
+    return [
+        Section("parent", "i", node_count),
+        Section("first_child", "i", node_count),
+        Section("child_count", "i", node_count),
+        Section("size", "q", node_count),
+        Section("name_offset", "q", node_count + 1),
+        Section("sorted_dir_sizes", "q", dir_count),
+        Section("dir_size_prefix_sums", "q", dir_count + 1),
+        Section("kind", "B", node_count),
+        Section("names", "B", names_length),
+    ]
+
+
+def _is_directory(node):
+    return hasattr(node, "children")
+
+
+def save_snapshot(fs, path):
+    """
+    writes {fs} (any FileSystem backend) to {path}
+    """
+    nodes = [fs.root]
+    parent, first_child, child_count = array.array("i", [-1]), array.array("i"), array.array("i")
+    size, kind = array.array("q"), array.array("B")
+    names, name_offset = bytearray(), array.array("q", [0])
+    index = 0
+    while index < len(nodes):
+        node = nodes[index]
+        size.append(node.size)
+        names += node.name.encode()
+        name_offset.append(len(names))
+        if _is_directory(node):
+            children = sorted(node.children, key=lambda c: c.name.encode())
+            kind.append(1)
+            first_child.append(len(nodes))
+            child_count.append(len(children))
+            parent.extend(index for _ in children)
+            nodes.extend(children)
+        else:
+            kind.append(0)
+            first_child.append(-1)
+            child_count.append(0)
+        index += 1
+
+    sorted_dir_sizes = array.array("q", sorted(size[i] for i in range(len(nodes)) if kind[i]))
+    dir_size_prefix_sums = array.array("q", [0])
+    for dir_size in sorted_dir_sizes:
+        dir_size_prefix_sums.append(dir_size_prefix_sums[-1] + dir_size)
+    tables = {"parent": parent, "first_child": first_child, "child_count": child_count, "size": size,
+              "name_offset": name_offset, "sorted_dir_sizes": sorted_dir_sizes,
+              "dir_size_prefix_sums": dir_size_prefix_sums, "kind": kind, "names": names}
+
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, sys.byteorder[0].encode(), len(nodes), len(sorted_dir_sizes), len(names)))
+        for section in _sections(len(nodes), len(sorted_dir_sizes), len(names)):
+            f.write(b"\0" * (-f.tell() % 8))
+            f.write(bytes(tables[section.name]))
+
+
+def load_snapshot(path):
+    return MappedFileSystem(path)
+
+
+class MappedFileSystem(DirectorySizeQueries):
+    """
+    a read only FileSystem over a memory mapped snapshot. nothing is copied on load: find and the size queries read
+    the mapped node tables directly and only the nodes they return are wrapped in (lightweight) views
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if len(self._mmap) < HEADER.size:
+                raise ValueError(f"{path} is too short to be a snapshot")
+            magic, version, byte_order, node_count, dir_count, names_length = HEADER.unpack_from(self._mmap)
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"{path} is not a version {VERSION} snapshot")
+            if byte_order != sys.byteorder[0].encode():
+                raise ValueError(f"{path} was written on a machine with a different byte order")
+            spans = []
+            offset = HEADER.size
+            for section in _sections(node_count, dir_count, names_length):
+                offset += -offset % 8
+                end = offset + section.length * struct.calcsize(section.typecode)
+                spans.append((section, offset, end))
+                offset = end
+            if len(self._mmap) < offset:
+                raise ValueError(f"{path} is truncated")
+        except BaseException:
+            self._mmap.close()
+            raise
+
+        view = memoryview(self._mmap)
+        for section, offset, end in spans:
+            setattr(self, "_" + section.name, view[offset:end].cast(section.typecode))
+        self._size_index = DirectorySizeIndex.from_sorted(self._sorted_dir_sizes, self._dir_size_prefix_sums)
+        self.root = self._view(0)
+
+    def close(self):
+        self._size_index = None
+        for section in _sections(0, 0, 0):
+            getattr(self, "_" + section.name).release()
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def node_count(self):
+        return len(self._kind)
+
+    @property
+    def total_size(self):
+        return self._size[0]
+
+    def directory_size_index(self):
+        return self._size_index
+
+    def find(self, abs_path):
+        return self.root.find(abs_path)
+
+    def _view(self, index):
+        if index < 0:
+            return None
+        return MappedDirectory(self, index) if self._kind[index] else MappedFile(self, index)
+
+    def _name(self, index):
+        return self._encoded_name(index).decode()
+
+    def _encoded_name(self, index):
+        return bytes(self._names[self._name_offset[index]:self._name_offset[index + 1]])
+
+    def _child(self, index, name):
+        first, count = self._first_child[index], self._child_count[index]
+        name = name.encode()
+        children = _ChildNames(self, first, count)
+        position = bisect.bisect_left(children, name)
+        if position < count and children[position] == name:
+            return first + position
+        return -1
+
+
+class _ChildNames:
+    # the encoded names of a directory's children as a sequence bisect can search without materializing it
+    __slots__ = ("_fs", "_first", "_count")
+
+    def __init__(self, fs, first, count):
+        self._fs = fs
+        self._first = first
+        self._count = count
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, position):
+        return self._fs._encoded_name(self._first + position)
+
+
+class MappedNode(FileSystemObject):
+    __slots__ = ("_fs", "_index")
+
+    def __init__(self, fs, index):
+        self._fs = fs
+        self._index = index
+
+    def __eq__(self, other):
+        return isinstance(other, MappedNode) and self._fs is other._fs and self._index == other._index
+
+    def __hash__(self):
+        return hash((id(self._fs), self._index))
+
+    @property
+    def name(self):
+        return self._fs._name(self._index)
+
+    @property
+    def size(self):
+        return self._fs._size[self._index]
+
+    @property
+    def parent_dir(self):
+        return self._fs._view(self._fs._parent[self._index])
+
+    @property
+    def level(self):
+        level = 0
+        index = self._fs._parent[self._index]
+        while index >= 0:
+            level += 1
+            index = self._fs._parent[index]
+        return level
+
+    def _path_names(self):
+        names = []
+        index = self._index
+        while self._fs._parent[index] >= 0:
+            names.append(self._fs._name(index))
+            index = self._fs._parent[index]
+        names.reverse()
+        return names
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.abs_path!r})"
+
+
+class MappedFile(MappedNode):
+    __slots__ = ()
+
+    @property
+    def abs_path(self):
+        return "/" + "/".join(self._path_names())
+
+
+class MappedDirectory(MappedNode):
+    __slots__ = ()
+
+    @property
+    def abs_path(self):
+        return "/" + "".join(name + "/" for name in self._path_names())
+
+    @property
+    def children(self):
+        """
+        the children sorted by name
+        """
+        first = self._fs._first_child[self._index]
+        return [self._fs._view(index) for index in range(first, first + self._fs._child_count[self._index])]
+
+    def find(self, path):
+        if path.startswith("/"):
+            own_path = self.abs_path
+            if not path.startswith(own_path):
+                return None
+            path = path[len(own_path):]
+        fs = self._fs
+        names = path.split("/")
+        index = self._index
+        for name in names[:-1]:
+            index = fs._child(index, name)
+            if index < 0 or not fs._kind[index]:
+                return None
+        if names[-1] == "":
+            return fs._view(index)
+        index = fs._child(index, names[-1])
+        return fs._view(index) if index >= 0 and not fs._kind[index] else None
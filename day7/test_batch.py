@@ -0,0 +1,42 @@
+import os
+import tempfile
+import unittest
+from unittest import TestCase
+from batch import summarize_transcripts, merge_transcripts
+from test_filesystem_full import TRANSCRIPT
+
+
+class BatchTestCase(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.paths = []
+        for host, transcript in [("host1", TRANSCRIPT), ("host2", "$ cd /\n$ ls\ndir x\n$ cd x\n$ ls\n10 y.txt\n")]:
+            path = os.path.join(self.tmp_dir.name, host + ".txt")
+            with open(path, "w") as f:
+                f.write(transcript)
+            self.paths.append(path)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_should_summarize_every_transcript_in_order(self):
+        summaries = summarize_transcripts(self.paths, workers=2)
+        self.assertEqual([s.path for s in summaries], self.paths)
+        self.assertEqual([s.total_size for s in summaries], [48381165, 10])
+        self.assertEqual(summaries[0].size_index().sum_at_most(100_000), 95437)
+        self.assertEqual(summaries[0].space_to_free(70_000_000, 30_000_000), 8381165)
+        self.assertEqual(summaries[0].size_index().smallest_at_least(8381165), 24933642)
+        self.assertEqual(summaries[1].size_index().sum_at_most(100_000), 20)
+
+    def test_should_merge_trees_under_per_host_roots(self):
+        fs = merge_transcripts(self.paths, workers=2)
+        self.assertEqual([c.name for c in fs.root.children], ["host1", "host2"])
+        self.assertEqual(fs.total_size, 48381165 + 10)
+        self.assertEqual(fs.find("/host1/a/e/i").size, 584)
+        self.assertEqual(fs.find("/host1/d/").size, 24933642)
+        self.assertEqual(fs.find("/host2/x/y.txt").size, 10)
+        self.assertEqual([c.name for c in fs.find("/host1/").children], ["a", "b.txt", "c.dat", "d"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,138 @@
+import unittest
+from unittest import TestCase
+from compact_filesystem import CompactFileSystem, CompactDirectory, CompactFile
+from filesystem_full import FileSystem, FileSystemState, CliOutputProcessor
+from test_filesystem_full import TRANSCRIPT
+from transcript_generator import transcript_lines
+
+
+def describe(fs):
+    stack, nodes = [fs.root], []
+    while stack:
+        node = stack.pop()
+        nodes.append((node.abs_path, node.size, node.level))
+        if hasattr(node, "children"):
+            stack.extend(node.children)
+    return nodes
+
+
+def ingest(fs, lines):
+    cli_output_processor = CliOutputProcessor(FileSystemState(fs))
+    for line in lines:
+        cli_output_processor.process_command(line)
+    return fs
+
+
+class CompactFileSystemTestCase(TestCase):
+    def test_should_build_same_tree_as_object_backend(self):
+        expected = ingest(FileSystem(), TRANSCRIPT.splitlines())
+        actual = ingest(CompactFileSystem(), TRANSCRIPT.splitlines())
+        self.assertEqual(describe(expected), describe(actual))
+        self.assertEqual(actual.total_size, 48381165)
+
+    def test_should_build_same_tree_in_bulk_build_mode(self):
+        expected = ingest(FileSystem(), TRANSCRIPT.splitlines())
+        fs = CompactFileSystem()
+        with fs.bulk_build():
+            CliOutputProcessor(FileSystemState(fs)).process_stream(TRANSCRIPT.encode())
+        self.assertEqual(describe(expected), describe(fs))
+
+    def test_should_find_nodes(self):
+        fs = ingest(CompactFileSystem(), TRANSCRIPT.splitlines())
+        e = fs.find("/a/e/")
+        self.assertIsInstance(e, CompactDirectory)
+        self.assertEqual(e.size, 584)
+        self.assertEqual(e.parent_dir, fs.find("/a/"))
+        self.assertIsInstance(fs.find("/a/e/i"), CompactFile)
+        self.assertEqual(fs.find("/a/").find("e/i").size, 584)
+        self.assertIsNone(fs.find("/a/e"))
+        self.assertIsNone(fs.find("/a/e/i/"))
+        self.assertIsNone(fs.find("/nope/"))
+
+    def test_should_replace_children_in_place_and_reject_kind_collisions(self):
+        fs = CompactFileSystem()
+        fs.root.add_child(fs.new_file("a.txt", 1))
+        fs.root.add_child(fs.new_directory("b"))
+        fs.root.add_child(fs.new_file("c.txt", 2))
+        fs.root.add_child(fs.new_file("a.txt", 7))
+        self.assertEqual([c.name for c in fs.root.children], ["a.txt", "b", "c.txt"])
+        self.assertEqual(fs.total_size, 9)
+        self.assertRaises(ValueError, lambda: fs.root.add_child(fs.new_file("b", 3)))
+        self.assertEqual(fs.total_size, 9)
+
+    def test_should_answer_size_queries_like_object_backend(self):
+        expected = ingest(FileSystem(), TRANSCRIPT.splitlines())
+        actual = ingest(CompactFileSystem(), TRANSCRIPT.splitlines())
+        for threshold in [0, 584, 100_000, 24933642, 10 ** 9]:
+            self.assertEqual(actual.sum_dir_sizes_at_most(threshold), expected.sum_dir_sizes_at_most(threshold))
+            self.assertEqual(actual.smallest_dir_size_at_least(threshold),
+                             expected.smallest_dir_size_at_least(threshold))
+
+    def test_should_keep_lookups_working_after_table_growth(self):
+        fs = CompactFileSystem()
+        d = fs.new_directory("d")
+        fs.root.add_child(d)
+        d.add_children(fs.new_file(f"f{i}", i) for i in range(5000))
+        self.assertEqual(fs.total_size, sum(range(5000)))
+        self.assertEqual(fs.find("/d/f4321").size, 4321)
+        self.assertEqual(len(d.children), 5000)
+
+    def test_should_reuse_the_node_of_a_replaced_child(self):
+        fs = ingest(CompactFileSystem(), ["$ cd /", "$ ls", "dir x", "10 y"])
+        allocated = len(fs._kind)
+        for _ in range(3):
+            ingest(fs, ["$ cd /", "$ ls", "dir x", "$ cd x", "$ ls", "dir z", "5 f", "$ cd z", "$ ls", "1 g"])
+        expected = ingest(FileSystem(), ["$ cd /", "$ ls", "dir x", "$ cd x", "$ ls", "dir z", "5 f", "$ cd z", "$ ls",
+                                         "1 g", "$ cd /", "$ ls", "10 y"])
+        self.assertEqual(sorted(describe(fs)), sorted(describe(expected)))
+        self.assertEqual(fs.node_count, 6)
+        self.assertLessEqual(len(fs._kind), allocated + 4)
+        self.assertEqual(fs.find("/x/z/g").size, 1)
+
+    def test_should_match_object_backend_on_transcripts_with_collisions(self):
+        for seed in range(5):
+            lines = list(transcript_lines(3000, max_depth=4, fan_out=3, files_per_dir=3, collision_rate=0.3,
+                                          root_jump_rate=0.05, seed=seed))
+            expected = ingest(FileSystem(), lines)
+            actual = ingest(CompactFileSystem(), lines)
+            self.assertEqual(describe(actual), describe(expected), seed)
+            self.assertEqual(actual.node_count, len(describe(expected)))
+            for abs_path, size, _ in describe(expected):
+                self.assertEqual(actual.find(abs_path).size, size, abs_path)
+
+    def test_should_turn_views_of_replaced_and_freed_nodes_stale(self):
+        fs = ingest(CompactFileSystem(), ["$ cd /", "$ ls", "dir x", "3 a", "$ cd x", "$ ls", "dir z", "5 f"])
+        a, x, f, z = fs.find("/a"), fs.find("/x/"), fs.find("/x/f"), fs.find("/x/z/")
+        ingest(fs, ["$ cd /", "$ ls", "dir x", "4 a", "$ cd x", "$ ls", "7 g"])
+        # the new x and a took over the nodes of the old ones, the slots of f and z went to new nodes
+        self.assertEqual(fs.node_count, 4)
+        for view in (a, x, f, z):
+            self.assertRaises(ReferenceError, lambda: view.size)
+            self.assertRaises(ReferenceError, lambda: view.abs_path)
+        self.assertRaises(ReferenceError, x.find, "g")
+        self.assertRaises(ReferenceError, x.add_child, fs.new_file("h", 1))
+        self.assertRaises(ReferenceError, fs.root.add_child, f)
+        self.assertNotEqual(fs.find("/a"), a)
+        self.assertEqual((fs.find("/a").size, fs.find("/x/g").size, fs.total_size), (4, 7, 11))
+
+    def test_should_move_children_attached_elsewhere(self):
+        # a compact node has a single parent, so unlike Directory, which keeps listing a re-parented child under its
+        # old parent, the old parent loses it
+        fs = CompactFileSystem()
+        a, b = fs.new_directory("a"), fs.new_directory("b")
+        fs.root.add_children([a, b])
+        f = fs.new_file("f", 7)
+        a.add_child(f)
+        b.add_child(f)
+        self.assertEqual((a.size, b.size, fs.total_size), (0, 7, 7))
+        self.assertIsNone(fs.find("/a/f"))
+        self.assertEqual(fs.find("/b/f"), f)
+        self.assertEqual(f.parent_dir, b)
+        a.add_child(b)
+        self.assertEqual(fs.find("/a/b/f").size, 7)
+        self.assertEqual([c.name for c in fs.root.children], ["a"])
+        self.assertEqual((a.size, fs.total_size), (7, 7))
+
+
+if __name__ == "__main__":
+    unittest.main()
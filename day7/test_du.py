@@ -0,0 +1,49 @@
+import unittest
+from unittest import TestCase
+from du import DepthSummary, du_report, format_report
+from filesystem_full import FileSystem, FileSystemState, CliOutputProcessor
+from test_filesystem_full import TRANSCRIPT
+from transcript_generator import transcript_lines
+
+
+def build(lines):
+    fs = FileSystem()
+    fs_state = FileSystemState(fs)
+    with fs_state.bulk_build():
+        CliOutputProcessor(fs_state).process_stream(lines)
+    return fs
+
+
+class DuReportTestCase(TestCase):
+    def test_should_report_example(self):
+        report = du_report(build(TRANSCRIPT.splitlines()), top_k=3)
+        self.assertEqual(report.largest, [(48381165, 0, "/"), (24933642, 1, "/d/"), (94853, 1, "/a/")])
+        self.assertEqual(report.depths, {
+            0: DepthSummary(1, 48381165, {26: 1}),
+            1: DepthSummary(2, 25028495, {17: 1, 25: 1}),
+            2: DepthSummary(1, 584, {10: 1}),
+        })
+        self.assertIn("/d/", format_report(report))
+
+    def test_should_match_sorting_every_directory(self):
+        fs = build(transcript_lines(5_000, seed=3))
+        directories = list(fs.walk(dirs_only=True))
+        for top_k in [0, 1, 7, len(directories) + 5]:
+            expected = sorted((d.size for d in directories), reverse=True)[:top_k]
+            self.assertEqual([size for size, _, _ in du_report(fs, top_k=top_k).largest], expected)
+        depths = du_report(fs).depths
+        self.assertEqual(sum(summary.directories for summary in depths.values()), len(directories))
+        for level, summary in depths.items():
+            self.assertEqual(summary.total_size, sum(d.size for d in directories if d.level == level))
+            self.assertEqual(sum(summary.size_buckets.values()), summary.directories)
+
+    def test_should_cap_depth(self):
+        fs = build(transcript_lines(5_000, seed=3))
+        report = du_report(fs, top_k=1_000, max_depth=2)
+        self.assertEqual(list(report.depths), [0, 1, 2])
+        self.assertTrue(all(level <= 2 for _, level, _ in report.largest))
+        self.assertEqual(report.depths[2], du_report(fs).depths[2])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,13 @@
+import io
+import mmap
+import os
+import random
+import tempfile
 import unittest
 from unittest import TestCase
-from filesystem_full import Directory, File, FileSystem, FileSystemState, CliOutputProcessor
+import filesystem_full
+from filesystem_full import Directory, File, FileSystem, FileSystemState, CliOutputProcessor, SortedSizes
+from instrumentation import CountingRecorder, set_recorder
 
 
 class DirectoryTestCase(TestCase):
@@ -75,6 +82,35 @@ class DirectoryTestCase(TestCase):
         self.assertEqual(child_level1.children[0].abs_path, "/child1/bar.txt")
         self.assertEqual(root.size, 8)
 
+    def test_should_keep_child_position_when_replacing_on_name_collisions(self):
+        root = Directory(name="")
+        root.add_child(File(size=1, name="a.txt"))
+        root.add_child(Directory("b"))
+        root.add_child(File(size=2, name="c.txt"))
+        replacement = File(size=7, name="a.txt")
+        root.add_child(replacement)
+        self.assertEqual([c.name for c in root.children], ["a.txt", "b", "c.txt"])
+        self.assertIs(root.children[0], replacement)
+        self.assertEqual(root.size, 9)
+
+    def test_should_raise_value_error_when_file_name_collides_with_dir_name(self):
+        root = Directory(name="")
+        root.add_child(File(name="foo", size=3))
+        self.assertRaises(ValueError, lambda: root.add_child(Directory("foo")))
+        self.assertEqual(root.size, 3)
+
+    def test_add_children_should_propagate_size_once_and_keep_children_added_before_a_collision(self):
+        root = Directory(name="")
+        child = Directory("c1")
+        root.add_child(child)
+        child.add_children([File(size=1, name="a"), File(size=2, name="b")])
+        self.assertEqual(root.size, 3)
+
+        child.add_child(Directory("d"))
+        self.assertRaises(ValueError, lambda: child.add_children([File(size=4, name="e"), File(size=5, name="d")]))
+        self.assertEqual(child.size, 7)
+        self.assertEqual(root.size, 7)
+
     def test_should_raise_value_error_when_dir_name_collides_with_file_name(self):
         root = Directory(name="")
         d1 = Directory("child1")
@@ -195,6 +231,119 @@ class DirectoryTestCase(TestCase):
         child2.add_child(file)
         self.assertEqual(root.find("c1/c2/bar.txt"), file)
 
+    def test_should_not_find_dir_without_trailing_slash_or_file_with_one(self):
+        root = Directory(name="")
+        child = Directory("c1")
+        root.add_child(child)
+        child.add_child(File(size=1, name="foo.txt"))
+        self.assertIsNone(root.find("/c1"))
+        self.assertIsNone(root.find("/c1/foo.txt/"))
+        self.assertIsNone(root.find("c1/foo.txt/bar"))
+
+    def test_should_not_find_absolute_path_outside_own_subtree(self):
+        root = Directory(name="")
+        c1 = Directory("c1")
+        c2 = Directory("c2")
+        root.add_child(c1)
+        root.add_child(c2)
+        self.assertIsNone(c1.find("/c2/"))
+        self.assertEqual(c1.find("/c1/"), c1)
+
+    def test_should_update_cached_abs_path_and_level_when_reparented(self):
+        parent = Directory("parent")
+        child = Directory("child")
+        parent.add_child(child)
+        file = File(size=4, name="foo.txt")
+        child.add_child(file)
+        self.assertEqual(file.abs_path, "/child/foo.txt")
+        self.assertEqual(file.level, 2)
+
+        root = Directory(name="")
+        root.add_child(parent)
+        self.assertEqual(file.abs_path, "/parent/child/foo.txt")
+        self.assertEqual(child.abs_path, "/parent/child/")
+        self.assertEqual(file.level, 3)
+        self.assertEqual(root.find("/parent/child/foo.txt"), file)
+
+
+class FileSystemTestCase(TestCase):
+    def test_indexed_find_should_match_tree_find(self):
+        fs = FileSystem(index_paths=True)
+        c1 = Directory("c1")
+        fs.root.add_child(c1)
+        foo = File(size=3, name="foo.txt")
+        c1.add_child(foo)
+        for path in ["/", "/c1/", "/c1/foo.txt", "/c1", "/nope/"]:
+            self.assertIs(fs.find(path), fs.root.find(path))
+        self.assertEqual(fs.find("/c1/foo.txt"), foo)
+
+    def test_indexed_find_should_follow_replaced_nodes(self):
+        fs = FileSystem(index_paths=True)
+        c1 = Directory("c1")
+        fs.root.add_child(c1)
+        c1.add_child(File(size=3, name="foo.txt"))
+
+        replacement = Directory("c1")
+        bar = File(size=5, name="bar.txt")
+        replacement.add_child(bar)
+        fs.root.add_child(replacement)
+        self.assertEqual(fs.find("/c1/"), replacement)
+        self.assertEqual(fs.find("/c1/bar.txt"), bar)
+        self.assertIsNone(fs.find("/c1/foo.txt"))
+
+    def test_indexed_find_should_see_nodes_added_below_attached_subtree(self):
+        fs = FileSystem(index_paths=True)
+        c1 = Directory("c1")
+        fs.root.add_child(c1)
+        c2 = Directory("c2")
+        c1.add_child(c2)
+        foo = File(size=1, name="foo.txt")
+        c2.add_child(foo)
+        self.assertEqual(fs.find("/c1/c2/foo.txt"), foo)
+
+
+class WalkTestCase(TestCase):
+    def setUp(self):
+        self.fs = FileSystem()
+        CliOutputProcessor(FileSystemState(self.fs)).process_stream(TRANSCRIPT.splitlines())
+
+    def paths(self, nodes):
+        return [node.abs_path for node in nodes]
+
+    def test_should_walk_pre_order(self):
+        self.assertEqual(self.paths(self.fs.walk(dirs_only=True)), ["/", "/a/", "/a/e/", "/d/"])
+        self.assertEqual(self.paths(self.fs.walk())[:6], ["/", "/a/", "/a/e/", "/a/e/i", "/a/f", "/a/g"])
+        self.assertEqual(len(list(self.fs.walk())), 14)
+
+    def test_should_walk_post_order(self):
+        self.assertEqual(self.paths(self.fs.walk(post_order=True, dirs_only=True)), ["/a/e/", "/a/", "/d/", "/"])
+        seen = set()
+        for node in self.fs.walk(post_order=True):
+            if isinstance(node, Directory):
+                self.assertTrue(all(child in seen for child in node.children))
+            seen.add(node)
+        self.assertEqual(len(seen), 14)
+
+    def test_should_not_enter_pruned_directories(self):
+        # the smallest directory of at least 8_381_165, entering only directories that are bigger
+        needed = 8_381_165
+        walk = self.fs.walk(dirs_only=True, prune=lambda d: d.size <= needed)
+        self.assertEqual(min(d.size for d in walk if d.size >= needed), 24_933_642)
+        self.assertEqual(self.paths(self.fs.walk(dirs_only=True, prune=lambda d: d.name == "a")), ["/", "/a/", "/d/"])
+        self.assertEqual(self.paths(self.fs.walk(prune=lambda d: True)), ["/"])
+        self.assertEqual(self.paths(self.fs.walk(post_order=True, prune=lambda d: True)), ["/"])
+
+    def test_should_walk_subtrees_and_deep_trees(self):
+        self.assertEqual(self.paths(self.fs.root.find("/a/").walk(post_order=True)),
+                         ["/a/e/i", "/a/e/", "/a/f", "/a/g", "/a/h.lst", "/a/"])
+        fs = FileSystem()
+        directory = fs.root
+        for _ in range(5_000):
+            child = Directory("d")
+            directory.add_child(child)
+            directory = child
+        self.assertEqual(sum(1 for _ in fs.walk(post_order=True)), 5_001)
+
 
 class FileSystemStateTestCase(TestCase):
     def setUp(self):
@@ -206,6 +355,12 @@ class FileSystemStateTestCase(TestCase):
         self.cli_output_processor.process_command("$ cd /")
         self.assertEqual(self.fs_state.cwd.abs_path, "/")
 
+    def test_should_handle_switching_back_to_root_dir(self):
+        self.cli_output_processor.process_command("$ cd bar")
+        self.cli_output_processor.process_command("$ cd /")
+        self.assertEqual(self.fs_state.cwd, self.fs.root)
+        self.assertEqual([c.name for c in self.fs.root.children], ["bar"])
+
     def test_should_handle_switching_to_dir_one_level_down_creating_dirs_on_the_fly(self):
         self.cli_output_processor.process_command("$ cd /bar")
         self.assertEqual(self.fs_state.cwd.abs_path, "/bar/")
@@ -228,5 +383,240 @@ class FileSystemStateTestCase(TestCase):
         self.assertEqual(self.fs_state.cwd.abs_path, "/test folder/")
 
 
+class BulkBuildTestCase(TestCase):
+    def test_should_defer_sizes_until_finalized(self):
+        fs = FileSystem()
+        fs_state = FileSystemState(fs)
+        fs.begin_bulk_build()
+        fs_state.cd("a")
+        fs_state.new_file("foo.txt", 10)
+        fs_state.cd("b")
+        fs_state.add_listing([("bar.txt", 5), ("c", None)])
+        self.assertEqual(fs.root._size, 0)
+        fs.finalize_bulk_build()
+        self.assertFalse(fs.bulk_building)
+        self.assertEqual(fs.find("/a/").size, 15)
+        self.assertEqual(fs.find("/a/b/").size, 5)
+        self.assertEqual(fs.total_size, 15)
+
+    def test_reading_a_size_should_finalize_the_build(self):
+        fs = FileSystem()
+        fs.begin_bulk_build()
+        child = Directory("a")
+        fs.root.add_child(child)
+        child.add_child(File(size=3, name="foo.txt"))
+        self.assertEqual(child.size, 3)
+        self.assertFalse(fs.bulk_building)
+        self.assertEqual(fs.total_size, 3)
+
+    def test_should_keep_updating_sizes_incrementally_after_the_build(self):
+        fs = FileSystem()
+        with fs.bulk_build():
+            child = Directory("a")
+            fs.root.add_child(child)
+            child.add_child(File(size=3, name="foo.txt"))
+        self.assertEqual(fs.total_size, 3)
+        child.add_child(File(size=4, name="bar.txt"))
+        child.add_child(File(size=1, name="foo.txt"))
+        self.assertEqual(child.size, 5)
+        self.assertEqual(fs.total_size, 5)
+
+    def test_should_handle_trees_deeper_than_the_recursion_limit(self):
+        depth = 12_000
+        fs = FileSystem()
+        fs_state = FileSystemState(fs)
+        with fs_state.bulk_build():
+            for i in range(depth):
+                fs_state.cd(f"d{i}")
+            fs_state.new_file("leaf.txt", 7)
+        leaf_dir = fs_state.cwd
+        self.assertEqual(fs.total_size, 7)
+        self.assertEqual(leaf_dir.level, depth)
+        self.assertTrue(leaf_dir.abs_path.endswith(f"/d{depth - 1}/"))
+        self.assertEqual(fs.find(leaf_dir.abs_path + "leaf.txt").size, 7)
+
+        leaf_dir.add_child(File(size=3, name="other.txt"))
+        self.assertEqual(fs.total_size, 10)
+
+
+class DirectorySizeQueriesTestCase(TestCase):
+    def setUp(self):
+        self.fs = FileSystem()
+        CliOutputProcessor(FileSystemState(self.fs)).process_stream(TRANSCRIPT.splitlines())
+
+    def directory_sizes(self):
+        stack, sizes = [self.fs.root], []
+        while stack:
+            directory = stack.pop()
+            sizes.append(directory.size)
+            stack.extend(c for c in directory.children if isinstance(c, Directory))
+        return sizes
+
+    def test_should_sum_directories_at_most_threshold(self):
+        self.assertEqual(self.fs.sum_dir_sizes_at_most(100_000), 95437)
+        for threshold in [0, 583, 584, 94853, 10 ** 9]:
+            expected = sum(size for size in self.directory_sizes() if size <= threshold)
+            self.assertEqual(self.fs.sum_dir_sizes_at_most(threshold), expected)
+
+    def test_should_list_directory_sizes_in_ascending_order(self):
+        self.assertEqual(list(self.fs.directory_size_index().sizes), sorted(self.directory_sizes()))
+
+    def test_should_find_smallest_directory_at_least_target(self):
+        space_to_free = self.fs.space_to_free(70_000_000, 30_000_000)
+        self.assertEqual(space_to_free, 8381165)
+        self.assertEqual(self.fs.smallest_dir_size_at_least(space_to_free), 24933642)
+        self.assertEqual(self.fs.smallest_dir_size_at_least(584), 584)
+        self.assertIsNone(self.fs.smallest_dir_size_at_least(48381166))
+
+    def test_should_refresh_after_the_tree_changes(self):
+        self.assertEqual(self.fs.sum_dir_sizes_at_most(100_000), 95437)
+        self.fs.find("/a/e/").add_child(File(size=1000, name="new.txt"))
+        self.assertEqual(self.fs.sum_dir_sizes_at_most(100_000), 95437 + 2000)
+        self.fs.find("/a/").add_child(Directory("empty"))
+        self.assertEqual(self.fs.smallest_dir_size_at_least(0), 0)
+
+
+TRANSCRIPT = """$ cd /
+$ ls
+dir a
+14848514 b.txt
+8504156 c.dat
+dir d
+$ cd a
+$ ls
+dir e
+29116 f
+2557 g
+62596 h.lst
+$ cd e
+$ ls
+584 i
+$ cd ..
+$ cd ..
+$ cd d
+$ ls
+4060174 j
+8033020 d.log
+5626152 d.ext
+7214296 k
+"""
+
+
+class SortedSizesTestCase(TestCase):
+    def test_should_match_a_sorted_list(self):
+        rng = random.Random(0)
+        for load in [1, 2, 3, 512]:
+            expected = sorted(rng.randrange(50) for _ in range(20))
+            sizes = SortedSizes(expected, load=load)
+            for _ in range(2000):
+                if expected and rng.random() < 0.5:
+                    size = rng.choice(expected)
+                    expected.remove(size)
+                    sizes.remove(size)
+                else:
+                    size = rng.randrange(60)
+                    expected.append(size)
+                    expected.sort()
+                    sizes.add(size)
+                self.assertEqual(list(sizes), expected)
+                self.assertEqual(len(sizes), len(expected))
+                threshold = rng.randrange(-1, 62)
+                self.assertEqual(sizes.sum_at_most(threshold), sum(size for size in expected if size <= threshold))
+                self.assertEqual(sizes.smallest_at_least(threshold),
+                                 min((size for size in expected if size >= threshold), default=None))
+                self.assertTrue(all(0 < len(bucket) <= 2 * load for bucket in sizes._buckets))
+
+    def test_should_reject_removing_missing_sizes(self):
+        sizes = SortedSizes([3, 5])
+        self.assertRaises(KeyError, sizes.remove, 4)
+        self.assertRaises(KeyError, sizes.remove, 6)
+        sizes.remove(3)
+        sizes.remove(5)
+        self.assertRaises(KeyError, sizes.remove, 5)
+        self.assertEqual((len(sizes), sizes.sum_at_most(10), sizes.smallest_at_least(0)), (0, 0, None))
+
+
+class ProcessStreamTestCase(TestCase):
+    def process_lines(self):
+        fs = FileSystem()
+        cli_output_processor = CliOutputProcessor(FileSystemState(fs))
+        for line in TRANSCRIPT.splitlines():
+            cli_output_processor.process_command(line)
+        return fs
+
+    def process_stream(self, source, **kwargs):
+        fs = FileSystem()
+        CliOutputProcessor(FileSystemState(fs)).process_stream(source, **kwargs)
+        return fs
+
+    def assertSameTree(self, expected, actual):
+        def describe(fs):
+            stack, nodes = [fs.root], []
+            while stack:
+                node = stack.pop()
+                nodes.append((node.abs_path, node.size))
+                if isinstance(node, Directory):
+                    stack.extend(node.children)
+            return nodes
+
+        self.assertEqual(describe(expected), describe(actual))
+
+    def test_should_build_same_tree_as_line_by_line_processing(self):
+        expected = self.process_lines()
+        self.assertEqual(expected.total_size, 48381165)
+        self.assertSameTree(expected, self.process_stream(TRANSCRIPT.splitlines()))
+        self.assertSameTree(expected, self.process_stream(TRANSCRIPT.encode()))
+        self.assertSameTree(expected, self.process_stream(io.StringIO(TRANSCRIPT)))
+
+    def test_should_handle_lines_split_across_chunks(self):
+        expected = self.process_lines()
+        for chunk_size in [1, 7, 64]:
+            self.assertSameTree(expected, self.process_stream(io.BytesIO(TRANSCRIPT.encode()), chunk_size=chunk_size))
+
+    def test_should_handle_missing_trailing_newline(self):
+        self.assertSameTree(self.process_lines(), self.process_stream(TRANSCRIPT.rstrip("\n").encode(), chunk_size=5))
+
+    def test_should_read_from_mmap(self):
+        with tempfile.TemporaryFile() as f:
+            f.write(TRANSCRIPT.encode())
+            f.flush()
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                self.assertSameTree(self.process_lines(), self.process_stream(mapped, chunk_size=16))
+
+
+class InstrumentationTestCase(TestCase):
+    def setUp(self):
+        self.recorder = CountingRecorder()
+        set_recorder(filesystem_full, self.recorder)
+        self.addCleanup(set_recorder, filesystem_full, None)
+
+    def test_should_report_phases_and_counters_of_solve(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "input.txt")
+            with open(path, "w") as f:
+                f.write(TRANSCRIPT)
+            self.assertEqual(filesystem_full.solve(path), (95437, 24933642))
+        self.assertEqual(self.recorder.phases, ["finalize", "ingest", "size_index", "query"])
+        self.assertEqual(self.recorder.counters["files_created"], 10)
+        self.assertEqual(self.recorder.counters["bulk_sized_directories"], 4)
+
+    def test_should_count_size_propagations_and_find_components(self):
+        fs = FileSystem()
+        fs_state = FileSystemState(fs)
+        fs_state.cd("a")
+        fs_state.cd("b")
+        fs_state.new_file("f", 10)
+        # the ancestors above the directory the child was added to: / for b, then /a and / for f
+        self.assertEqual(self.recorder.counters["size_propagations"], 1 + 2)
+        self.assertIsNotNone(fs.find("/a/b/f"))
+        self.assertEqual(self.recorder.counters["finds"], 1)
+        self.assertEqual(self.recorder.counters["find_components"], 3)
+
+    def test_should_stop_reporting_when_recorder_is_removed(self):
+        set_recorder(filesystem_full, None)
+        FileSystemState(FileSystem()).new_file("f", 10)
+        self.assertEqual(self.recorder.counters, {})
+
+
 if __name__ == "__main__":
     unittest.main()
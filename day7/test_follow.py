@@ -0,0 +1,119 @@
+import os
+import tempfile
+import tracemalloc
+import unittest
+from unittest import TestCase
+from follow import TranscriptFollower
+import filesystem_full
+from filesystem_full import File
+from instrumentation import CountingRecorder, set_recorder
+from test_filesystem_full import TRANSCRIPT
+
+
+class TranscriptFollowerTestCase(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "transcript.txt")
+        open(self.path, "w").close()
+        self.follower = TranscriptFollower(self.path)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def append(self, text):
+        with open(self.path, "a") as f:
+            f.write(text)
+
+    def assertLiveSizesMatchRescan(self):
+        fs = self.follower.fs
+        for threshold in [0, 584, 100_000, 10 ** 9]:
+            self.assertEqual(self.follower.sizes.sum_at_most(threshold), fs.sum_dir_sizes_at_most(threshold))
+            self.assertEqual(self.follower.sizes.smallest_at_least(threshold), fs.smallest_dir_size_at_least(threshold))
+
+    def test_should_consume_appended_lines_only(self):
+        split = TRANSCRIPT.index("$ cd e")
+        self.append(TRANSCRIPT[:split])
+        self.assertEqual(self.follower.poll(), 12)
+        self.assertEqual(self.follower.fs_state.cwd.abs_path, "/a/")
+        self.assertLiveSizesMatchRescan()
+        self.assertEqual(self.follower.poll(), 0)
+
+        self.append(TRANSCRIPT[split:])
+        self.assertEqual(self.follower.poll(), len(TRANSCRIPT[split:].splitlines()))
+        self.assertEqual(self.follower.fs.total_size, 48381165)
+        self.assertEqual(self.follower.offset, len(TRANSCRIPT))
+        self.assertEqual(self.follower.smallest_dir_to_delete(), 24933642)
+        self.assertEqual(self.follower.sizes.sum_at_most(100_000), 95437)
+        self.assertLiveSizesMatchRescan()
+
+    def test_should_wait_for_partial_lines_to_complete(self):
+        self.append("$ cd /\n$ ls\n123")
+        self.follower.poll()
+        self.assertEqual(self.follower.fs.total_size, 0)
+        self.append("4 a.txt\n")
+        self.follower.poll()
+        self.assertEqual(self.follower.fs.total_size, 1234)
+        self.assertEqual(self.follower.sizes.sum_at_most(100_000), 1234)
+
+    def test_should_track_replacements_and_direct_tree_changes(self):
+        self.append(TRANSCRIPT)
+        self.follower.poll()
+        self.append("$ cd /\n$ ls\n1 b.txt\ndir a\n$ cd d\n$ ls\n5 j\n")
+        self.follower.poll()
+        self.assertEqual(self.follower.fs.find("/a/").size, 0)
+        self.assertLiveSizesMatchRescan()
+        self.follower.fs.find("/d/").add_child(File(size=3, name="new"))
+        self.assertLiveSizesMatchRescan()
+
+    def test_should_read_in_chunks_across_partial_lines(self):
+        split = TRANSCRIPT.index("14848514") + 3
+        for chunk_size in [1, 7, 64]:
+            path = os.path.join(self.tmp_dir.name, f"chunks-{chunk_size}.txt")
+            follower = TranscriptFollower(path, chunk_size=chunk_size)
+            with open(path, "w") as f:
+                f.write(TRANSCRIPT[:split])
+            self.assertEqual(follower.poll(), TRANSCRIPT[:split].count("\n"))
+            with open(path, "a") as f:
+                f.write(TRANSCRIPT[split:])
+            self.assertEqual(follower.poll(), TRANSCRIPT[split:].count("\n"))
+            self.assertEqual(follower.offset, len(TRANSCRIPT))
+            self.assertEqual((follower.fs.total_size, follower.smallest_dir_to_delete()), (48381165, 24933642))
+
+    def test_should_not_hold_the_transcript_in_memory(self):
+        # a 510 KB transcript listing the same file over and over, so the tree itself stays tiny
+        self.append("$ cd /\n$ ls\n1 a\n" * 30_000)
+        self.follower = TranscriptFollower(self.path, chunk_size=1 << 14)
+        tracemalloc.start()
+        self.addCleanup(tracemalloc.stop)
+        self.assertEqual(self.follower.poll(), 90_000)
+        self.assertLess(tracemalloc.get_traced_memory()[1], 1 << 18)
+        self.assertEqual(self.follower.fs.total_size, 1)
+
+    def test_should_catch_up_in_bulk_and_follow_appends_incrementally(self):
+        recorder = CountingRecorder()
+        set_recorder(filesystem_full, recorder)
+        self.addCleanup(set_recorder, filesystem_full, None)
+        split = TRANSCRIPT.index("$ cd d")
+        self.append(TRANSCRIPT[:split])
+        self.follower.poll()
+        self.assertEqual(recorder.counters["size_propagations"], 0)
+        self.assertEqual(recorder.counters["bulk_sized_directories"], 4)
+        self.assertLiveSizesMatchRescan()
+
+        self.append(TRANSCRIPT[split:])
+        self.follower.poll()
+        self.assertFalse(self.follower.fs.bulk_building)
+        self.assertGreater(recorder.counters["size_propagations"], 0)
+        self.assertEqual(recorder.counters["bulk_sized_directories"], 4)
+        self.assertEqual(self.follower.sizes.sum_at_most(100_000), 95437)
+        self.assertLiveSizesMatchRescan()
+
+    def test_should_reject_truncated_transcripts(self):
+        self.append(TRANSCRIPT)
+        self.follower.poll()
+        open(self.path, "w").close()
+        self.assertRaises(ValueError, self.follower.poll)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import os
+import tempfile
+import unittest
+from unittest import TestCase
+from compact_filesystem import CompactFileSystem
+from filesystem_full import FileSystem, FileSystemState, CliOutputProcessor
+from snapshot import HEADER, MappedDirectory, MappedFile
+from test_filesystem_full import TRANSCRIPT
+
+
+class SnapshotTestCase(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "fs.snapshot")
+        self.fs = FileSystem()
+        CliOutputProcessor(FileSystemState(self.fs)).process_stream(TRANSCRIPT.splitlines())
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_should_round_trip_the_tree(self):
+        self.fs.save_snapshot(self.path)
+        with FileSystem.load_snapshot(self.path) as mapped:
+            self.assertEqual(mapped.node_count, 14)
+            self.assertEqual(mapped.total_size, self.fs.total_size)
+            stack = [self.fs.root]
+            while stack:
+                node = stack.pop()
+                found = mapped.find(node.abs_path)
+                self.assertIsInstance(found, MappedDirectory if hasattr(node, "children") else MappedFile)
+                self.assertEqual((found.abs_path, found.name, found.size, found.level),
+                                 (node.abs_path, node.name, node.size, node.level))
+                if hasattr(node, "children"):
+                    stack.extend(node.children)
+                    self.assertEqual([c.name for c in found.children], sorted(c.name for c in node.children))
+
+    def test_should_answer_queries_from_the_mapped_file(self):
+        self.fs.save_snapshot(self.path)
+        with FileSystem.load_snapshot(self.path) as mapped:
+            self.assertEqual(mapped.sum_dir_sizes_at_most(100_000), 95437)
+            self.assertEqual(mapped.smallest_dir_size_at_least(mapped.space_to_free(70_000_000, 30_000_000)),
+                             24933642)
+            self.assertIsNone(mapped.find("/a/e"))
+            self.assertIsNone(mapped.find("/a/e/i/"))
+            self.assertIsNone(mapped.find("/zzz/"))
+            self.assertEqual(mapped.find("/a/").find("e/i").size, 584)
+            self.assertEqual(mapped.find("/a/e/").parent_dir, mapped.find("/a/"))
+
+    def test_should_save_any_backend(self):
+        fs = CompactFileSystem()
+        CliOutputProcessor(FileSystemState(fs)).process_stream(TRANSCRIPT.splitlines())
+        fs.root.add_child(fs.new_file("ünïcode.txt", 3))
+        FileSystem.save_snapshot(fs, self.path)
+        with FileSystem.load_snapshot(self.path) as mapped:
+            self.assertEqual(mapped.total_size, 48381168)
+            self.assertEqual(mapped.find("/ünïcode.txt").size, 3)
+
+    def test_should_reject_other_files(self):
+        with open(self.path, "wb") as f:
+            f.write(b"\0" * 64)
+        self.assertRaises(ValueError, lambda: FileSystem.load_snapshot(self.path))
+
+    def test_should_reject_short_and_truncated_files(self):
+        self.fs.save_snapshot(self.path)
+        with open(self.path, "rb") as f:
+            data = f.read()
+        for length in (4, HEADER.size - 1, HEADER.size, len(data) - 1):
+            with open(self.path, "wb") as f:
+                f.write(data[:length])
+            self.assertRaises(ValueError, lambda: FileSystem.load_snapshot(self.path))
+
+
+if __name__ == "__main__":
+    unittest.main()
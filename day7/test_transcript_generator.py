@@ -0,0 +1,34 @@
+import unittest
+from unittest import TestCase
+from filesystem_full import FileSystem, FileSystemState, CliOutputProcessor
+from transcript_generator import transcript_lines
+
+
+class TranscriptGeneratorTestCase(TestCase):
+    def test_should_be_deterministic_and_exactly_line_count_long(self):
+        lines = list(transcript_lines(5_000, seed=3, collision_rate=0.2))
+        self.assertEqual(len(lines), 5_000)
+        self.assertEqual(lines, list(transcript_lines(5_000, seed=3, collision_rate=0.2)))
+        self.assertNotEqual(lines, list(transcript_lines(5_000, seed=4, collision_rate=0.2)))
+
+    def test_should_generate_parsable_transcripts_within_max_depth(self):
+        fs = FileSystem()
+        fs_state = FileSystemState(fs)
+        cli_output_processor = CliOutputProcessor(fs_state)
+        deepest = 0
+        for line in transcript_lines(20_000, max_depth=5, collision_rate=0.1, cd_up_max=3, root_jump_rate=0.05):
+            cli_output_processor.process_command(line)
+            deepest = max(deepest, fs_state.cwd.level)
+        self.assertEqual(deepest, 5)
+        self.assertGreater(fs.total_size, 0)
+
+    def test_should_exercise_collisions_and_cd_patterns(self):
+        lines = list(transcript_lines(20_000, collision_rate=0.2, cd_up_max=3, root_jump_rate=0.05))
+        entries = [line.split(" ", 1)[1] for line in lines if not line.startswith("$")]
+        self.assertLess(len(set(entries)), len(entries))
+        self.assertIn("$ cd ..", lines)
+        self.assertGreater(lines.count("$ cd /"), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+import itertools
+import random
+import sys
+
+
+def generate_transcript(max_depth=8, fan_out=4, files_per_dir=10, collision_rate=0.0, cd_up_max=1,
+                        root_jump_rate=0.0, seed=0):
+    """
+    yields an endless synthetic terminal transcript; the same arguments always yield the same lines
+
+    every visited directory is listed with up to {files_per_dir} files and, above {max_depth}, up to {fan_out} sub dirs.
+    a listed sub dir is entered next; when the cwd has none left we go up 1 to {cd_up_max} levels, or back to the
+    root with probability {root_jump_rate}, skipping whatever was left unvisited on the way. with probability
+    {collision_rate} a listing entry reuses the name of an earlier entry of the same kind (a replacement)
+    """
+    rng = random.Random(seed)
+    serial = 0
+    # one entry per directory on the cwd path: the sub dirs listed in it and not entered yet
+    pending = []
+    yield "$ cd /"
+    while True:
+        yield "$ ls"
+        file_names, dir_names = [], []
+        for _ in range(rng.randint(0, files_per_dir)):
+            if file_names and rng.random() < collision_rate:
+                name = rng.choice(file_names)
+            else:
+                serial += 1
+                name = f"f{serial}.{rng.choice(('txt', 'log', 'dat', 'bin'))}"
+                file_names.append(name)
+            yield f"{rng.randint(1, 300_000)} {name}"
+        for _ in range(rng.randint(0, fan_out) if len(pending) < max_depth else 0):
+            if dir_names and rng.random() < collision_rate:
+                name = rng.choice(dir_names)
+            else:
+                serial += 1
+                name = f"d{serial}"
+                dir_names.append(name)
+            yield f"dir {name}"
+        pending.append(dir_names)
+
+        if not pending[-1] and len(pending) > 1:
+            if rng.random() < root_jump_rate:
+                del pending[1:]
+                yield "$ cd /"
+            else:
+                for _ in range(rng.randint(1, cd_up_max)):
+                    if len(pending) == 1:
+                        break
+                    pending.pop()
+                    yield "$ cd .."
+            while not pending[-1] and len(pending) > 1:
+                pending.pop()
+                yield "$ cd .."
+        if pending[-1]:
+            yield f"$ cd {pending[-1].pop(0)}"
+        else:
+            # back at the root with everything visited: list it again, growing the tree with fresh entries
+            pending.pop()
+
+
+def transcript_lines(line_count, **kwargs):
+    """
+    the first {line_count} lines of generate_transcript(**kwargs)
+    """
+    return itertools.islice(generate_transcript(**kwargs), line_count)
+
+
+def write_transcript(path, line_count, **kwargs):
+    with open(path, "w") as f:
+        for line in transcript_lines(line_count, **kwargs):
+            f.write(line)
+            f.write("\n")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("usage: transcript_generator.py {output-file} {line-count} [seed]")
+        exit(1)
+    write_transcript(sys.argv[1], int(sys.argv[2]), seed=int(sys.argv[3]) if len(sys.argv) > 3 else 0)
@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+import array
+import hashlib
+import mmap
+import struct
+import sys
+
+from treetop_treehouse import Grid
+
+MAGIC = b"D8IX"
+VERSION = 3
+# magic, version, byte order, rows, columns, block size, digest of the heights the index was built from
+HEADER = struct.Struct("=4sHcxQQQ16s")
+# the side of the square blocks whose maxima the sparse table is built over: 32 keeps the table of a 10k x 10k grid
+# around 60 MB and the strip tables at 5/16 of the scores
+BLOCK = 32
+# the tables with one entry per cell, in file order
+CELL_TABLES = ("visible_prefix", "scores")
+
+
+def grid_digest(grid: Grid) -> bytes:
+    """
+    a digest of the heights of {grid}, stored in index files to tell whether they still match a grid
+    """
+    digest = hashlib.blake2b(struct.pack("=QQ", grid.row_count, grid.column_count if grid.row_count else 0),
+                             digest_size=16)
+    for row in grid.rows:
+        digest.update(bytes(row))
+    return digest.digest()
+
+
+def _levels(length):
+    # sparse table levels along an axis of {length} cells: spans 1, 2, 4 .. up to {length}
+    return max(length.bit_length(), 1)
+
+
+def _block_count(length, block):
+    return -(-length // block)
+
+
+def _strip_levels(block):
+    # strip table levels for pieces of less than {block} cells: spans 1, 2, 4 .. up to block - 1
+    return max((block - 1).bit_length(), 1)
+
+
+def _full_blocks(first, last, length, block):
+    """
+    the blocks [start, end) lying entirely within [first, last) of an axis of {length} cells, the last (short) block
+    included when {last} reaches the end of the axis
+    """
+    return -(-first // block), last // block if last < length else _block_count(length, block)
+
+
+def _cover(first, last, length, block):
+    """
+    splits [first, last) of an axis of {length} cells into the blocks entirely within it, as a (first block, last
+    block) pair or None when there are none, and the pieces of less than a block left over, each within one block
+    """
+    first_block, last_block = _full_blocks(first, last, length, block)
+    if first_block < last_block:
+        start, end = first_block * block, min(last_block * block, length)
+        return (first_block, last_block), [(a, b) for a, b in ((first, start), (end, last)) if a < b]
+    # without a whole block, [first, last) reaches into two blocks at most
+    pieces = []
+    while first < last:
+        end = min(last, (first // block + 1) * block)
+        pieces.append((first, end))
+        first = end
+    return None, pieces
+
+
+def _sections(rows, columns, block):
+    """
+    the tables following the header, in file order, all int64: the CELL_TABLES, the row strip then the column strip
+    levels, then one sparse table level over the block maxima per (row level, column level) pair
+    """
+    block_rows, block_columns = _block_count(rows, block), _block_count(columns, block)
+    sections = [("visible_prefix", (rows + 1) * (columns + 1)), ("scores", rows * columns)]
+    sections.extend((f"row_strip_{level}", rows * block_columns) for level in range(_strip_levels(block)))
+    sections.extend((f"column_strip_{level}", block_rows * columns) for level in range(_strip_levels(block)))
+    for row_level in range(_levels(block_rows)):
+        for col_level in range(_levels(block_columns)):
+            sections.append((f"block_max_{row_level}_{col_level}", block_rows * block_columns))
+    return sections
+
+
+class GridIndex:
+    """
+    rectangle queries over the visibility and scenic scores of a grid
+
+    visible_prefix[r * (columns + 1) + c] is the number of visible trees in rows [0, r) and columns [0, c), so the count
+    in a rectangle is four lookups. for the best score the grid is cut into {block} x {block} blocks, rows of blocks
+    making bands and columns of blocks block columns. block_max[row_level][col_level][r * block_columns + c] is the best
+    score of the 2**row_level by 2**col_level blocks starting at block (r, c), so the blocks entirely inside a rectangle
+    are covered by four (overlapping) entries. the pieces of less than a block left along its sides, or making up a
+    rectangle too thin to hold a whole block, come from 1D sparse tables within the blocks: row_strips[level][r *
+    block_columns + c] is the best score of block column c over the 2**level rows from r, column_strips[level][band *
+    columns + c] that of the band over the 2**level columns from c, two entries per block along the piece. only the
+    pieces where two sides meet, within one block each, are scanned. the sparse table takes O(rows * columns *
+    log(rows / block) * log(columns / block) / block**2) space and the strip tables 2 * rows * columns * log(block) /
+    block, built once and kept in an index file for later runs
+    """
+
+    def __init__(self, rows, columns, block, digest, tables, row_strips, column_strips, block_max):
+        self.rows = rows
+        self.columns = columns
+        self.block = block
+        self.digest = digest
+        # the CELL_TABLES by name
+        self._tables = tables
+        self._row_strips = row_strips
+        self._column_strips = column_strips
+        self._block_max = block_max
+        self._mmap = None
+
+    @classmethod
+    def from_grid(cls, grid: Grid, block=BLOCK) -> "GridIndex":
+        rows = grid.row_count
+        columns = grid.column_count if rows else 0
+        stride = columns + 1
+        visible_prefix = array.array("q", bytes(8 * (rows + 1) * stride))
+        for row_index, visible in enumerate(grid.visibility_mask()):
+            above, start = row_index * stride, (row_index + 1) * stride
+            running = 0
+            for col in range(columns):
+                running += int(visible[col])
+                visible_prefix[start + col + 1] = visible_prefix[above + col + 1] + running
+
+        scores = array.array("q")
+        for row_scores in grid.scenic_scores():
+            scores.extend(int(score) for score in row_scores)
+        block_rows, block_columns = _block_count(rows, block), _block_count(columns, block)
+        # scores are never negative, so zeros are a neutral start for the maxima
+        row_block_max = array.array("q")
+        band_column_max = array.array("q", bytes(8 * block_rows * columns))
+        for row_index in range(rows):
+            row = scores[row_index * columns:(row_index + 1) * columns]
+            row_block_max.extend(max(row[col:col + block]) for col in range(0, columns, block))
+            band = row_index // block * columns
+            band_column_max[band:band + columns] = array.array("q", map(max, band_column_max[band:band + columns], row))
+        row_strips, column_strips = [row_block_max], [band_column_max]
+        for level in range(1, _strip_levels(block)):
+            row_strips.append(_widen(row_strips[-1], rows, block_columns, (1 << (level - 1)) * block_columns,
+                                     along_rows=True))
+            column_strips.append(_widen(column_strips[-1], block_rows, columns, 1 << (level - 1)))
+
+        base = array.array("q", bytes(8 * block_rows * block_columns))
+        for row_index in range(rows):
+            band = row_index // block * block_columns
+            base[band:band + block_columns] = array.array("q", map(
+                max, base[band:band + block_columns], row_block_max[row_index * block_columns:][:block_columns]))
+        block_max = [[base]]
+        for col_level in range(1, _levels(block_columns)):
+            block_max[0].append(_widen(block_max[0][-1], block_rows, block_columns, 1 << (col_level - 1)))
+        for row_level in range(1, _levels(block_rows)):
+            block_max.append([_widen(table, block_rows, block_columns, (1 << (row_level - 1)) * block_columns,
+                                     along_rows=True)
+                              for table in block_max[-1]])
+        tables = {"visible_prefix": visible_prefix, "scores": scores}
+        return cls(rows, columns, block, grid_digest(grid), tables, row_strips, column_strips, block_max)
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, sys.byteorder[0].encode(), self.rows, self.columns, self.block,
+                                self.digest))
+            for name in CELL_TABLES:
+                f.write(bytes(self._tables[name]))
+            for table in self._row_strips + self._column_strips:
+                f.write(bytes(table))
+            for tables in self._block_max:
+                for table in tables:
+                    f.write(bytes(table))
+
+    @classmethod
+    def load(cls, path) -> "GridIndex":
+        """
+        maps an index file written by save; the tables are read in place, nothing is copied
+        """
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if len(mapped) < HEADER.size:
+                raise ValueError(f"{path} is truncated")
+            magic, version, byte_order, rows, columns, block, digest = HEADER.unpack_from(mapped)
+            if magic != MAGIC or version != VERSION or not block:
+                raise ValueError(f"{path} is not a version {VERSION} grid index")
+            if byte_order != sys.byteorder[0].encode():
+                raise ValueError(f"{path} was written on a machine with a different byte order")
+            if len(mapped) != HEADER.size + 8 * sum(length for _, length in _sections(rows, columns, block)):
+                raise ValueError(f"{path} is truncated")
+        except BaseException:
+            mapped.close()
+            raise
+
+        view = memoryview(mapped)
+        offset = HEADER.size
+        tables = {}
+        for name, length in _sections(rows, columns, block):
+            tables[name] = view[offset:offset + length * 8].cast("q")
+            offset += length * 8
+        row_strips = [tables[f"row_strip_{level}"] for level in range(_strip_levels(block))]
+        column_strips = [tables[f"column_strip_{level}"] for level in range(_strip_levels(block))]
+        block_max = [[tables[f"block_max_{row_level}_{col_level}"]
+                      for col_level in range(_levels(_block_count(columns, block)))]
+                     for row_level in range(_levels(_block_count(rows, block)))]
+        index = cls(rows, columns, block, digest, {name: tables[name] for name in CELL_TABLES}, row_strips,
+                    column_strips, block_max)
+        index._mmap = mapped
+        return index
+
+    @classmethod
+    def load_or_build(cls, path, grid: Grid) -> "GridIndex":
+        """
+        the index in {path} when it was built from the same heights as {grid}, else a fresh index saved to {path}
+        """
+        try:
+            index = cls.load(path)
+        except (OSError, ValueError):
+            pass
+        else:
+            if index.digest == grid_digest(grid):
+                return index
+            index.close()
+        index = cls.from_grid(grid)
+        index.save(path)
+        return index
+
+    def close(self):
+        if self._mmap is not None:
+            for table in [*self._tables.values(), *self._row_strips, *self._column_strips]:
+                table.release()
+            for tables in self._block_max:
+                for table in tables:
+                    table.release()
+            self._mmap.close()
+            self._mmap = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _check_rectangle(self, first_row, first_col, last_row, last_col):
+        if not (0 <= first_row <= last_row <= self.rows and 0 <= first_col <= last_col <= self.columns):
+            raise IndexError("Invalid rectangle")
+
+    def visible_count(self, first_row, first_col, last_row, last_col) -> int:
+        """
+        the number of visible trees in rows [first_row, last_row) and columns [first_col, last_col)
+        """
+        self._check_rectangle(first_row, first_col, last_row, last_col)
+        prefix, stride = self._tables["visible_prefix"], self.columns + 1
+        return (prefix[last_row * stride + last_col] - prefix[first_row * stride + last_col]
+                - prefix[last_row * stride + first_col] + prefix[first_row * stride + first_col])
+
+    def best_scenic_score(self, first_row, first_col, last_row, last_col) -> int:
+        """
+        the best scenic score in rows [first_row, last_row) and columns [first_col, last_col), 0 when it is empty
+        """
+        self._check_rectangle(first_row, first_col, last_row, last_col)
+        row_blocks, row_pieces = _cover(first_row, last_row, self.rows, self.block)
+        col_blocks, col_pieces = _cover(first_col, last_col, self.columns, self.block)
+        best = 0
+        if row_blocks and col_blocks:
+            best = self._blocks_max(row_blocks[0], col_blocks[0], row_blocks[1], col_blocks[1])
+        if col_blocks:  # the pieces of rows above and below the blocks, or making up the rectangle, over their columns
+            block_columns = _block_count(self.columns, self.block)
+            for first, last in row_pieces:
+                best = max(best, _strip_max(self._row_strips, first, last, *col_blocks, block_columns, 1))
+        if row_blocks:  # the pieces of columns left and right of the blocks, over their bands
+            for first, last in col_pieces:
+                best = max(best, _strip_max(self._column_strips, first, last, *row_blocks, 1, self.columns))
+        for first, last in row_pieces:
+            for start, end in col_pieces:
+                best = max(best, self._scan(first, start, last, end))
+        return best
+
+    def _blocks_max(self, first_row, first_col, last_row, last_col):
+        # the best score of a non empty rectangle of blocks, from the four sparse table entries covering its corners
+        block_columns = _block_count(self.columns, self.block)
+        row_level = (last_row - first_row).bit_length() - 1
+        col_level = (last_col - first_col).bit_length() - 1
+        table = self._block_max[row_level][col_level]
+        bottom = (last_row - (1 << row_level)) * block_columns
+        right = last_col - (1 << col_level)
+        top = first_row * block_columns
+        return max(table[top + first_col], table[top + right], table[bottom + first_col], table[bottom + right])
+
+    def _scan(self, first_row, first_col, last_row, last_col):
+        # the best score of a non empty rectangle within one block read straight from the scores, a slice per row
+        scores, columns = self._tables["scores"], self.columns
+        return max(max(scores[start + first_col:start + last_col])
+                   for start in range(first_row * columns, last_row * columns, columns))
+
+    def is_visible(self, row_index, col_index) -> bool:
+        return self.visible_count(row_index, col_index, row_index + 1, col_index + 1) == 1
+
+    def scenic_score(self, row_index, col_index) -> int:
+        if not (0 <= row_index < self.rows and 0 <= col_index < self.columns):
+            raise IndexError("Invalid cell")
+        return self._tables["scores"][row_index * self.columns + col_index]
+
+
+def _strip_max(strips, first, last, first_block, last_block, position_stride, block_stride):
+    """
+    the best score of the piece [first, last) of less than a block, across the blocks [first_block, last_block) of the
+    other axis: the max of the two (overlapping) entries of the {strips} level covering the piece in every block. the
+    entry of a position and a block sits at position * {position_stride} + block * {block_stride}
+    """
+    level = (last - first).bit_length() - 1
+    table = strips[level]
+    best = 0
+    for position in (first * position_stride, (last - (1 << level)) * position_stride):
+        best = max(best, max(table[position + first_block * block_stride:position + last_block * block_stride:
+                                   block_stride]))
+    return best
+
+
+def _widen(table, rows, columns, shift, along_rows=False):
+    """
+    the next sparse table level: every entry is the max of the entry of {table} at the same cell and the one {shift}
+    cells further on. entries whose block would run past the grid are left 0; queries never read them
+    """
+    wider = array.array("q", bytes(len(table) * 8))
+    if not along_rows:  # widening along the columns, row by row
+        for start in range(0, rows * columns, max(columns, 1)):
+            end = start + columns - shift
+            wider[start:end] = array.array("q", map(max, table[start:end], table[start + shift:end + shift]))
+    else:  # widening along the rows: the rows {shift // columns} further down
+        end = max(rows * columns - shift, 0)
+        wider[:end] = array.array("q", map(max, table[:end], table[shift:end + shift]))
+    return wider
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("usage: ./grid_index.py input.txt index-file [first-row first-col last-row last-col]")
+        exit(1)
+    grid = Grid.load(sys.argv[1])
+    with GridIndex.load_or_build(sys.argv[2], grid) as index:
+        rectangle = [int(arg) for arg in sys.argv[3:7]] or [0, 0, index.rows, index.columns]
+        print(index.visible_count(*rectangle))
+        print(index.best_scenic_score(*rectangle))
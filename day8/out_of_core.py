@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+import array
+import mmap
+import os
+import sys
+import tempfile
+import typing
+
+from treetop_treehouse import DIGIT_HEIGHTS, check_height_map, row_visibility, viewing_distances
+
+MAX_HEIGHT = 9
+# the scratch file keeps a uint32 per cell: the viewing distance looking down, with this bit set when the cell is
+# visible from the bottom edge
+VISIBLE_FROM_BOTTOM = 1 << 31
+
+
+class HeightMapFile:
+    """
+    a memory mapped height map file read in stripes of whole rows. pages of a stripe are dropped again once it has
+    been read, so the resident size stays bounded by the stripe size however big the file is. like Grid.from_bytes it
+    ignores trailing newlines and raises ValueError on rows of different widths or anything but digits, each stripe
+    being checked as it is read
+    """
+
+    def __init__(self, path):
+        self._file = open(path, "rb")
+        self._mmap = None
+        try:
+            size = os.fstat(self._file.fileno()).st_size
+            if size:
+                self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            # the size of the rows without the newlines trailing the last one
+            self.size = size
+            while self.size and self._mmap[self.size - 1] == ord("\n"):
+                self.size -= 1
+            self.width = self._mmap.find(b"\n", 0, self.size) if self.size else 0
+            if self.width < 0:  # a single row
+                self.width = self.size
+            stride = self.width + 1
+            if self.size and (not self.width or (self.size + 1) % stride):
+                raise ValueError(f"the rows of the height map are not all {self.width} trees wide")
+            self.row_count = (self.size + 1) // stride if self.size else 0
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def read_rows(self, first_row, last_row) -> typing.List[bytes]:
+        """
+        the heights of rows [first_row, last_row)
+        """
+        stride = self.width + 1
+        start, end = first_row * stride, min(last_row * stride, self.size + 1)
+        stripe = self._mmap[start:end]
+        if len(stripe) < end - start:  # the last row, without a newline at the end of the file
+            stripe += b"\n"
+        check_height_map(stripe, self.width)
+        stripe = stripe.translate(DIGIT_HEIGHTS)
+        if hasattr(mmap, "MADV_DONTNEED"):
+            page_start = start - start % mmap.PAGESIZE
+            self._mmap.madvise(mmap.MADV_DONTNEED, page_start, min(end, len(self._mmap)) - page_start)
+        return [stripe[offset:offset + self.width] for offset in range(0, len(stripe), stride)]
+
+    def stripes(self, stripe_rows, reverse=False):
+        """
+        yields (first_row, rows) for consecutive stripes of {stripe_rows} rows, bottom stripe first when {reverse}
+        """
+        starts = range(0, self.row_count, stripe_rows)
+        for first_row in reversed(starts) if reverse else starts:
+            yield first_row, self.read_rows(first_row, min(first_row + stripe_rows, self.row_count))
+
+
+def analyze_height_map(path, stripe_rows=256, scratch_dir=None) -> typing.Tuple[int, int]:
+    """
+    (visible tree count, best scenic score) of the height map in {path}, computed out of core in row stripes
+
+    a bottom up pass stores every cell's down viewing distance and bottom visibility in a scratch file (4 bytes per
+    cell, written and read with positional I/O so it never becomes resident), then a top down pass combines them with
+    the left/right sweeps of each row and the state carried down from the rows above. the only state carried across
+    stripes is, per column, the tallest tree so far and the row of the last tree of each height level, so memory is
+    O(columns * stripe_rows) whatever the number of rows
+    """
+    with HeightMapFile(path) as height_map, tempfile.TemporaryFile(dir=scratch_dir) as scratch:
+        width, row_count = height_map.width, height_map.row_count
+        if not row_count or not width:
+            return 0, 0
+        scratch_fd = scratch.fileno()
+        row_bytes = width * 4
+
+        # bottom up: nearest_below[level][col] is the row of the nearest tree at least {level} tall below the current
+        # row, or the last row when there is none (so the distance runs to the edge)
+        tallest_below = array.array("b", [-1]) * width
+        nearest_below = [array.array("i", [row_count - 1]) * width for _ in range(MAX_HEIGHT + 1)]
+        for first_row, rows in height_map.stripes(stripe_rows, reverse=True):
+            for row_index in range(first_row + len(rows) - 1, first_row - 1, -1):
+                row = rows[row_index - first_row]
+                down = array.array("I", bytes(row_bytes))
+                for col in range(width):
+                    height = row[col]
+                    distance = nearest_below[height][col] - row_index
+                    if height > tallest_below[col]:
+                        tallest_below[col] = height
+                        distance |= VISIBLE_FROM_BOTTOM
+                    down[col] = distance
+                    for level in range(height + 1):
+                        nearest_below[level][col] = row_index
+                os.pwrite(scratch_fd, down.tobytes(), row_index * row_bytes)
+
+        visible_count, best_scenic_score = 0, 0
+        tallest_above = array.array("b", [-1]) * width
+        nearest_above = [array.array("i", [0]) * width for _ in range(MAX_HEIGHT + 1)]
+        for first_row, rows in height_map.stripes(stripe_rows):
+            for row_index, row in enumerate(rows, start=first_row):
+                down = array.array("I")
+                down.frombytes(os.pread(scratch_fd, row_bytes, row_index * row_bytes))
+                visible = row_visibility(row)
+                left = viewing_distances(row)
+                right = viewing_distances(row[::-1])[::-1]
+                for col in range(width):
+                    height = row[col]
+                    up = row_index - nearest_above[height][col]
+                    if height > tallest_above[col]:
+                        tallest_above[col] = height
+                        visible[col] = 1
+                    if visible[col] or down[col] & VISIBLE_FROM_BOTTOM:
+                        visible_count += 1
+                    score = left[col] * right[col] * up * (down[col] & ~VISIBLE_FROM_BOTTOM)
+                    if score > best_scenic_score:
+                        best_scenic_score = score
+                    for level in range(height + 1):
+                        nearest_above[level][col] = row_index
+        return visible_count, best_scenic_score
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("usage: ./out_of_core.py input.txt [stripe-rows]")
+        exit(1)
+    visible_count, best_scenic_score = analyze_height_map(sys.argv[1], *map(int, sys.argv[2:3]))
+    print(visible_count)
+    print(best_scenic_score)
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+import sys
+import typing
+
+from streaming import analyze_stream
+from treetop_treehouse import DIGIT_HEIGHTS, check_height_map
+
+MAX_HEIGHT = 9
+# a byte holds two cells: the even column in the high nibble, the odd one in the low nibble
+HIGH_NIBBLE = bytes(b >> 4 for b in range(256))
+LOW_NIBBLE = bytes(b & 0xf for b in range(256))
+TO_HIGH_NIBBLE = bytes((b << 4) & 0xff for b in range(256))
+# the digit b"1" for the bytes of a mask whose even (bit 7) or odd (bit 3) column bit is set, else b"0"
+EVEN_BIT_DIGITS = bytes(ord("1") if b & 0x80 else ord("0") for b in range(256))
+ODD_BIT_DIGITS = bytes(ord("1") if b & 0x08 else ord("0") for b in range(256))
+
+
+class PackedGrid:
+    """
+    a height map at 4 bits per cell: the rows are packed back to back into one bytes object, (columns + 1) // 2 bytes
+    each, the even column in the high nibble of a byte and the odd one in the low nibble
+
+    visibility is worked out on each packed row as a whole, read into one big int: masking out the even and the odd
+    nibbles gives a height per byte, and adding 0x80 - level to every byte at once sets bit 7 exactly in the bytes at
+    least {level} tall, with no carry between bytes. so a row's at_least[level] mask takes a few big int operations,
+    with the bit of column c at 8 * (row_bytes - 1 - c // 2) + (3 if c is odd else 7): higher bits are further left.
+    the tree seen first from the left at a level is then the highest set bit of its mask and from the right the lowest,
+    and those are exactly the trees visible from that side. from the top, a tree is visible when no row above had a
+    tree at least as tall in its column, which is a running OR of each level mask down the rows. every visible tree
+    has one bit set, so counting them is a bit_count per row
+    """
+
+    def __init__(self, row_count=0, column_count=0, packed=b""):
+        self.row_count = row_count
+        self.column_count = column_count
+        self.packed = packed
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "PackedGrid":
+        """
+        raises ValueError on rows of different widths or anything but digits: nibbles are packed back to back, so a
+        short row would shift the rest of the grid rather than fail
+        """
+        data = data.rstrip(b"\n")
+        if not data:
+            return cls()
+        rows = data.split(b"\n")
+        columns = len(rows[0])
+        check_height_map(data + b"\n", columns)
+        if columns % 2:
+            rows = [row + b"0" for row in rows]
+        heights = b"".join(rows).translate(DIGIT_HEIGHTS)
+        # every high nibble OR'ed into place with one big int operation instead of a loop over the bytes
+        high = int.from_bytes(heights[0::2].translate(TO_HIGH_NIBBLE), "big")
+        packed = (high | int.from_bytes(heights[1::2], "big")).to_bytes(len(heights) // 2, "big")
+        return cls(len(rows), columns, packed)
+
+    @classmethod
+    def load(cls, path) -> "PackedGrid":
+        with open(path, "rb") as f:
+            return cls.from_bytes(f.read())
+
+    @property
+    def row_bytes(self):
+        return (self.column_count + 1) // 2
+
+    @property
+    def nbytes(self):
+        return len(self.packed)
+
+    def row(self, row_index) -> bytes:
+        """
+        the heights of row {row_index}, one byte per cell
+        """
+        start = row_index * self.row_bytes
+        packed_row = self.packed[start:start + self.row_bytes]
+        heights = bytearray(2 * len(packed_row))
+        heights[0::2] = packed_row.translate(HIGH_NIBBLE)
+        heights[1::2] = packed_row.translate(LOW_NIBBLE)
+        return bytes(heights[:self.column_count])
+
+    def rows(self) -> typing.Iterator[bytes]:
+        for row_index in range(self.row_count):
+            yield self.row(row_index)
+
+    def get_cell(self, row_num, col) -> int:
+        if not (0 <= row_num < self.row_count and 0 <= col < self.column_count):
+            raise IndexError("Invalid cell")
+        packed_cell = self.packed[row_num * self.row_bytes + col // 2]
+        return packed_cell & 0xf if col % 2 else packed_cell >> 4
+
+    def _row_masks(self, row_indices) -> typing.Iterator[typing.List[int]]:
+        """
+        yields the at_least masks of levels 0 .. 10 (the last one always empty) of each of {row_indices}
+        """
+        row_bytes = self.row_bytes
+        ones = int.from_bytes(b"\1" * row_bytes, "big")
+        low_nibbles, top_bits = 0x0f * ones, 0x80 * ones
+        every_cell = top_bits | top_bits >> 4
+        if self.column_count % 2:
+            every_cell ^= 0x08  # the padding nibble of the last byte
+        offsets = [(0x80 - level) * ones for level in range(MAX_HEIGHT + 1)]
+        for row_index in row_indices:
+            row = int.from_bytes(self.packed[row_index * row_bytes:(row_index + 1) * row_bytes], "big")
+            even, odd = row >> 4 & low_nibbles, row & low_nibbles
+            masks = [every_cell]
+            for level in range(1, MAX_HEIGHT + 1):
+                masks.append((even + offsets[level]) & top_bits | ((odd + offsets[level]) & top_bits) >> 4)
+            masks.append(0)
+            yield masks
+
+    def _packed_visibility_masks(self) -> typing.List[int]:
+        # the visible trees of every row, with the bit layout of the at_least masks
+        visible_masks = []
+        # seen[level]: the columns with a tree at least {level} tall in the rows swept so far
+        seen = [0] * (MAX_HEIGHT + 1)
+        for at_least in self._row_masks(range(self.row_count)):
+            visible = 0
+            for level in range(MAX_HEIGHT + 1):
+                mask = at_least[level]
+                if mask:
+                    visible |= mask & -mask | 1 << (mask.bit_length() - 1)
+                    # the trees exactly {level} tall with nothing as tall above them
+                    visible |= mask & ~at_least[level + 1] & ~seen[level]
+                    seen[level] |= mask
+            visible_masks.append(visible)
+
+        seen = [0] * (MAX_HEIGHT + 1)
+        row_indices = range(self.row_count - 1, -1, -1)
+        for row_index, at_least in zip(row_indices, self._row_masks(row_indices)):
+            visible = visible_masks[row_index]
+            for level in range(MAX_HEIGHT + 1):
+                mask = at_least[level]
+                visible |= mask & ~at_least[level + 1] & ~seen[level]
+                seen[level] |= mask
+            visible_masks[row_index] = visible
+        return visible_masks
+
+    def visibility_mask(self) -> typing.List[int]:
+        """
+        a bitset per row of the trees visible from outside the grid, bit i for column i
+        """
+        masks = []
+        for packed_mask in self._packed_visibility_masks():
+            mask_bytes = packed_mask.to_bytes(self.row_bytes, "big")
+            digits = bytearray(2 * self.row_bytes)
+            digits[0::2] = mask_bytes.translate(EVEN_BIT_DIGITS)
+            digits[1::2] = mask_bytes.translate(ODD_BIT_DIGITS)
+            # int() reads the most significant digit first, so the digits are reversed to put column 0 in bit 0
+            masks.append(int(digits[self.column_count - 1::-1], 2))
+        return masks
+
+    def count_visible_cells(self):
+        return sum(mask.bit_count() for mask in self._packed_visibility_masks())
+
+    def best_scenic_score(self):
+        """
+        scores need the distances rather than the visibility, so the rows are unpacked one at a time into the streaming
+        analysis, which only keeps per column state
+        """
+        return analyze_stream(self.rows())[1]
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("usage: ./packed_grid.py input.txt")
+        exit(1)
+
+    grid = PackedGrid.load(sys.argv[1])
+
+    print(grid.count_visible_cells())
+    print(grid.best_scenic_score())
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+import array
+import concurrent.futures
+import sys
+import time
+import typing
+from multiprocessing import shared_memory
+
+from treetop_treehouse import Grid, row_visibility, viewing_distances
+
+# set in every worker by _attach: the grid shape and views over the shared heights, visibility and score buffers
+_shared = None
+
+
+class SharedGrid:
+    """
+    the heights of a grid plus the per cell visibility (uint8) and scenic score (int64) results, in shared memory
+    blocks that pool workers attach to by name instead of receiving pickled rows
+    """
+
+    def __init__(self, grid: Grid):
+        self.rows, self.columns = grid.row_count, grid.column_count if grid.row_count else 0
+        cells = self.rows * self.columns
+        self._blocks = [shared_memory.SharedMemory(create=True, size=max(size, 1))
+                        for size in (cells, cells, cells * 8)]
+        heights = self._blocks[0].buf
+        for row_index, row in enumerate(grid.rows):
+            heights[row_index * self.columns:(row_index + 1) * self.columns] = bytes(row)
+
+    @property
+    def names(self):
+        return [block.name for block in self._blocks]
+
+    def close(self):
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _attach(names, rows, columns):
+    global _shared
+    blocks = [shared_memory.SharedMemory(name=name) for name in names]
+    cells = rows * columns
+    _shared = (rows, columns, blocks, blocks[0].buf[:cells], blocks[1].buf[:cells], blocks[2].buf[:cells * 8].cast("q"))
+
+
+def _sweep_rows(first_row, last_row):
+    """
+    left/right visibility and the left * right viewing distance product of rows [first_row, last_row)
+    """
+    rows, columns, _, heights, visible, scores = _shared
+    for row_index in range(first_row, last_row):
+        start = row_index * columns
+        row = bytes(heights[start:start + columns])
+        visible[start:start + columns] = row_visibility(row)
+        left = viewing_distances(row)
+        right = viewing_distances(row[::-1])[::-1]
+        scores[start:start + columns] = array.array("q", [a * b for a, b in zip(left, right)])
+
+
+def _sweep_columns(first_col, last_col):
+    """
+    adds top/bottom visibility and distances to columns [first_col, last_col), which completes their cells, and
+    returns (visible count, best scenic score) over them. runs after every row sweep is done
+    """
+    rows, columns, _, heights, visible, scores = _shared
+    visible_count, best_scenic_score = 0, 0
+    for col in range(first_col, last_col):
+        column = bytes(heights[col::columns])
+        top_bottom = row_visibility(column)
+        up = viewing_distances(column)
+        down = viewing_distances(column[::-1])[::-1]
+        for row_index in range(rows):
+            cell = row_index * columns + col
+            if visible[cell] or top_bottom[row_index]:
+                visible[cell] = 1
+                visible_count += 1
+            score = scores[cell] * up[row_index] * down[row_index]
+            scores[cell] = score
+            if score > best_scenic_score:
+                best_scenic_score = score
+    return visible_count, best_scenic_score
+
+
+def _blocks(count, block_size):
+    return [(start, min(start + block_size, count)) for start in range(0, count, block_size)]
+
+
+def analyze_parallel(grid: Grid, workers=None, block_size=64) -> typing.Tuple[int, int]:
+    """
+    (visible tree count, best scenic score) of {grid} on a pool of {workers} processes: blocks of {block_size} rows
+    are swept left/right first, then blocks of columns top/bottom, each worker reading and writing the shared buffers
+    in place. only block bounds and per block (count, max) pairs cross process boundaries
+    """
+    if not grid.row_count:
+        return 0, 0
+    with SharedGrid(grid) as shared, concurrent.futures.ProcessPoolExecutor(
+            max_workers=workers, initializer=_attach, initargs=(shared.names, shared.rows, shared.columns)) as executor:
+        row_blocks = _blocks(shared.rows, block_size)
+        # list() waits for every row sweep before the column sweeps read their results
+        list(executor.map(_sweep_rows, *zip(*row_blocks)))
+        results = list(executor.map(_sweep_columns, *zip(*_blocks(shared.columns, block_size))))
+    return sum(count for count, _ in results), max(score for _, score in results)
+
+
+def bench_parallel(grid: Grid, worker_counts, block_size=64):
+    """
+    prints the wall time and speedup over one worker of analyze_parallel for every worker count
+    """
+    results = []
+    for workers in worker_counts:
+        start = time.perf_counter()
+        analyze_parallel(grid, workers=workers, block_size=block_size)
+        elapsed = time.perf_counter() - start
+        results.append((workers, elapsed))
+        print(f"workers={workers:>3} time={elapsed:.3f}s speedup={results[0][1] / elapsed:.2f}x")
+    return results
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("usage: ./parallel.py input.txt [workers | bench]")
+        exit(1)
+    if sys.argv[2:3] == ["bench"]:
+        bench_parallel(Grid.load(sys.argv[1]), [1, 2, 4, 8, 16, 32])
+        exit(0)
+    visible_count, best_scenic_score = analyze_parallel(Grid.load(sys.argv[1]), *map(int, sys.argv[2:3]))
+    print(visible_count)
+    print(best_scenic_score)
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+import sys
+import typing
+
+from out_of_core import HeightMapFile
+from treetop_treehouse import DIGIT_HEIGHTS, row_visibility, viewing_distances
+
+
+class StreamingAnalysis:
+    """
+    the visible tree count and best scenic score of a height map fed one row at a time, top row first, never holding
+    more than the current row
+
+    left/right visibility and distances come from sweeping each row as it arrives. per column we keep a stack of the
+    cells taller than every cell below them so far, as [height, row, score so far, counted] entries, strictly
+    decreasing in height so never more than 10 deep. when a cell arrives, the entries shorter than it have found their
+    nearest blocker below (it) and are finished; an entry as tall ends its view up, the view stops at the entry left on
+    top, and the cell is visible from the top when none is left. once the last row is in, the entries still on the
+    stacks are exactly the cells visible from the bottom with a view down to the edge: that deferred bottom pass is all
+    finish() has to do
+    """
+
+    def __init__(self):
+        self.row_count = 0
+        self.width = None
+        self._stacks: typing.List[typing.List[list]] = []
+        # lower bounds while rows keep arriving: the cells known to be visible and the best finished score
+        self.visible_count = 0
+        self.best_scenic_score = 0
+
+    def add_row(self, row: typing.Sequence[int]):
+        if self.width is None:
+            self.width = len(row)
+            self._stacks = [[] for _ in range(self.width)]
+        elif len(row) != self.width:
+            raise ValueError(f"row {self.row_count} has {len(row)} trees instead of {self.width}")
+        row_index = self.row_count
+        visible = row_visibility(row)
+        left = viewing_distances(row)
+        right = viewing_distances(row[::-1])[::-1]
+        best = self.best_scenic_score
+        for col, stack in enumerate(self._stacks):
+            height = row[col]
+            while stack and stack[-1][0] < height:
+                best = max(best, self._finish(stack.pop(), row_index))
+            if not stack:
+                visible[col] = 1
+                up = row_index
+            else:
+                up = row_index - stack[-1][1]
+                if stack[-1][0] == height:
+                    best = max(best, self._finish(stack.pop(), row_index))
+            if visible[col]:
+                self.visible_count += 1
+            stack.append([height, row_index, left[col] * right[col] * up, visible[col]])
+        self.best_scenic_score = best
+        self.row_count += 1
+
+    def _finish(self, entry, blocker_row) -> int:
+        # the score of a cell whose view down ends at {blocker_row}
+        return entry[2] * (blocker_row - entry[1])
+
+    def finish(self) -> typing.Tuple[int, int]:
+        """
+        (visible tree count, best scenic score) once every row is in
+        """
+        last_row = self.row_count - 1
+        for stack in self._stacks:
+            for entry in stack:
+                if not entry[3]:
+                    self.visible_count += 1
+                    entry[3] = 1
+                self.best_scenic_score = max(self.best_scenic_score, self._finish(entry, last_row))
+            stack.clear()
+        return self.visible_count, self.best_scenic_score
+
+
+def iter_rows(lines: typing.Iterable[bytes]) -> typing.Iterator[bytes]:
+    """
+    the heights of every non empty line of {lines} (e.g. a file opened in "rb" mode)
+    """
+    for line in lines:
+        line = line.rstrip(b"\r\n")
+        if line:
+            yield line.translate(DIGIT_HEIGHTS)
+
+
+def iter_file_rows(path, stripe_rows=256) -> typing.Iterator[bytes]:
+    """
+    the heights of the rows of the height map in {path}, read through a memory map a stripe at a time
+    """
+    with HeightMapFile(path) as height_map:
+        if not height_map.width:
+            return
+        for _, rows in height_map.stripes(stripe_rows):
+            yield from rows
+
+
+def analyze_stream(rows: typing.Iterable[typing.Sequence[int]]) -> typing.Tuple[int, int]:
+    analysis = StreamingAnalysis()
+    for row in rows:
+        analysis.add_row(row)
+    return analysis.finish()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("usage: ./streaming.py input.txt|-")
+        exit(1)
+    if sys.argv[1] == "-":
+        visible_count, best_scenic_score = analyze_stream(iter_rows(sys.stdin.buffer))
+    else:
+        visible_count, best_scenic_score = analyze_stream(iter_file_rows(sys.argv[1]))
+    print(visible_count)
+    print(best_scenic_score)
@@ -0,0 +1,142 @@
+import os
+import random
+import tempfile
+import unittest
+from unittest import TestCase, mock
+import grid_index
+from grid_index import GridIndex
+from treetop_treehouse import Grid
+
+
+def random_grid(rows, columns, seed):
+    rng = random.Random(seed)
+    return Grid.from_bytes("".join("".join(str(rng.randint(0, 9)) for _ in range(columns)) + "\n"
+                                   for _ in range(rows)).encode())
+
+
+class GridIndexTestCase(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "input.idx")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def assertMatchesBruteForce(self, grid, index):
+        mask, scores = grid.visibility_mask(), grid.scenic_scores()
+        rows, columns = grid.row_count, grid.column_count
+        for first_row in range(rows + 1):
+            for last_row in range(first_row, rows + 1):
+                for first_col in range(columns + 1):
+                    for last_col in range(first_col, columns + 1):
+                        cells = [(r, c) for r in range(first_row, last_row) for c in range(first_col, last_col)]
+                        rectangle = (first_row, first_col, last_row, last_col)
+                        self.assertEqual(index.visible_count(*rectangle), sum(int(mask[r][c]) for r, c in cells))
+                        self.assertEqual(index.best_scenic_score(*rectangle),
+                                         max((int(scores[r][c]) for r, c in cells), default=0))
+
+    def test_should_answer_every_rectangle(self):
+        for seed, (rows, columns) in enumerate([(5, 5), (7, 3), (2, 9), (1, 1), (8, 7), (6, 1)]):
+            grid = random_grid(rows, columns, seed)
+            for block in (1, 2, 3, grid_index.BLOCK):
+                self.assertMatchesBruteForce(grid, GridIndex.from_grid(grid, block=block))
+
+    def test_should_keep_the_sparse_table_to_the_block_maxima(self):
+        grid = random_grid(70, 45, seed=7)
+        index = GridIndex.from_grid(grid, block=8)
+        # 9 x 6 blocks: 4 row levels by 3 column levels
+        self.assertEqual([[len(table) for table in tables] for tables in index._block_max], [[54] * 3] * 4)
+        # pieces of 1 to 7 cells: spans 1, 2 and 4
+        self.assertEqual([len(table) for table in index._row_strips], [70 * 6] * 3)
+        self.assertEqual([len(table) for table in index._column_strips], [9 * 45] * 3)
+        for rectangle in [(0, 0, 70, 45), (3, 5, 66, 40), (8, 8, 64, 40), (1, 30, 69, 44), (20, 0, 21, 45),
+                          (10, 0, 23, 45), (0, 10, 70, 23), (10, 3, 14, 44), (3, 10, 67, 14), (9, 9, 22, 22)]:
+            first_row, first_col, last_row, last_col = rectangle
+            best = max(grid.cell_scenic_score(r, c)
+                       for r in range(first_row, last_row) for c in range(first_col, last_col))
+            self.assertEqual(index.best_scenic_score(*rectangle), best, rectangle)
+
+    def test_should_scan_no_more_than_a_block_per_piece(self):
+        grid = random_grid(100, 90, seed=8)
+        index = GridIndex.from_grid(grid, block=8)
+        scanned = []
+
+        def scan(first_row, first_col, last_row, last_col):
+            scanned.append((first_row, first_col, last_row, last_col))
+            return real_scan(first_row, first_col, last_row, last_col)
+
+        real_scan = index._scan
+        rng = random.Random(8)
+        with mock.patch.object(index, "_scan", side_effect=scan):
+            for _ in range(300):
+                # mostly strips too thin to hold a whole block, along either axis
+                first_row, first_col = rng.randrange(100), rng.randrange(90)
+                last_row = min(100, first_row + rng.choice([1, 5, 12, 15, 100]))
+                last_col = min(90, first_col + rng.choice([1, 5, 12, 15, 90]))
+                best = max(grid.cell_scenic_score(r, c) for r in range(first_row, last_row)
+                           for c in range(first_col, last_col))
+                rectangle = (first_row, first_col, last_row, last_col)
+                self.assertEqual(index.best_scenic_score(*rectangle), best, rectangle)
+        for first_row, first_col, last_row, last_col in scanned:
+            self.assertEqual((first_row // 8, first_col // 8), ((last_row - 1) // 8, (last_col - 1) // 8))
+
+    def test_should_answer_whole_grid_like_grid(self):
+        grid = random_grid(37, 23, seed=4)
+        index = GridIndex.from_grid(grid)
+        self.assertEqual(index.visible_count(0, 0, 37, 23), grid.count_visible_cells())
+        self.assertEqual(index.best_scenic_score(0, 0, 37, 23), grid.best_scenic_score())
+        score, row, col = grid.best_scenic_cell()
+        self.assertEqual(index.scenic_score(row, col), score)
+        self.assertTrue(index.is_visible(0, 5))
+
+    def test_should_reuse_saved_index(self):
+        grid = random_grid(6, 8, seed=5)
+        GridIndex.from_grid(grid).save(self.path)
+        with GridIndex.load(self.path) as index:
+            self.assertMatchesBruteForce(grid, index)
+        with GridIndex.load_or_build(self.path, grid) as index:
+            self.assertIsNotNone(index._mmap)
+
+    def test_should_rebuild_stale_or_broken_index(self):
+        GridIndex.from_grid(random_grid(6, 8, seed=5)).save(self.path)
+        grid = random_grid(6, 8, seed=6)
+        index = GridIndex.load_or_build(self.path, grid)
+        self.assertIsNone(index._mmap)
+        self.assertEqual(index.best_scenic_score(0, 0, 6, 8), grid.best_scenic_score())
+        with GridIndex.load(self.path) as reloaded:
+            self.assertEqual(reloaded.digest, index.digest)
+
+        with open(self.path, "r+b") as f:
+            f.truncate(100)
+        self.assertRaises(ValueError, GridIndex.load, self.path)
+        self.assertIsNone(GridIndex.load_or_build(self.path, grid)._mmap)
+
+    def test_should_close_the_mapping_of_files_shorter_than_the_header(self):
+        with open(self.path, "wb") as f:
+            f.write(grid_index.MAGIC + b"\0" * 8)
+        mappings, real_mmap = [], grid_index.mmap.mmap
+
+        def mapping(*args, **kwargs):
+            mappings.append(real_mmap(*args, **kwargs))
+            return mappings[-1]
+
+        with mock.patch.object(grid_index.mmap, "mmap", side_effect=mapping):
+            self.assertRaisesRegex(ValueError, "truncated", GridIndex.load, self.path)
+        self.assertTrue(mappings[0].closed)
+
+    def test_should_reject_invalid_rectangles(self):
+        index = GridIndex.from_grid(random_grid(3, 3, seed=0))
+        self.assertRaises(IndexError, index.visible_count, 0, 0, 4, 3)
+        self.assertRaises(IndexError, index.best_scenic_score, 2, 0, 1, 3)
+        self.assertRaises(IndexError, index.scenic_score, 3, 0)
+
+    def test_should_handle_empty_grid(self):
+        index = GridIndex.from_grid(Grid())
+        self.assertEqual((index.visible_count(0, 0, 0, 0), index.best_scenic_score(0, 0, 0, 0)), (0, 0))
+        index.save(self.path)
+        with GridIndex.load(self.path) as loaded:
+            self.assertEqual(loaded.visible_count(0, 0, 0, 0), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+import os
+import random
+import tempfile
+import unittest
+from unittest import TestCase
+from out_of_core import analyze_height_map
+from treetop_treehouse import Grid
+
+
+class AnalyzeHeightMapTestCase(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "input.txt")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def write(self, text):
+        with open(self.path, "w") as f:
+            f.write(text)
+
+    def assertMatchesGrid(self, text, stripe_rows):
+        self.write(text)
+        grid = Grid.from_bytes(text.encode())
+        self.assertEqual(analyze_height_map(self.path, stripe_rows=stripe_rows),
+                         (grid.count_visible_cells(), grid.best_scenic_score()))
+
+    def test_should_match_in_memory_grid_for_any_stripe_size(self):
+        rng = random.Random(0)
+        for rows, columns, max_height in [(5, 5, 9), (13, 7, 3), (4, 17, 9), (20, 20, 1)]:
+            text = "".join("".join(str(rng.randint(0, max_height)) for _ in range(columns)) + "\n" for _ in range(rows))
+            for stripe_rows in [1, 3, 100]:
+                self.assertMatchesGrid(text, stripe_rows)
+                self.assertMatchesGrid(text.rstrip("\n"), stripe_rows)
+
+    def test_should_handle_degenerate_inputs(self):
+        self.assertMatchesGrid("30373", 2)
+        self.assertMatchesGrid("3\n0\n3\n", 2)
+        self.write("")
+        self.assertEqual(analyze_height_map(self.path), (0, 0))
+        self.assertMatchesGrid("30373\n25512\n65332\n\n\n", 2)
+        self.assertMatchesGrid("\n\n", 2)
+
+    def test_should_reject_malformed_inputs(self):
+        for text in ["30373\n2551\n65332\n", "303\n25512\n653\n", "30373\n25512\n6533\n", "30373\n25512\n653329\n",
+                     "30373\r\n25512\r\n", "30373\n25a12\n", "30373\n\n25512\n", "\n30373\n", "303 73\n"]:
+            self.write(text)
+            self.assertRaises(ValueError, Grid.from_bytes, text.encode())
+            for stripe_rows in [1, 2, 100]:
+                self.assertRaises(ValueError, analyze_height_map, self.path, stripe_rows)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+import random
+import unittest
+from unittest import TestCase
+from packed_grid import PackedGrid
+from treetop_treehouse import Grid
+
+EXAMPLE = b"30373\n25512\n65332\n33549\n35390\n"
+
+
+def random_text(rows, columns, rng, max_height=9):
+    lines = ("".join(str(rng.randint(0, max_height)) for _ in range(columns)) + "\n" for _ in range(rows))
+    return "".join(lines).encode()
+
+
+class PackedGridTestCase(TestCase):
+    def assertMatchesGrid(self, text):
+        grid, packed = Grid.from_bytes(text), PackedGrid.from_bytes(text)
+        self.assertEqual((packed.row_count, packed.column_count), (grid.row_count, grid.column_count))
+        self.assertEqual([list(packed.row(r)) for r in range(packed.row_count)], [list(row) for row in grid.rows])
+        mask = grid.visibility_mask()
+        self.assertEqual(packed.visibility_mask(),
+                         [sum(int(visible) << col for col, visible in enumerate(row)) for row in mask])
+        self.assertEqual(packed.count_visible_cells(), grid.count_visible_cells())
+        self.assertEqual(packed.best_scenic_score(), grid.best_scenic_score())
+
+    def test_should_analyze_example(self):
+        packed = PackedGrid.from_bytes(EXAMPLE)
+        self.assertEqual((packed.count_visible_cells(), packed.best_scenic_score()), (21, 8))
+        self.assertEqual(packed.nbytes, 15)
+        self.assertEqual([packed.get_cell(3, col) for col in range(5)], [3, 3, 5, 4, 9])
+        self.assertRaises(IndexError, packed.get_cell, 0, 5)
+
+    def test_should_match_grid(self):
+        rng = random.Random(0)
+        for rows, columns, max_height in [(9, 9, 9), (13, 8, 2), (4, 17, 9), (20, 20, 0), (1, 1, 9), (6, 1, 5),
+                                          (1, 7, 9), (30, 65, 9)]:
+            self.assertMatchesGrid(random_text(rows, columns, rng, max_height))
+            self.assertMatchesGrid(random_text(rows, columns, rng, max_height).rstrip(b"\n"))
+
+    def test_should_handle_empty_grid(self):
+        packed = PackedGrid.from_bytes(b"")
+        self.assertEqual((packed.count_visible_cells(), packed.best_scenic_score()), (0, 0))
+        self.assertEqual(packed.visibility_mask(), [])
+
+    def test_should_reject_ragged_rows_and_non_digits(self):
+        for data in (b"1234\n123\n1234\n", b"123\n1234\n", b"12\n\n34\n", b"12:4\n1234\n", b"1234\n12 4"):
+            self.assertRaises(ValueError, PackedGrid.from_bytes, data)
+
+
+if __name__ == "__main__":
+    unittest.main()
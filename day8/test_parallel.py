@@ -0,0 +1,27 @@
+import random
+import unittest
+from unittest import TestCase
+from parallel import analyze_parallel
+from treetop_treehouse import Grid
+
+
+class AnalyzeParallelTestCase(TestCase):
+    def test_should_match_single_process_results(self):
+        rng = random.Random(0)
+        for rows, columns, block_size in [(20, 20, 3), (7, 31, 4), (31, 7, 64), (1, 5, 2)]:
+            grid = Grid()
+            for _ in range(rows):
+                grid.add_row([rng.randint(0, 9) for _ in range(columns)])
+            self.assertEqual(analyze_parallel(grid, workers=2, block_size=block_size),
+                             (grid.count_visible_cells(), grid.best_scenic_score()))
+
+    def test_should_accept_array_backed_grids(self):
+        grid = Grid.from_bytes(b"30373\n25512\n65332\n33549\n35390\n")
+        self.assertEqual(analyze_parallel(grid, workers=2, block_size=2), (21, 8))
+
+    def test_should_handle_empty_grid(self):
+        self.assertEqual(analyze_parallel(Grid()), (0, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+import io
+import os
+import random
+import tempfile
+import unittest
+from unittest import TestCase
+from streaming import StreamingAnalysis, analyze_stream, iter_file_rows, iter_rows
+from treetop_treehouse import Grid
+
+EXAMPLE = b"30373\n25512\n65332\n33549\n35390\n"
+
+
+def random_text(rows, columns, rng, max_height=9):
+    return "".join("".join(str(rng.randint(0, max_height)) for _ in range(columns)) + "\n"
+                   for _ in range(rows)).encode()
+
+
+class StreamingAnalysisTestCase(TestCase):
+    def assertMatchesGrid(self, text):
+        grid = Grid.from_bytes(text)
+        self.assertEqual(analyze_stream(iter_rows(io.BytesIO(text))),
+                         (grid.count_visible_cells(), grid.best_scenic_score()), text)
+
+    def test_should_analyze_example(self):
+        self.assertEqual(analyze_stream(iter_rows(io.BytesIO(EXAMPLE))), (21, 8))
+
+    def test_should_match_grid(self):
+        rng = random.Random(0)
+        for rows, columns, max_height in [(9, 9, 9), (13, 7, 2), (4, 17, 9), (20, 20, 1), (1, 6, 9), (6, 1, 9)]:
+            self.assertMatchesGrid(random_text(rows, columns, rng, max_height))
+
+    def test_should_report_lower_bounds_while_streaming(self):
+        analysis = StreamingAnalysis()
+        grid = Grid.from_bytes(random_text(15, 15, random.Random(1)))
+        for row in grid.rows:
+            analysis.add_row(bytes(row))
+            self.assertLessEqual(analysis.visible_count, grid.count_visible_cells())
+            self.assertLessEqual(analysis.best_scenic_score, grid.best_scenic_score())
+        self.assertEqual(analysis.finish(), (grid.count_visible_cells(), grid.best_scenic_score()))
+
+    def test_should_reject_ragged_rows(self):
+        analysis = StreamingAnalysis()
+        analysis.add_row(b"\1\2\3")
+        self.assertRaises(ValueError, analysis.add_row, b"\1\2")
+
+    def test_should_read_files_in_stripes(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "input.txt")
+            with open(path, "wb") as f:
+                f.write(EXAMPLE)
+            self.assertEqual(analyze_stream(iter_file_rows(path, stripe_rows=2)), (21, 8))
+            open(path, "wb").close()
+            self.assertEqual(analyze_stream(iter_file_rows(path)), (0, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
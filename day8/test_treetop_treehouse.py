@@ -0,0 +1,240 @@
+import os
+import random
+import tempfile
+import unittest
+from unittest import TestCase, mock
+import treetop_treehouse
+from treetop_treehouse import Grid
+from instrumentation import CountingRecorder, set_recorder
+
+EXAMPLE = """30373
+25512
+65332
+33549
+35390
+"""
+
+
+def grid_from_text(text):
+    grid = Grid()
+    for line in text.splitlines():
+        grid.add_row([int(num) for num in line])
+    return grid
+
+
+def random_grid(rows, columns, seed, max_height=9):
+    rng = random.Random(seed)
+    grid = Grid()
+    for _ in range(rows):
+        grid.add_row([rng.randint(0, max_height) for _ in range(columns)])
+    return grid
+
+
+class VisibilityTestCase(TestCase):
+    def test_should_count_visible_cells_of_example(self):
+        self.assertEqual(grid_from_text(EXAMPLE).count_visible_cells(), 21)
+
+    def test_should_match_cell_by_cell_visibility(self):
+        for seed, (rows, columns) in enumerate([(7, 7), (3, 11), (12, 4), (1, 5), (6, 1), (2, 2)]):
+            grid = random_grid(rows, columns, seed, max_height=seed % 2 * 5 + 4)
+            mask = grid.visibility_mask()
+            for row in range(rows):
+                for col in range(columns):
+                    self.assertEqual(mask[row][col], int(grid.is_cell_visible(row, col)), (seed, row, col))
+            self.assertEqual(grid.count_visible_cells(), sum(map(sum, mask)))
+
+    def test_should_count_edges_of_non_square_grids(self):
+        grid = grid_from_text("000\n000\n000\n000\n000\n000\n")
+        self.assertEqual(grid.count_visible_cells(), 14)
+        grid = grid_from_text("00000000\n00000000\n")
+        self.assertEqual(grid.count_visible_cells(), 16)
+
+    def test_should_handle_empty_grid(self):
+        self.assertEqual(Grid().count_visible_cells(), 0)
+
+
+class ScenicScoreTestCase(TestCase):
+    def test_should_find_best_scenic_score_of_example(self):
+        grid = grid_from_text(EXAMPLE)
+        self.assertEqual(grid.best_scenic_score(), 8)
+        self.assertEqual(grid.best_scenic_cell(), (8, 3, 2))
+
+    def test_should_match_cell_by_cell_scenic_scores(self):
+        for seed, (rows, columns) in enumerate([(7, 7), (3, 11), (12, 4), (1, 5), (6, 1), (9, 9)]):
+            # low max heights make for long plateaus of equal trees
+            grid = random_grid(rows, columns, seed, max_height=seed % 3 + 1)
+            scores = grid.scenic_scores()
+            for row in range(rows):
+                for col in range(columns):
+                    self.assertEqual(scores[row][col], grid.cell_scenic_score(row, col), (seed, row, col))
+
+    def test_should_return_top_k_cells(self):
+        grid = random_grid(10, 10, seed=1)
+        scores = grid.scenic_scores()
+        expected = sorted((scores[r][c] for r in range(10) for c in range(10)), reverse=True)[:5]
+        top = grid.top_scenic_cells(5)
+        self.assertEqual([score for score, _, _ in top], expected)
+        for score, row, col in top:
+            self.assertEqual(scores[row][col], score)
+        self.assertEqual(top[0][0], grid.best_scenic_score())
+
+    def test_should_handle_empty_grid(self):
+        self.assertEqual(Grid().best_scenic_score(), 0)
+        self.assertEqual(Grid().top_scenic_cells(3), [])
+
+    def test_pruned_search_should_find_first_best_cell(self):
+        for seed, (rows, columns) in enumerate([(30, 30), (3, 11), (12, 4), (1, 5), (6, 1), (2, 2), (25, 40), (9, 9)]):
+            grid = random_grid(rows, columns, seed, max_height=seed % 3 * 4 + 1)
+            # the first cell in row order among the best, as (-score, row, col) sorts them
+            score, row, col = min((-score, row, col) for row, row_scores in enumerate(grid.scenic_scores())
+                                  for col, score in enumerate(row_scores))
+            self.assertEqual(grid.best_scenic_cell(), (-score, row, col), seed)
+        # rows 1 and 3 tie, row 3 is swept first
+        self.assertEqual(grid_from_text("00000\n00100\n00000\n00100\n00000\n").best_scenic_cell(), (8, 1, 2))
+        self.assertIsNone(Grid().best_scenic_cell())
+
+
+class SetCellTestCase(TestCase):
+    def assertCurrent(self, grid):
+        fresh = Grid()
+        for row_index in range(grid.row_count):
+            fresh.add_row([grid.get_cell(row_index, col) for col in range(grid.column_count)])
+        self.assertEqual(grid.count_visible_cells(), fresh.count_visible_cells())
+        self.assertEqual(grid.best_scenic_cell(), fresh.best_scenic_cell())
+
+    def check_random_edits(self, grid, seed):
+        rng = random.Random(seed)
+        for _ in range(60):
+            grid.set_cell(rng.randrange(grid.row_count), rng.randrange(grid.column_count), rng.randint(0, 9))
+            self.assertCurrent(grid)
+
+    def test_should_keep_answers_current(self):
+        for seed, (rows, columns) in enumerate([(7, 7), (3, 11), (12, 4), (1, 5), (6, 1), (1, 1)]):
+            self.check_random_edits(random_grid(rows, columns, seed), seed)
+
+    def test_should_update_example(self):
+        grid = grid_from_text(EXAMPLE)
+        grid.set_cell(3, 2, 0)
+        self.assertCurrent(grid)
+        self.assertEqual((grid.count_visible_cells(), grid.best_scenic_score()), (21, 9))
+        grid.set_cell(3, 2, 5)
+        self.assertEqual((grid.count_visible_cells(), grid.best_scenic_cell()), (21, (8, 3, 2)))
+
+    def test_should_update_loaded_grids(self):
+        self.check_random_edits(Grid.from_bytes(EXAMPLE.encode()), seed=1)
+        with mock.patch.object(treetop_treehouse, "numpy", None):
+            self.check_random_edits(Grid.from_bytes(EXAMPLE.encode()), seed=2)
+
+    def test_should_restart_after_add_row(self):
+        grid = grid_from_text(EXAMPLE)
+        grid.set_cell(0, 0, 9)
+        grid.add_row([9, 9, 9, 9, 9])
+        self.assertCurrent(grid)
+        grid.set_cell(5, 0, 0)
+        self.assertCurrent(grid)
+
+    def test_should_reject_invalid_edits(self):
+        grid = grid_from_text(EXAMPLE)
+        self.assertRaises(IndexError, grid.set_cell, 5, 0, 1)
+        self.assertRaises(IndexError, grid.set_cell, 0, -1, 1)
+        self.assertRaises(ValueError, grid.set_cell, 0, 0, 10)
+        self.assertRaises(IndexError, Grid().set_cell, 0, 0, 1)
+
+
+class FromBytesTestCase(TestCase):
+    def text(self, rows, columns, seed, max_height=9):
+        rng = random.Random(seed)
+        return "".join("".join(str(rng.randint(0, max_height)) for _ in range(columns)) + "\n" for _ in range(rows))
+
+    def assertSameAnswers(self, text):
+        expected = grid_from_text(text)
+        grid = Grid.from_bytes(text.encode())
+        self.assertEqual((grid.row_count, grid.column_count), (expected.row_count, expected.column_count))
+        self.assertEqual(grid.get_cell(1, 2), expected.get_cell(1, 2))
+        self.assertIs(type(grid.get_cell(1, 2)), int)
+        self.assertEqual(grid.count_visible_cells(), expected.count_visible_cells())
+        self.assertEqual([list(row) for row in grid.visibility_mask()],
+                         [list(row) for row in expected.visibility_mask()])
+        self.assertEqual([list(row) for row in grid.scenic_scores()], expected.scenic_scores())
+        self.assertEqual(grid.best_scenic_cell(), expected.best_scenic_cell())
+        self.assertEqual(grid.best_scenic_score(), expected.best_scenic_score())
+        for k in (1, 4, 5, grid.row_count * grid.column_count + 1):
+            self.assertEqual(grid.top_scenic_cells(k), expected.top_scenic_cells(k))
+
+    def check_backend(self):
+        self.assertSameAnswers(EXAMPLE)
+        self.assertSameAnswers(EXAMPLE.rstrip("\n"))
+        for seed, (rows, columns) in enumerate([(9, 9), (4, 13), (15, 3)]):
+            self.assertSameAnswers(self.text(rows, columns, seed, max_height=seed * 3 + 2))
+        # lots of tied scores, which every backend has to order the same way
+        for seed in range(20):
+            self.assertSameAnswers(self.text(7, 5, seed, max_height=2))
+
+    @unittest.skipIf(treetop_treehouse.numpy is None, "numpy is not installed")
+    def test_numpy_backend_should_match_list_backed_grid(self):
+        self.assertTrue(Grid.from_bytes(EXAMPLE.encode())._numpy_backed())
+        self.check_backend()
+
+    def test_bytearray_backend_should_match_list_backed_grid(self):
+        with mock.patch.object(treetop_treehouse, "numpy", None):
+            self.assertIsInstance(Grid.from_bytes(EXAMPLE.encode()).rows[0], bytearray)
+            self.check_backend()
+
+    def test_should_keep_accepting_rows(self):
+        grid = Grid.from_bytes(b"123\n456\n")
+        grid.add_row([7, 8, 9])
+        self.assertEqual(grid.row_count, 3)
+        self.assertEqual(grid.get_cell(2, 1), 8)
+        self.assertEqual(grid.count_visible_cells(), 9)
+
+    def test_should_parse_empty_input(self):
+        self.assertEqual(Grid.from_bytes(b"").row_count, 0)
+
+    def check_rejects_malformed_input(self):
+        for data in (b"123\n45\n678\n", b"123\n4567\n", b"123\n\n456\n", b"12a\n456\n", b"123\n4/6\n", b"1 3\n456"):
+            self.assertRaises(ValueError, Grid.from_bytes, data)
+
+    @unittest.skipIf(treetop_treehouse.numpy is None, "numpy is not installed")
+    def test_numpy_backend_should_reject_malformed_input(self):
+        self.check_rejects_malformed_input()
+
+    def test_bytearray_backend_should_reject_malformed_input(self):
+        with mock.patch.object(treetop_treehouse, "numpy", None):
+            self.check_rejects_malformed_input()
+
+
+class InstrumentationTestCase(TestCase):
+    def setUp(self):
+        self.recorder = CountingRecorder()
+        set_recorder(treetop_treehouse, self.recorder)
+        self.addCleanup(set_recorder, treetop_treehouse, None)
+
+    def test_should_report_phases_and_counters_of_solve(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "input.txt")
+            with open(path, "w") as f:
+                f.write(EXAMPLE)
+            self.assertEqual(treetop_treehouse.solve(path), (21, 8))
+        self.assertEqual(self.recorder.phases, ["parse", "visibility", "scenic"])
+        self.assertEqual(self.recorder.counters["visibility_cells"], 25)
+        self.assertEqual(self.recorder.counters["scenic_cells"], 25)
+
+    def test_should_count_scan_lengths(self):
+        grid = grid_from_text(EXAMPLE)
+        self.assertEqual(grid.cell_scenic_score(3, 2), 8)
+        counters = self.recorder.counters
+        self.assertEqual([counters["scan_length_" + direction] for direction in ("up", "left", "down", "right")],
+                         [2, 2, 1, 2])
+        self.assertEqual(grid.best_scenic_cell(), (8, 3, 2))
+        # the edge rows cannot beat 8, so only the 3 middle rows are swept and 2 of their 9 inner cells can still win
+        self.assertEqual([counters["pruned_cells_" + kind] for kind in ("skipped", "scanned", "evaluated")],
+                         [10, 2, 2])
+
+    def test_should_stop_reporting_when_recorder_is_removed(self):
+        set_recorder(treetop_treehouse, None)
+        grid_from_text(EXAMPLE).count_visible_cells()
+        self.assertEqual(self.recorder.counters, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,19 +1,100 @@
 #!/usr/bin/env python3
+import array
+import contextlib
+import heapq
+import operator
 import sys
 import typing
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+try:
+    from instrumentation import phase
+except ImportError:
+    # run as a script from this directory, instrumentation.py one directory up is not importable and so no recorder
+    # can be set either
+    def phase(recorder, name):
+        return contextlib.nullcontext()
+
+# maps the digits b"0".."9" to the heights 0..9
+DIGIT_HEIGHTS = bytes(range(256)).replace(b"0123456789", bytes(range(10)))
+
+# set with instrumentation.set_recorder; None when instrumentation is off, which every hook checks first
+_recorder = None
+
 
 class Grid:
     def __init__(self):
-        self.rows: typing.List[typing.List[int]] = []
+        # either a list of rows (any int sequences) or, for grids loaded with numpy available, a 2D uint8 array
+        self.rows: typing.Union[typing.List[typing.Sequence[int]], "numpy.ndarray"] = []
+        # the analysis kept current by set_cell, built on its first call
+        self._live: typing.Optional[_LiveAnalysis] = None
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "Grid":
+        """
+        parses a whole height map at once: into a uint8 numpy array with a single subtraction of b"0" when numpy is
+        available, else into one bytearray (one byte per cell) per row. raises ValueError on rows of different widths or
+        anything but digits, which would otherwise wrap around or pass through as bogus heights
+        """
+        grid = cls()
+        data = data.rstrip(b"\n")
+        if not data:
+            return grid
+        data += b"\n"
+        width = data.index(b"\n")
+        check_height_map(data, width)
+        if numpy is not None:
+            cells = numpy.frombuffer(data, dtype=numpy.uint8).reshape(-1, width + 1)
+            grid.rows = cells[:, :width] - ord("0")
+        else:
+            heights = data.translate(DIGIT_HEIGHTS)
+            grid.rows = [bytearray(heights[start:start + width]) for start in range(0, len(heights), width + 1)]
+        return grid
+
+    @classmethod
+    def load(cls, path) -> "Grid":
+        with phase(_recorder, "parse"), open(path, "rb") as f:
+            return cls.from_bytes(f.read())
+
+    def _numpy_backed(self):
+        return numpy is not None and isinstance(self.rows, numpy.ndarray)
 
     def add_row(self, row: typing.List[int]):
+        self._live = None
+        if self._numpy_backed():
+            self.rows = list(self.rows)
         self.rows.append(row)
 
     def get_cell(self, row_num, col) -> int:
         if row_num >= len(self.rows) or col >= len(self.rows[0]):
             raise IndexError("Invalid cell")
-        return self.rows[row_num][col]
+        return int(self.rows[row_num][col])
+
+    def set_cell(self, row_num, col, height):
+        """
+        changes the height of one tree, keeping count_visible_cells and best_scenic_cell current: only the row and the
+        column of the cell can change visibility or scores, so only those are swept again, O(rows + columns) plus
+        O(log(rows * columns)) per changed score. the first call builds the analysis in O(rows * columns)
+        """
+        if not (0 <= row_num < self.row_count and 0 <= col < self.column_count):
+            raise IndexError("Invalid cell")
+        if not 0 <= height <= 9:
+            raise ValueError(f"Invalid height {height}")
+        if self._live is None:
+            self._live = _LiveAnalysis(self)
+        if self._numpy_backed():
+            self.rows[row_num, col] = height
+        else:
+            try:
+                self.rows[row_num][col] = height
+            except TypeError:  # an immutable row
+                self.rows[row_num] = bytearray(self.rows[row_num])
+                self.rows[row_num][col] = height
+        self._live.update(row_num, col)
 
     @property
     def row_count(self):
@@ -67,18 +148,35 @@ class Grid:
                self.visible_from_left(row_index, col_index) or self.visible_from_below(row_index, col_index) or \
                self.visible_from_top(row_index, col_index)
 
+    def visibility_mask(self) -> typing.List[bytearray]:
+        """
+        marks every cell visible from outside the grid with a 1, in four directional sweeps that keep the tallest tree
+        seen so far: O(rows * columns) in total
+        """
+        if _recorder is not None:
+            _recorder.count("visibility_cells", len(self.rows) and len(self.rows) * self.column_count)
+        if self._numpy_backed():
+            return _numpy_visibility_mask(self.rows)
+        if not len(self.rows):
+            return []
+        columns = self.column_count
+        mask = [row_visibility(row) for row in self.rows]
+
+        for rows, masks in ((self.rows, mask), (self.rows[::-1], mask[::-1])):
+            tallest = [-1] * columns
+            for row, visible in zip(rows, masks):
+                for col in range(columns):
+                    if row[col] > tallest[col]:
+                        visible[col] = 1
+                        tallest[col] = row[col]
+        return mask
+
     def count_visible_cells(self):
-        # assuming a perfect square
-        visible = self.row_count * 2 + (self.row_count - 2) * 2  # total number of cells on outer grid
-        row = 1
-        while row < self.row_count - 1:
-            col = 1  # skip first col
-            while col < self.column_count - 1:  # skip last column
-                if self.is_cell_visible(row, col):
-                    visible += 1
-                col += 1
-            row += 1
-        return visible
+        if self._live is not None:
+            return self._live.visible_count
+        if self._numpy_backed():
+            return int(self.visibility_mask().sum())
+        return sum(visible.count(1) for visible in self.visibility_mask())
 
     def cell_scenic_score(self, row_index, col_index):
         total_scenic_score = 1
@@ -93,6 +191,8 @@ class Grid:
                 break
             start += 1
         total_scenic_score *= sc
+        if _recorder is not None:
+            _recorder.count("scan_length_down", sc)
 
         # looking above
         start = row_index - 1
@@ -103,6 +203,8 @@ class Grid:
                 break
             start -= 1
         total_scenic_score *= sc
+        if _recorder is not None:
+            _recorder.count("scan_length_up", sc)
 
         # looking from right
         start = col_index + 1
@@ -114,6 +216,8 @@ class Grid:
                 break
             start += 1
         total_scenic_score *= sc
+        if _recorder is not None:
+            _recorder.count("scan_length_right", sc)
 
         # looking from left
         start = col_index - 1
@@ -125,21 +229,321 @@ class Grid:
                 break
             start -= 1
         total_scenic_score *= sc
+        if _recorder is not None:
+            _recorder.count("scan_length_left", sc)
 
         return total_scenic_score
 
+    def scenic_scores(self) -> typing.List[typing.List[int]]:
+        """
+        the scenic score of every cell, with one monotonic stack sweep per direction: O(rows * columns) in total
+        """
+        if _recorder is not None:
+            _recorder.count("scenic_cells", len(self.rows) and len(self.rows) * self.column_count)
+        if self._numpy_backed():
+            return _numpy_scenic_scores(self.rows)
+        scores = []
+        for row in self.rows:
+            left = viewing_distances(row)
+            right = viewing_distances(row[::-1])[::-1]
+            scores.append([a * b for a, b in zip(left, right)])
+        for col, column in enumerate(zip(*self.rows)):
+            up = viewing_distances(column)
+            down = viewing_distances(column[::-1])[::-1]
+            for row_index, row_scores in enumerate(scores):
+                row_scores[col] *= up[row_index] * down[row_index]
+        return scores
+
+    def best_scenic_cell(self) -> typing.Optional[typing.Tuple[int, int, int]]:
+        """
+        (score, row_index, col_index) of the cell with the best scenic score, the first one in row order on ties
+        """
+        if self._live is not None:
+            return self._live.best_cell()
+        if self._numpy_backed():
+            if not self.rows.size:
+                return None
+            scores = self.scenic_scores()
+            row_index, col_index = numpy.unravel_index(numpy.argmax(scores), scores.shape)
+            return int(scores[row_index, col_index]), int(row_index), int(col_index)
+        return self._pruned_best_scenic_cell()
+
+    def top_scenic_cells(self, k) -> typing.List[typing.Tuple[int, int, int]]:
+        """
+        (score, row_index, col_index) of the {k} cells with the best scenic scores, best first and in row order on ties,
+        whichever the backend
+        """
+        if self._numpy_backed():
+            scores = self.scenic_scores().ravel()
+            k = min(k, scores.size)
+            if k <= 0:
+                return []
+            # every cell tied with the k-th best score is a candidate, so the cut keeps the first ones in row order
+            kth_score = numpy.partition(scores, scores.size - k)[scores.size - k]
+            candidates = numpy.flatnonzero(scores >= kth_score)
+            # the flat index of a cell is its row order, the last key of lexsort is the primary one
+            top = candidates[numpy.lexsort((candidates, -scores[candidates]))[:k]]
+            return [(int(scores[i]), int(i // self.column_count), int(i % self.column_count)) for i in top]
+        return heapq.nsmallest(k, ((score, row_index, col_index)
+                                   for row_index, row_scores in enumerate(self.scenic_scores())
+                                   for col_index, score in enumerate(row_scores)),
+                               key=lambda cell: (-cell[0], cell[1], cell[2]))
+
     def best_scenic_score(self):
-        best_scenic_score = 0
-        row = 1
-        while row < self.row_count - 1:
-            col = 1  # skip first col
-            while col < self.column_count - 1:  # skip last column
-                sc = self.cell_scenic_score(row, col)
-                if sc > best_scenic_score:
-                    best_scenic_score = sc
-                col += 1
-            row += 1
-        return best_scenic_score
+        best = self.best_scenic_cell()
+        return best[0] if best else 0
+
+    def _pruned_best_scenic_cell(self) -> typing.Optional[typing.Tuple[int, int, int]]:
+        """
+        best_scenic_cell for list backed grids, found with pruning instead of scoring every cell. the numpy backend
+        sweeps every cell in less time than this takes, so it does not use it
+
+        a viewing distance is at most the distance to the edge, so a cell in row r scores at most
+        r * (R-1-r) * ((C-1) // 2) * (C-1 - (C-1) // 2). rows are visited in descending order of that bound and the
+        search stops at the first one that cannot reach the best score so far. within a row the left/right distances
+        come from one viewing_distances sweep, which tightens the bound of each cell to left * right * r * (R-1-r):
+        cells that cannot win are skipped, and the others scan up, then down only when up * down-edge still can. a
+        cell whose bound only ties the best is still scored when it comes first in row order
+        """
+        rows, columns = self.row_count, self.column_count if self.row_count else 0
+        if not rows or not columns:
+            return None
+        heights = [bytes(row) for row in self.rows]
+        widest = (columns - 1) // 2 * (columns - 1 - (columns - 1) // 2)
+        # edge cells score 0 whatever their neighbours, and the first one in row order is (0, 0)
+        best, best_row, best_col = 0, 0, 0
+        swept = scanned = evaluated = scanned_up = scanned_down = 0
+        for row_factor, row_index in sorted(((r * (rows - 1 - r), r) for r in range(rows)), reverse=True):
+            if row_factor * widest < best:
+                break
+            swept += 1
+            row = heights[row_index]
+            left = viewing_distances(row)
+            right = viewing_distances(row[::-1])[::-1]
+            down_edge = rows - 1 - row_index
+            for col in range(1, columns - 1):
+                across = left[col] * right[col]
+                bound = across * row_factor
+                if bound < best or bound == best and (row_index, col) > (best_row, best_col):
+                    continue
+                height = row[col]
+                up = row_index
+                for index in range(row_index - 1, -1, -1):
+                    if heights[index][col] >= height:
+                        up = row_index - index
+                        break
+                scanned += 1
+                scanned_up += up
+                bound = across * up * down_edge
+                if bound < best or bound == best and (row_index, col) > (best_row, best_col):
+                    continue
+                down = down_edge
+                for index in range(row_index + 1, rows):
+                    if heights[index][col] >= height:
+                        down = index - row_index
+                        break
+                evaluated += 1
+                scanned_down += down
+                score = across * up * down
+                if score > best or (score == best and (row_index, col) < (best_row, best_col)):
+                    best, best_row, best_col = score, row_index, col
+        if _recorder is not None:
+            # cells of the rows never swept had no work done at all; the cells of swept rows that never scanned up
+            # still had their left/right distances computed
+            _recorder.count("pruned_cells_skipped", (rows - swept) * columns)
+            _recorder.count("pruned_cells_scanned", scanned)
+            _recorder.count("pruned_cells_evaluated", evaluated)
+            _recorder.count("pruned_scan_length_up", scanned_up)
+            _recorder.count("pruned_scan_length_down", scanned_down)
+        return best, best_row, best_col
+
+
+class _LiveAnalysis:
+    """
+    the visibility and scenic scores of a grid split by axis, so a changed cell only needs its row and its column
+    swept again: per row the left/right visibility and left * right distance product, per column the same top/bottom.
+    a cell is visible when either axis says so and scores the product of both. the scores also sit in a max segment
+    tree over the cells in row order, padded to a power of two, for the best cell. the products and the tree are int64
+    arrays rather than lists, so a large grid costs 8 bytes per entry instead of a python int each
+    """
+
+    def __init__(self, grid: Grid):
+        self.grid = grid
+        self.rows, self.columns = grid.row_count, grid.column_count
+        self.row_visible, self.row_products = [], []
+        for row_index in range(self.rows):
+            visible, products = self._sweep(self._row(row_index))
+            self.row_visible.append(visible)
+            self.row_products.append(products)
+        self.column_visible, self.column_products = [], []
+        for col in range(self.columns):
+            visible, products = self._sweep(self._column(col))
+            self.column_visible.append(visible)
+            self.column_products.append(products)
+
+        self.visible_count = sum(1 for row_index in range(self.rows) for col in range(self.columns)
+                                 if self._visible(row_index, col))
+        self.leaves = 1 << (self.rows * self.columns - 1).bit_length()
+        self.tree = array.array("q", [-1]) * (2 * self.leaves)
+        for row_index in range(self.rows):
+            start = self.leaves + row_index * self.columns
+            self.tree[start:start + self.columns] = array.array("q", map(operator.mul, self.row_products[row_index],
+                                                                         (products[row_index]
+                                                                          for products in self.column_products)))
+        for node in range(self.leaves - 1, 0, -1):
+            self.tree[node] = max(self.tree[2 * node], self.tree[2 * node + 1])
+
+    def _row(self, row_index):
+        return bytes(self.grid.rows[row_index])
+
+    def _column(self, col):
+        return bytes(row[col] for row in self.grid.rows)
+
+    @staticmethod
+    def _sweep(heights):
+        before = viewing_distances(heights)
+        after = viewing_distances(heights[::-1])[::-1]
+        return row_visibility(heights), array.array("q", map(operator.mul, before, after))
+
+    def _visible(self, row_index, col):
+        return self.row_visible[row_index][col] or self.column_visible[col][row_index]
+
+    def _score(self, row_index, col):
+        return self.row_products[row_index][col] * self.column_products[col][row_index]
+
+    def update(self, row_index, col):
+        """
+        sweeps row {row_index} and column {col} again after the height of their shared cell changed
+        """
+        cells = [(row_index, c) for c in range(self.columns)] + [(r, col) for r in range(self.rows) if r != row_index]
+        self.visible_count -= sum(1 for cell in cells if self._visible(*cell))
+        self.row_visible[row_index], self.row_products[row_index] = self._sweep(self._row(row_index))
+        self.column_visible[col], self.column_products[col] = self._sweep(self._column(col))
+        self.visible_count += sum(1 for cell in cells if self._visible(*cell))
+        for cell in cells:
+            self._set_score(cell[0] * self.columns + cell[1], self._score(*cell))
+
+    def _set_score(self, position, score):
+        tree = self.tree
+        node = self.leaves + position
+        if tree[node] == score:
+            return
+        tree[node] = score
+        node //= 2
+        while node:
+            best = max(tree[2 * node], tree[2 * node + 1])
+            if tree[node] == best:
+                break
+            tree[node] = best
+            node //= 2
+
+    def best_cell(self) -> typing.Optional[typing.Tuple[int, int, int]]:
+        if not self.rows:
+            return None
+        tree = self.tree
+        node = 1
+        while node < self.leaves:  # the leftmost leaf holding the max, so the first cell in row order on ties
+            node = 2 * node if tree[2 * node] == tree[node] else 2 * node + 1
+        row_index, col = divmod(node - self.leaves, self.columns)
+        return tree[1], row_index, col
+
+
+def check_height_map(data: bytes, width):
+    """
+    raises ValueError unless {data} is rows of {width} digits, each followed by a newline
+    """
+    row_count, rest = divmod(len(data), width + 1)
+    if not width or rest or data.count(b"\n") != row_count or data[width::width + 1] != b"\n" * row_count:
+        raise ValueError(f"the rows of the height map are not all {width} trees wide")
+    if data.translate(None, b"0123456789\n"):
+        raise ValueError("the height map holds something other than the digits 0-9")
+
+
+def row_visibility(heights: typing.Sequence[int]) -> bytearray:
+    """
+    marks the trees visible from either end of {heights} with a 1
+    """
+    visible = bytearray(len(heights))
+    for indices in (range(len(heights)), range(len(heights) - 1, -1, -1)):
+        tallest = -1
+        for index in indices:
+            if heights[index] > tallest:
+                visible[index] = 1
+                tallest = heights[index]
+                if tallest == 9:  # nothing further can be seen past the tallest possible tree
+                    break
+    return visible
+
+
+def viewing_distances(heights: typing.Sequence[int]) -> typing.List[int]:
+    """
+    for every tree, how many trees it sees looking towards index 0: up to and including the nearest tree at least as
+    tall, or up to the edge. the stack keeps the indices of the trees that can still block a view, tallest at the bottom
+    """
+    distances = [0] * len(heights)
+    stack = []
+    for index, height in enumerate(heights):
+        while stack and heights[stack[-1]] < height:
+            stack.pop()
+        distances[index] = index - stack[-1] if stack else index
+        stack.append(index)
+    return distances
+
+
+def _numpy_visibility_mask(heights):
+    """
+    a cell is visible from a direction when it is taller than the running maximum of the cells before it
+    """
+    heights = heights.astype(numpy.int16)
+    visible = numpy.zeros(heights.shape, dtype=bool)
+    for axis in (0, 1):
+        for flip in (False, True):
+            h = numpy.flip(heights, axis) if flip else heights
+            tallest_before = numpy.full_like(h, -1)
+            running_max = numpy.maximum.accumulate(h, axis=axis)
+            if axis == 0:
+                tallest_before[1:] = running_max[:-1]
+            else:
+                tallest_before[:, 1:] = running_max[:, :-1]
+            seen = h > tallest_before
+            visible |= numpy.flip(seen, axis) if flip else seen
+    return visible.astype(numpy.uint8)
+
+
+def _numpy_viewing_distances(heights, axis):
+    """
+    vectorized viewing_distances along {axis}, one row (or column) at a time: for every height level and column we
+    keep the index of the last row with a tree at least that tall, which is the nearest blocker for that height
+    """
+    if axis == 1:
+        return _numpy_viewing_distances(numpy.ascontiguousarray(heights.T), 0).T
+    columns = numpy.arange(heights.shape[1])
+    levels = numpy.arange(int(heights.max(initial=0)) + 1, dtype=heights.dtype)[:, None]
+    nearest_blocker = numpy.zeros((len(levels), heights.shape[1]), dtype=numpy.int32)
+    distances = numpy.empty(heights.shape, dtype=numpy.int32)
+    for row_index, row in enumerate(heights):
+        distances[row_index] = row_index - nearest_blocker[row, columns]
+        numpy.putmask(nearest_blocker, levels <= row, row_index)
+    return distances
+
+
+def _numpy_scenic_scores(heights):
+    scores = numpy.ones(heights.shape, dtype=numpy.int64)
+    for axis in (0, 1):
+        scores *= _numpy_viewing_distances(heights, axis)
+        scores *= numpy.flip(_numpy_viewing_distances(numpy.flip(heights, axis), axis), axis)
+    return scores
+
+
+def solve(path):
+    """
+    (visible tree count, best scenic score) of the height map in {path}
+    """
+    grid = Grid.load(path)
+    with phase(_recorder, "visibility"):
+        visible_count = grid.count_visible_cells()
+    with phase(_recorder, "scenic"):
+        return visible_count, grid.best_scenic_score()
 
 
 if __name__ == "__main__":
@@ -147,12 +551,7 @@ if __name__ == "__main__":
         print("usage: ./treetop.py input.txt")
         exit(1)
 
-    input_text = sys.argv[1]
-    grid = Grid()
-
-    for line in open(input_text, "r"):
-        row = [int(num) for num in line.strip("\n")]
-        grid.add_row(row)
+    visible_count, best_scenic_score = solve(sys.argv[1])
 
-    print(grid.count_visible_cells())
-    print(grid.best_scenic_score())
+    print(visible_count)
+    print(best_scenic_score)
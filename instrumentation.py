@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+import collections
+import contextlib
+import json
+import sys
+import time
+
+
+def set_recorder(solver, recorder):
+    """
+    sends the phase timings and counters of the {solver} module to {recorder} (anything with phase(name) and
+    count(name, amount)), or turns its instrumentation off again when it is None. the solver keeps the recorder in its
+    _recorder global, which its hot paths check for None before reporting anything
+    """
+    solver._recorder = recorder
+
+
+def phase(recorder, name):
+    """
+    the phase {name} of {recorder}, or a context doing nothing when instrumentation is off and {recorder} is None
+    """
+    return recorder.phase(name) if recorder is not None else contextlib.nullcontext()
+
+
+class CountingRecorder:
+    """
+    keeps the names of the phases in the order they end and the counter totals in memory, for tests and quick looks
+    from a REPL
+    """
+
+    def __init__(self):
+        self.phases = []
+        self.counters = collections.Counter()
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        yield
+        self.phases.append(name)
+
+    def count(self, name, amount=1):
+        self.counters[name] += amount
+
+
+class JsonLinesRecorder:
+    """
+    collects the phase timings and counters reported by a solver after set_recorder(recorder) and writes them to {out}
+    as JSON lines: one {"event": "phase"} line as each phase ends, one {"event": "counters"} line per flush(). every
+    line also carries the {labels}, e.g. the day and the input, so the lines of many runs can go into one file
+    """
+
+    def __init__(self, out, **labels):
+        self.out = out
+        self.labels = labels
+        self.counters = collections.Counter()
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._write(event="phase", phase=name, seconds=time.perf_counter() - start)
+
+    def count(self, name, amount=1):
+        self.counters[name] += amount
+
+    def flush(self):
+        self._write(event="counters", counters=dict(self.counters))
+        self.counters.clear()
+
+    def _write(self, **fields):
+        self.out.write(json.dumps({**self.labels, **fields}) + "\n")
+
+
+def profile(day, input_file, out=sys.stdout):
+    """
+    runs the solver of {day} on {input_file} with a JsonLinesRecorder writing to {out}, returning its answers
+    """
+    # the solvers import this module for their hooks, so the runner is only loaded once something is profiled
+    from main import import_solver
+
+    solver = import_solver(day)
+    recorder = JsonLinesRecorder(out, day=day, input=input_file)
+    set_recorder(solver, recorder)
+    try:
+        with recorder.phase("total"):
+            answers = solver.solve(input_file)
+    finally:
+        set_recorder(solver, None)
+    recorder.flush()
+    return answers
+
+
+if __name__ == "__main__":
+    from main import SOLVERS
+
+    if len(sys.argv) < 3 or sys.argv[1] not in SOLVERS:
+        print(f"usage: instrumentation.py {{{'|'.join(SOLVERS)}}} {{input-file}} [output-file]")
+        exit(1)
+    if len(sys.argv) > 3:
+        with open(sys.argv[3], "a") as f:
+            print(profile(sys.argv[1], sys.argv[2], f))
+    else:
+        print(profile(sys.argv[1], sys.argv[2]))
@@ -1,4 +1,148 @@
 #!/usr/bin/env python3
+import argparse
+import contextlib
+import hashlib
+import importlib
+import importlib.util
+import json
+import os
+import sys
+import tempfile
 
+DAYS_DIR = os.path.dirname(os.path.abspath(__file__))
+# the solver module of every day directory, each with a solve(path) returning its answers
+SOLVERS = {"day7": "filesystem_full", "day8": "treetop_treehouse"}
+DEFAULT_CACHE_DIR = os.path.join(os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")), "aoc2022")
+DEFAULT_CACHE_SIZE = 16 << 20
 
-print("hello world")
\ No newline at end of file
+
+def day_module(day, name):
+    """
+    imports the module {name} of the {day} directory. the day directories are not packages, their modules import each
+    other as top level modules, so the directory goes on sys.path first
+    """
+    day_dir = os.path.join(DAYS_DIR, day)
+    if day_dir not in sys.path:
+        sys.path.insert(0, day_dir)
+    return importlib.import_module(name)
+
+
+def import_solver(day):
+    return day_module(day, SOLVERS[day])
+
+
+def _file_digest(path):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def solver_digest(day):
+    """
+    a digest of the source of the solver of {day}, found without importing it
+    """
+    return _file_digest(os.path.join(DAYS_DIR, day, SOLVERS[day] + ".py"))
+
+
+class ResultCache:
+    """
+    solver answers on disk, one small JSON file per (day, solver source, input contents) so a changed solver or input
+    never hits a stale entry. once the files take more than {max_bytes}, the least recently used ones (by mtime, which
+    every hit refreshes) are evicted
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_CACHE_SIZE):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._solver_digests = {}
+
+    def key(self, day, input_file):
+        """
+        the entry of the answers of {day} for the current contents of {input_file}. it hashes the whole input, so it is
+        computed once and handed to both get and put
+        """
+        if day not in self._solver_digests:
+            self._solver_digests[day] = solver_digest(day)
+        return os.path.join(self.cache_dir, f"{day}-{self._solver_digests[day]}-{_file_digest(input_file)}.json")
+
+    def get(self, key):
+        try:
+            with open(key) as f:
+                answers = json.load(f)
+        except (OSError, ValueError):
+            return None
+        # another run may have evicted the entry since it was read
+        with contextlib.suppress(FileNotFoundError):
+            os.utime(key)
+        return tuple(answers)
+
+    def put(self, key, answers):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # written to a temporary file of its own and renamed, so a concurrent run never reads half an entry and two runs
+        # putting the same entry never write into the same file
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(list(answers), f)
+            os.replace(tmp_path, key)
+        except BaseException:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(tmp_path)
+            raise
+        self.evict()
+
+    def evict(self):
+        entries = []
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if entry.name.endswith(".json"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+def run(day, input_files, cache=None):
+    """
+    yields (input_file, answers) for each of {input_files}, solved in this process by the solver of {day}, which is
+    imported only once the {cache} misses
+    """
+    solver = None
+    for input_file in input_files:
+        key = answers = None
+        if cache is not None:
+            key = cache.key(day, input_file)
+            answers = cache.get(key)
+        if answers is None:
+            if solver is None:
+                solver = import_solver(day)
+            answers = tuple(solver.solve(input_file))
+            if cache is not None:
+                cache.put(key, answers)
+        yield input_file, answers
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="solves the inputs of a day, caching the answers")
+    parser.add_argument("day", choices=sorted(SOLVERS))
+    parser.add_argument("input_files", nargs="+")
+    parser.add_argument("--no-cache", action="store_true")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR)
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_CACHE_SIZE, help="in bytes")
+    args = parser.parse_args()
+
+    result_cache = None if args.no_cache else ResultCache(args.cache_dir, args.cache_size)
+    for input_file, answers in run(args.day, args.input_files, result_cache):
+        if len(args.input_files) > 1:
+            print(f"{input_file}:")
+        for answer in answers:
+            print(answer)
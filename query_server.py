@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+import argparse
+import asyncio
+import collections
+import json
+import socket
+import threading
+import time
+
+from main import day_module
+
+# the longest request line a connection reads, well past the default 64 KiB so large batches fit
+STREAM_LIMIT = 64 << 20
+
+
+class QueryStats:
+    """
+    request counts and latencies per op since the server started
+    """
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.requests = 0
+        self.errors = 0
+        self.batches = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.op_counts = collections.Counter()
+        self.op_seconds = collections.Counter()
+
+    def record(self, op, seconds, error=False):
+        self.requests += 1
+        self.errors += error
+        self.op_counts[op] += 1
+        self.op_seconds[op] += seconds
+
+    def as_dict(self):
+        uptime = time.monotonic() - self.started
+        return {
+            "uptime_seconds": uptime,
+            "requests": self.requests,
+            "requests_per_second": self.requests / uptime if uptime else 0.0,
+            "errors": self.errors,
+            "batches": self.batches,
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "mean_latency_us": {op: self.op_seconds[op] / count * 1e6 for op, count in self.op_counts.items()},
+        }
+
+
+class QueryHandler:
+    """
+    answers {"id": .., "op": .., "args": [..]} requests with {"id": .., "result": ..} or {"id": .., "error": ..}. an op
+    is answered by the query_<op> method of the subclass, and the results of the last {cache_size} distinct
+    (op, args) pairs are kept in an LRU cache: the data never changes while it is being served. requests may be handled
+    from several threads at once, the cache and the stats are updated under a lock
+    """
+
+    def __init__(self, cache_size=4096):
+        self.cache_size = cache_size
+        self._cache = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = QueryStats()
+
+    def handle(self, request):
+        start = time.perf_counter()
+        response = {"id": request.get("id")} if isinstance(request, dict) else {"id": None}
+        op = request.get("op") if isinstance(request, dict) else None
+        try:
+            if op == "stats":
+                response["result"] = self.stats.as_dict()
+            else:
+                response["result"] = self._cached(op, request.get("args", []))
+        except (AttributeError, IndexError, KeyError, TypeError, ValueError) as e:
+            response["error"] = f"{type(e).__name__}: {e}"
+        with self._lock:
+            self.stats.record(str(op), time.perf_counter() - start, error="error" in response)
+        return response
+
+    def handle_batch(self, requests):
+        with self._lock:
+            self.stats.batches += 1
+        return [self.handle(request) for request in requests]
+
+    def _cached(self, op, args):
+        method = getattr(self, f"query_{op}", None) if isinstance(op, str) else None
+        if method is None:
+            raise ValueError(f"unknown op {op!r}")
+        key = (op, json.dumps(args))
+        with self._lock:
+            if key in self._cache:
+                self.stats.cache_hits += 1
+                self._cache.move_to_end(key)
+                return self._cache[key]
+            self.stats.cache_misses += 1
+        # computed outside the lock, so a slow answer does not hold up the others
+        result = method(*args)
+        with self._lock:
+            self._cache[key] = result
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return result
+
+
+class FileSystemQueryHandler(QueryHandler):
+    def __init__(self, fs, cache_size=4096):
+        super().__init__(cache_size)
+        self.fs = fs
+
+    @classmethod
+    def load(cls, path, **kwargs):
+        filesystem_full = day_module("day7", "filesystem_full")
+        fs = filesystem_full.FileSystem(index_paths=True)
+        fs_state = filesystem_full.FileSystemState(fs)
+        with open(path, "rb") as transcript, fs_state.bulk_build():
+            filesystem_full.CliOutputProcessor(fs_state).process_stream(transcript)
+        fs.directory_size_index()
+        return cls(fs, **kwargs)
+
+    def query_find(self, path):
+        node = self.fs.find(path)
+        if node is None:
+            return None
+        return {"path": node.abs_path, "size": node.size, "level": node.level, "is_dir": hasattr(node, "children")}
+
+    def query_sum_at_most(self, max_size):
+        return self.fs.sum_dir_sizes_at_most(max_size)
+
+    def query_smallest_at_least(self, min_size):
+        return self.fs.smallest_dir_size_at_least(min_size)
+
+    def query_smallest_dir_to_delete(self, disk_size=70_000_000, required_space=30_000_000):
+        return self.fs.smallest_dir_size_at_least(self.fs.space_to_free(disk_size, required_space))
+
+    def query_du(self, top_k=10, max_depth=None):
+        return day_module("day7", "du").du_report(self.fs, top_k=top_k, max_depth=max_depth).largest
+
+
+class GridQueryHandler(QueryHandler):
+    """
+    whole grid answers come from the Grid, rectangle [first_row, first_col, last_row, last_col) and cell answers from a
+    GridIndex built on the first of them
+    """
+
+    def __init__(self, grid, cache_size=4096):
+        super().__init__(cache_size)
+        self.grid = grid
+        self._index = None
+        self._index_lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path, **kwargs):
+        return cls(day_module("day8", "treetop_treehouse").Grid.load(path), **kwargs)
+
+    @property
+    def index(self):
+        if self._index is None:
+            with self._index_lock:
+                if self._index is None:
+                    self._index = day_module("day8", "grid_index").GridIndex.from_grid(self.grid)
+        return self._index
+
+    def query_visible_count(self, *rectangle):
+        return self.index.visible_count(*rectangle) if rectangle else self.grid.count_visible_cells()
+
+    def query_best_scenic_score(self, *rectangle):
+        return self.index.best_scenic_score(*rectangle) if rectangle else self.grid.best_scenic_score()
+
+    def query_best_scenic_cell(self):
+        return self.grid.best_scenic_cell()
+
+    def query_is_visible(self, row_index, col_index):
+        return self.index.is_visible(row_index, col_index)
+
+    def query_scenic_score(self, row_index, col_index):
+        return self.index.scenic_score(row_index, col_index)
+
+
+HANDLERS = {"day7": FileSystemQueryHandler, "day8": GridQueryHandler}
+
+
+async def _read_line(reader):
+    """
+    the next line of {reader}, b"" once the client is done, or None for a line longer than the reader's limit, which is
+    read through to its end so the next line starts cleanly
+    """
+    overrun = False
+    while True:
+        try:
+            line = await reader.readuntil(b"\n")
+        except asyncio.IncompleteReadError as e:
+            line = e.partial
+        except asyncio.LimitOverrunError as e:
+            await reader.readexactly(e.consumed)
+            overrun = True
+            continue
+        return None if overrun else line
+
+
+async def _serve_connection(handler, reader, writer):
+    """
+    one JSON request or a JSON list of requests (a batch, answered with a list) per line. the answers are worked out in
+    the default executor, so a slow one (building the grid index, a du walk) does not stall the other connections
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            line = await _read_line(reader)
+            if line is None:
+                writer.write(json.dumps({"id": None, "error": "request too long"}).encode() + b"\n")
+                await writer.drain()
+                continue
+            if not line:
+                break
+            try:
+                request = json.loads(line)
+            except ValueError as e:
+                response = {"id": None, "error": f"invalid JSON: {e}"}
+            else:
+                answer = handler.handle_batch if isinstance(request, list) else handler.handle
+                response = await loop.run_in_executor(None, answer, request)
+            writer.write(json.dumps(response).encode() + b"\n")
+            await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def start_server(handler, unix_path=None, host="127.0.0.1", port=0, limit=STREAM_LIMIT):
+    """
+    an asyncio server answering queries with {handler} on the unix socket {unix_path}, else on {host}:{port}. request
+    lines longer than {limit} bytes get an error answer
+    """
+    def serve(reader, writer):
+        return _serve_connection(handler, reader, writer)
+
+    if unix_path is not None:
+        return await asyncio.start_unix_server(serve, path=unix_path, limit=limit)
+    return await asyncio.start_server(serve, host=host, port=port, limit=limit)
+
+
+def query(requests, unix_path=None, host="127.0.0.1", port=None):
+    """
+    sends {requests} (a list of request dicts) to a running server as one batch and returns the responses
+    """
+    if unix_path is not None:
+        connection = socket.socket(socket.AF_UNIX)
+        connection.connect(unix_path)
+    else:
+        connection = socket.create_connection((host, port))
+    with connection, connection.makefile("rwb") as stream:
+        stream.write(json.dumps(requests).encode() + b"\n")
+        stream.flush()
+        return json.loads(stream.readline())
+
+
+async def _main(args):
+    handler = HANDLERS[args.day].load(args.input_file, cache_size=args.cache_size)
+    server = await start_server(handler, unix_path=args.socket, host=args.host, port=args.port)
+    for address in (sock.getsockname() for sock in server.sockets):
+        print(f"serving {args.day} {args.input_file} on {address}", flush=True)
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="answers queries over a parsed day7 transcript or day8 height map")
+    parser.add_argument("day", choices=sorted(HANDLERS))
+    parser.add_argument("input_file")
+    parser.add_argument("--socket", help="unix socket path, instead of TCP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--cache-size", type=int, default=4096)
+    try:
+        asyncio.run(_main(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
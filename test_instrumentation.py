@@ -0,0 +1,95 @@
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest import TestCase, mock
+import instrumentation
+from instrumentation import JsonLinesRecorder, profile
+from main import DAYS_DIR, SOLVERS, import_solver
+
+GRID = "30373\n25512\n65332\n33549\n35390\n"
+
+
+class JsonLinesRecorderTestCase(TestCase):
+    def test_should_write_a_line_per_phase_and_per_flush(self):
+        out = io.StringIO()
+        recorder = JsonLinesRecorder(out, day="day8", input="input.txt")
+        with mock.patch.object(instrumentation.time, "perf_counter", side_effect=[1.0, 1.5, 2.0, 4.0]):
+            with recorder.phase("outer"):
+                with recorder.phase("inner"):
+                    recorder.count("cells", 25)
+            recorder.count("cells")
+            recorder.count("finds", 2)
+        recorder.flush()
+        recorder.flush()
+        self.assertEqual([json.loads(line) for line in out.getvalue().splitlines()], [
+            {"day": "day8", "input": "input.txt", "event": "phase", "phase": "inner", "seconds": 0.5},
+            {"day": "day8", "input": "input.txt", "event": "phase", "phase": "outer", "seconds": 3.0},
+            {"day": "day8", "input": "input.txt", "event": "counters", "counters": {"cells": 26, "finds": 2}},
+            {"day": "day8", "input": "input.txt", "event": "counters", "counters": {}},
+        ])
+
+    def test_should_end_a_phase_that_raises(self):
+        out = io.StringIO()
+        recorder = JsonLinesRecorder(out)
+        with self.assertRaises(KeyError), recorder.phase("failing"):
+            raise KeyError()
+        self.assertEqual(json.loads(out.getvalue())["phase"], "failing")
+
+
+class ProfileTestCase(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+
+    def profile_lines(self, day, text):
+        path = os.path.join(self.tmp_dir.name, "input.txt")
+        with open(path, "w") as f:
+            f.write(text)
+        out = io.StringIO()
+        answers = profile(day, path, out)
+        lines = [json.loads(line) for line in out.getvalue().splitlines()]
+        for line in lines:
+            self.assertEqual((line["day"], line["input"]), (day, path))
+        return answers, lines
+
+    def test_should_time_the_phases_of_a_solver(self):
+        answers, lines = self.profile_lines("day8", GRID)
+        self.assertEqual(answers, (21, 8))
+        phases = {line["phase"]: line["seconds"] for line in lines if line["event"] == "phase"}
+        self.assertEqual(list(phases), ["parse", "visibility", "scenic", "total"])
+        self.assertTrue(all(seconds >= 0 for seconds in phases.values()))
+        self.assertGreaterEqual(phases["total"], phases["parse"] + phases["visibility"] + phases["scenic"])
+        self.assertEqual(lines[-1]["event"], "counters")
+        self.assertEqual(lines[-1]["counters"]["visibility_cells"], 25)
+
+    def test_should_turn_instrumentation_off_afterwards(self):
+        answers, lines = self.profile_lines("day7", "$ cd /\n$ ls\n10 a\n")
+        self.assertEqual(answers, (10, 10))
+        self.assertEqual([line["phase"] for line in lines if line["event"] == "phase"][-1], "total")
+        self.assertIsNone(import_solver("day7")._recorder)
+
+
+class SolverImportTestCase(TestCase):
+    def test_should_not_load_the_runner_with_a_solver(self):
+        for day, solver in SOLVERS.items():
+            code = (f"import sys; sys.path[:0] = [{DAYS_DIR!r}, {os.path.join(DAYS_DIR, day)!r}]; import {solver}; "
+                    f"print(sorted({{'main', 'argparse', 'tempfile'}} & set(sys.modules)), {solver}._recorder)")
+            output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+            self.assertEqual(output.split(), ["[]", "None"], day)
+
+    def test_should_run_a_solver_as_a_script_without_instrumentation(self):
+        day_dir = os.path.join(DAYS_DIR, "day8")
+        with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as f:
+            f.write(GRID)
+        self.addCleanup(os.unlink, f.name)
+        result = subprocess.run([sys.executable, os.path.join(day_dir, "treetop_treehouse.py"), f.name],
+                                cwd=day_dir, capture_output=True, text=True, check=True)
+        self.assertIn("21", result.stdout)
+
+
+if __name__ == "__main__":
+    unittest.main()
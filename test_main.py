@@ -0,0 +1,85 @@
+import os
+import tempfile
+import unittest
+from unittest import TestCase, mock
+import main
+from main import ResultCache, run
+
+
+class RunTestCase(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.cache = ResultCache(os.path.join(self.tmp_dir.name, "cache"))
+
+    def write(self, name, text):
+        path = os.path.join(self.tmp_dir.name, name)
+        with open(path, "w") as f:
+            f.write(text)
+        return path
+
+    def test_should_solve_several_inputs_in_one_process(self):
+        small = self.write("small.txt", "30373\n25512\n65332\n33549\n35390\n")
+        tiny = self.write("tiny.txt", "99\n99\n")
+        self.assertEqual(list(run("day8", [small, tiny])), [(small, (21, 8)), (tiny, (4, 0))])
+        day7 = os.path.join(main.DAYS_DIR, "day7", "input.txt")
+        self.assertEqual(list(run("day7", [day7])), [(day7, (919137, 2877389))])
+
+    def test_should_answer_unchanged_inputs_from_cache(self):
+        path = self.write("input.txt", "30373\n25512\n65332\n33549\n35390\n")
+        self.assertEqual(list(run("day8", [path], self.cache)), [(path, (21, 8))])
+        with mock.patch.object(main, "import_solver") as import_solver:
+            import_solver.return_value.solve.return_value = (4, 0)
+            self.assertEqual(list(run("day8", [path], self.cache)), [(path, (21, 8))])
+            import_solver.assert_not_called()
+            self.write("input.txt", "99\n99\n")
+            self.assertEqual(list(run("day8", [path], self.cache)), [(path, (4, 0))])
+            import_solver.assert_called_once_with("day8")
+
+    def test_should_hash_each_input_once_on_a_miss(self):
+        path = self.write("input.txt", "30373\n25512\n65332\n33549\n35390\n")
+        with mock.patch.object(main, "_file_digest", wraps=main._file_digest) as file_digest:
+            self.assertEqual(list(run("day8", [path], self.cache)), [(path, (21, 8))])
+        self.assertEqual([args[0] for args, _ in file_digest.call_args_list].count(path), 1)
+
+    def test_should_miss_when_solver_changes(self):
+        path = self.write("input.txt", "30373\n")
+        self.cache.put(self.cache.key("day8", path), (5, 0))
+        self.assertEqual(self.cache.get(self.cache.key("day8", path)), (5, 0))
+        with mock.patch.object(main, "solver_digest", return_value="changed"):
+            cache = ResultCache(self.cache.cache_dir)
+            self.assertIsNone(cache.get(cache.key("day8", path)))
+
+    def test_should_evict_least_recently_used_entries(self):
+        # every entry is a 6 byte "[1, 1]", so two fit
+        cache = ResultCache(self.cache.cache_dir, max_bytes=15)
+        keys = [cache.key("day8", self.write(f"{i}.txt", str(i))) for i in range(3)]
+        cache.put(keys[0], (1, 1))
+        cache.put(keys[1], (2, 2))
+        os.utime(keys[0], (0, 0))
+        cache.put(keys[2], (3, 3))
+        self.assertIsNone(cache.get(keys[0]))
+        self.assertEqual(cache.get(keys[2]), (3, 3))
+        self.assertLessEqual(sum(os.path.getsize(os.path.join(cache.cache_dir, name))
+                                 for name in os.listdir(cache.cache_dir)), 15)
+
+    def test_should_answer_entries_evicted_while_being_read(self):
+        key = self.cache.key("day8", self.write("input.txt", "30373\n"))
+        self.cache.put(key, (5, 0))
+        with mock.patch.object(main.os, "utime", side_effect=FileNotFoundError):
+            self.assertEqual(self.cache.get(key), (5, 0))
+
+    def test_should_write_entries_through_temporary_files_of_their_own(self):
+        key = self.cache.key("day8", self.write("input.txt", "30373\n"))
+        with mock.patch.object(main.tempfile, "mkstemp", wraps=main.tempfile.mkstemp) as mkstemp:
+            self.cache.put(key, (5, 0))
+            self.cache.put(key, (5, 0))
+        self.assertEqual(mkstemp.call_count, 2)
+        self.assertEqual(os.listdir(self.cache.cache_dir), [os.path.basename(key)])
+        with mock.patch.object(main.json, "dump", side_effect=OSError):
+            self.assertRaises(OSError, self.cache.put, key, (5, 0))
+        self.assertEqual(len(os.listdir(self.cache.cache_dir)), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
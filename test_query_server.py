@@ -0,0 +1,135 @@
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import unittest
+from unittest import IsolatedAsyncioTestCase, TestCase
+from main import day_module
+from query_server import FileSystemQueryHandler, GridQueryHandler, query, start_server
+
+TRANSCRIPT = day_module("day7", "test_filesystem_full").TRANSCRIPT
+GRID = "30373\n25512\n65332\n33549\n35390\n"
+
+
+def write(tmp_dir, text):
+    path = os.path.join(tmp_dir, "input.txt")
+    with open(path, "w") as f:
+        f.write(text)
+    return path
+
+
+class QueryHandlerTestCase(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+
+    def test_should_answer_filesystem_queries(self):
+        handler = FileSystemQueryHandler.load(write(self.tmp_dir.name, TRANSCRIPT))
+        self.assertEqual(handler.handle({"id": 1, "op": "sum_at_most", "args": [100_000]}), {"id": 1, "result": 95437})
+        self.assertEqual(handler.handle({"op": "smallest_dir_to_delete"})["result"], 24933642)
+        self.assertEqual(handler.handle({"op": "find", "args": ["/a/e/i"]})["result"],
+                         {"path": "/a/e/i", "size": 584, "level": 3, "is_dir": False})
+        self.assertIsNone(handler.handle({"op": "find", "args": ["/nope/"]})["result"])
+        self.assertEqual(handler.handle({"op": "du", "args": [1]})["result"], [(48381165, 0, "/")])
+
+    def test_should_answer_grid_queries(self):
+        handler = GridQueryHandler.load(write(self.tmp_dir.name, GRID))
+        answers = handler.handle_batch([
+            {"op": "visible_count"}, {"op": "best_scenic_score"}, {"op": "visible_count", "args": [1, 1, 4, 4]},
+            {"op": "best_scenic_score", "args": [0, 0, 3, 3]}, {"op": "scenic_score", "args": [3, 2]},
+            {"op": "is_visible", "args": [2, 2]},
+        ])
+        self.assertEqual([answer["result"] for answer in answers], [21, 8, 5, 6, 8, False])
+
+    def test_should_cache_results_and_report_errors(self):
+        handler = GridQueryHandler.load(write(self.tmp_dir.name, GRID), cache_size=2)
+        for args in ([1, 1], [1, 1], [2, 2], [3, 3], [1, 1]):
+            handler.handle({"op": "scenic_score", "args": args})
+        self.assertIn("IndexError", handler.handle({"op": "scenic_score", "args": [9, 9]})["error"])
+        self.assertIn("unknown op", handler.handle({"op": "nope"})["error"])
+        stats = handler.handle({"op": "stats"})["result"]
+        self.assertEqual((stats["cache_hits"], stats["cache_misses"], stats["errors"]), (1, 5, 2))
+        self.assertEqual(stats["requests"], 7)
+        self.assertIn("scenic_score", stats["mean_latency_us"])
+
+
+class QueryServerTestCase(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.handler = GridQueryHandler.load(write(self.tmp_dir.name, GRID))
+
+    async def asyncTearDown(self):
+        self.tmp_dir.cleanup()
+
+    async def ask(self, reader, writer, request):
+        writer.write(json.dumps(request).encode() + b"\n")
+        await writer.drain()
+        return json.loads(await reader.readline())
+
+    async def test_should_serve_concurrent_connections_over_tcp(self):
+        server = await start_server(self.handler, port=0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            connections = [await asyncio.open_connection("127.0.0.1", port) for _ in range(3)]
+            answers = await asyncio.gather(*(self.ask(reader, writer, {"id": i, "op": "visible_count"})
+                                             for i, (reader, writer) in enumerate(connections)))
+            self.assertEqual(answers, [{"id": i, "result": 21} for i in range(3)])
+            reader, writer = connections[0]
+            writer.write(b"{\n")
+            self.assertIn("invalid JSON", json.loads(await reader.readline())["error"])
+            for _, writer in connections:
+                writer.close()
+
+    async def test_should_answer_batches_over_unix_socket(self):
+        path = os.path.join(self.tmp_dir.name, "server.sock")
+        server = await start_server(self.handler, unix_path=path)
+        async with server:
+            # the blocking client runs in a thread so the server keeps serving
+            requests = [{"id": "a", "op": "best_scenic_score"}, {"id": "b", "op": "scenic_score", "args": [1, 2]}]
+            answers = await asyncio.get_running_loop().run_in_executor(None, query, requests, path)
+        self.assertEqual(answers, [{"id": "a", "result": 8}, {"id": "b", "result": 4}])
+        self.assertEqual(self.handler.stats.batches, 1)
+
+    async def test_should_answer_batches_over_the_default_line_limit(self):
+        path = os.path.join(self.tmp_dir.name, "server.sock")
+        server = await start_server(self.handler, unix_path=path)
+        async with server:
+            requests = [{"id": i, "op": "scenic_score", "args": [i % 5, i // 5 % 5]} for i in range(3000)]
+            self.assertGreater(len(json.dumps(requests)), 64 << 10)
+            answers = await asyncio.get_running_loop().run_in_executor(None, query, requests, path)
+        self.assertEqual(len(answers), 3000)
+        self.assertEqual(answers[11], {"id": 11, "result": 4})
+
+    async def test_should_answer_too_long_lines_with_an_error_and_keep_serving(self):
+        server = await start_server(self.handler, port=0, limit=1024)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            too_long = [{"id": i, "op": "visible_count"} for i in range(200)]
+            self.assertEqual(await self.ask(reader, writer, too_long), {"id": None, "error": "request too long"})
+            self.assertEqual(await self.ask(reader, writer, {"id": 1, "op": "visible_count"}), {"id": 1, "result": 21})
+            writer.close()
+
+    async def test_should_not_hold_up_other_connections_during_a_slow_answer(self):
+        released = threading.Event()
+
+        class SlowHandler(GridQueryHandler):
+            def query_slow(self):
+                return released.wait(5)
+
+        server = await start_server(SlowHandler(self.handler.grid), port=0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            slow, fast = [await asyncio.open_connection("127.0.0.1", port) for _ in range(2)]
+            slow_answer = asyncio.ensure_future(self.ask(*slow, {"id": "slow", "op": "slow"}))
+            self.assertEqual(await self.ask(*fast, {"id": "fast", "op": "visible_count"}), {"id": "fast", "result": 21})
+            self.assertFalse(slow_answer.done())
+            released.set()
+            self.assertEqual(await slow_answer, {"id": "slow", "result": True})
+            for _, writer in (slow, fast):
+                writer.close()
+
+
+if __name__ == "__main__":
+    unittest.main()